@@ -0,0 +1,128 @@
+"""
+Table access tracking with SQLite authorizer callbacks
+
+Every pooled connection is a TrackedConnection. While a statement is being
+prepared, SQLite reports each table it reads or modifies to the authorizer,
+which lets execute_query know exactly which tables a SELECT depends on and
+which tables a write touched. The result cache uses this to drop only the
+entries a write can actually have affected.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import FrozenSet, Iterator, Optional, Tuple
+
+# Authorizer actions whose first argument is a table being modified
+_WRITE_ACTIONS = frozenset({
+    sqlite3.SQLITE_INSERT,
+    sqlite3.SQLITE_UPDATE,
+    sqlite3.SQLITE_DELETE,
+    sqlite3.SQLITE_DROP_TABLE,
+    sqlite3.SQLITE_DROP_TEMP_TABLE,
+    sqlite3.SQLITE_DROP_VIEW,
+    sqlite3.SQLITE_DROP_TEMP_VIEW,
+})
+
+# Transaction control prepared implicitly by the sqlite3 module (BEGIN),
+# which must not be mistaken for the user's statement being prepared
+_IGNORED_ACTIONS = frozenset({
+    sqlite3.SQLITE_TRANSACTION,
+    sqlite3.SQLITE_SAVEPOINT,
+})
+
+# Statements are only prepared (and reported to the authorizer) once per
+# connection; re-executions come from sqlite3's statement cache without any
+# callbacks. The tables seen at prepare time are remembered here by SQL text.
+ACCESS_MEMO_SIZE = 4096
+_memo: "OrderedDict[str, Tuple[FrozenSet[str], FrozenSet[str]]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _remember(sql: str, reads: FrozenSet[str], writes: FrozenSet[str]) -> None:
+    with _memo_lock:
+        _memo[sql] = (reads, writes)
+        _memo.move_to_end(sql)
+        while len(_memo) > ACCESS_MEMO_SIZE:
+            _memo.popitem(last=False)
+
+
+def _recall(sql: str) -> Optional[Tuple[FrozenSet[str], FrozenSet[str]]]:
+    with _memo_lock:
+        entry = _memo.get(sql)
+        if entry is not None:
+            _memo.move_to_end(sql)
+        return entry
+
+
+class TableAccess:
+    """
+    Tables read and written by one statement
+
+    Table names are lower-cased because SQLite identifiers are
+    case-insensitive. ``known`` is False when the statement came from the
+    statement cache and its tables had been forgotten; callers must then
+    assume it may have touched anything.
+    """
+
+    def __init__(self):
+        self.reads: FrozenSet[str] = frozenset()
+        self.writes: FrozenSet[str] = frozenset()
+        self.known = True
+        self._reads = set()
+        self._writes = set()
+        self._prepared = False
+
+
+class TrackedConnection(sqlite3.Connection):
+    """sqlite3 connection that records table access through its authorizer"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._access: Optional[TableAccess] = None
+        self.set_authorizer(self._authorize)
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger):
+        """Record table access for the statement being prepared; never deny"""
+        access = self._access
+        if access is not None and action not in _IGNORED_ACTIONS:
+            access._prepared = True
+            if action == sqlite3.SQLITE_READ and arg1:
+                access._reads.add(arg1.lower())
+            elif action in _WRITE_ACTIONS and arg1:
+                access._writes.add(arg1.lower())
+            elif action == sqlite3.SQLITE_ALTER_TABLE and arg2:
+                access._writes.add(arg2.lower())
+        return sqlite3.SQLITE_OK
+
+    @contextmanager
+    def track_tables(self, sql: str, access: Optional[TableAccess] = None) -> Iterator[TableAccess]:
+        """
+        Record the tables touched by statements prepared inside the block
+
+        Args:
+            sql: The SQL text being executed, used to remember the tables
+                for later executions served from the statement cache
+            access: TableAccess to fill in (a new one is created if omitted)
+
+        Yields:
+            TableAccess that is filled in when the block exits
+        """
+        access = access if access is not None else TableAccess()
+        self._access = access
+        try:
+            yield access
+        finally:
+            self._access = None
+
+        if access._prepared:
+            access.reads = frozenset(access._reads)
+            access.writes = frozenset(access._writes)
+            _remember(sql, access.reads, access.writes)
+        else:
+            remembered = _recall(sql)
+            if remembered is None:
+                access.known = False
+            else:
+                access.reads, access.writes = remembered
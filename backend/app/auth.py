@@ -64,7 +64,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
+def decode_token(token: str) -> Optional[dict]:
     """
     Verify and decode a JWT token
     
@@ -72,16 +72,29 @@ def verify_token(token: str) -> Optional[str]:
         token: JWT token string
         
     Returns:
-        Username from token if valid, None otherwise
+        Token payload if the signature is valid, the token has not expired
+        and it names a user, None otherwise
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            return None
-            
-        return username
-        
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    
+    if payload.get("sub") is None:
+        return None
+    
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """
+    Verify and decode a JWT token
+    
+    Args:
+        token: JWT token string
+        
+    Returns:
+        Username from token if valid, None otherwise
+    """
+    payload = decode_token(token)
+    return payload["sub"] if payload else None
\ No newline at end of file
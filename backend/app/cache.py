@@ -0,0 +1,470 @@
+"""
+In-process caches
+
+Query results are stored in an LRU with a byte budget, keyed by the query
+text and tagged with the database version they were read at and the
+tables they were read from. A write made by this process only drops the
+entries that read one of the tables it modified; when the version moves on
+for any other reason (another process wrote), no cached result is trusted.
+
+Validated bearer tokens are mapped to their user records in a small TTL
+cache so authenticated requests skip the JWT decode and the users lookup.
+
+Per-table counters track what was written: TableVersions versions data
+derived from tables, WriteVolume counts changed rows towards the next
+ANALYZE.
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Union
+
+# Functions whose result changes between executions of the same query: the
+# random and change counters, the CURRENT_* keywords, and the date and time
+# functions called without a time value (which defaults to 'now')
+_NONDETERMINISTIC = re.compile(
+    r"\b(random|randomblob|changes|total_changes|last_insert_rowid)\s*\("
+    r"|'now'"
+    r"|\bcurrent_(date|time|timestamp)\b"
+    r"|\b(date|time|datetime|julianday|unixepoch)\s*\(\s*\)"
+    r"|\bstrftime\s*\(\s*'(?:[^']|'')*'\s*\)",
+    re.IGNORECASE,
+)
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize query text for use as a cache key
+
+    Only surrounding whitespace and trailing semicolons are stripped.
+    SQLite names a result column after the literal text of its expression,
+    so ``age IS NULL`` and ``age is null`` (or ``age + 1`` and ``age  +  1``)
+    return different column names and must not share an entry.
+
+    Args:
+        query: SQL query string
+
+    Returns:
+        Normalized query string
+    """
+    return query.strip().rstrip(';').strip()
+
+
+def is_deterministic(query: str) -> bool:
+    """Return False if the query calls functions like random(), date('now') or date()"""
+    return not _NONDETERMINISTIC.search(query)
+
+
+def estimate_size(result: Union[List[Dict[str, Any]], Dict[str, Any]]) -> int:
+    """
+    Roughly estimate the memory held by a query result
+
+    Accepts a list of row dicts or a {"columns": ..., "data": ...} result
+    with value lists. Only needs to be proportional to the real footprint
+    so the byte budget is meaningful; walking sys.getsizeof over every
+    object would cost more than the query.
+    """
+    size = 64
+    if isinstance(result, dict):
+        for values in result["data"]:
+            size += 64
+            for value in values:
+                size += 8
+                if isinstance(value, (str, bytes)):
+                    size += 48 + len(value)
+                else:
+                    size += 24
+        return size
+
+    for row in result:
+        size += 64
+        for key, value in row.items():
+            size += 16 + len(key)
+            if isinstance(value, (str, bytes)):
+                size += 48 + len(value)
+            else:
+                size += 24
+    return size
+
+
+class QueryResultCache:
+    """
+    Thread-safe LRU cache of query results bounded by total byte size
+
+    Every lookup and insert carries the current database version. A version
+    different from the one the cache holds means the database changed in an
+    unknown way, so all entries are dropped before continuing.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """True if the cache has any budget at all"""
+        return self.max_bytes > 0
+
+    def _sync_version(self, version: Hashable) -> None:
+        """Drop everything if the database moved to a new version (lock held)"""
+        if version != self._version:
+            if self._entries:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            self._version = version
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove one entry and account for its size (lock held)"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Cache key (normalized query)
+            version: Current database version
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        version: Hashable,
+        result: Any,
+        size: int,
+        tables: FrozenSet[str],
+    ) -> bool:
+        """
+        Store a result read at the given database version
+
+        Args:
+            key: Cache key (normalized query)
+            version: Database version the result was read at
+            result: The result to cache
+            size: Estimated size of the result in bytes
+            tables: Lower-cased names of the tables the query read
+
+        Results larger than max_entry_bytes are not cached. Least recently
+        used entries are evicted until the new one fits in the budget.
+
+        Returns:
+            True if the result was stored
+        """
+        if size > self.max_entry_bytes:
+            return False
+
+        with self._lock:
+            self._sync_version(version)
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+            self._entries[key] = (result, size, tables)
+            self._bytes += size
+            return True
+
+    def rebase(self, before: Hashable, after: Hashable, tables: Iterable[str]) -> None:
+        """
+        Account for a write this process made itself
+
+        If the cache was current right before the write, only entries that
+        read one of the written tables are dropped and the cache moves to the
+        new version. Otherwise the version moved on in between (another
+        write's rebase may already have moved it past this write), so the
+        entries cannot tell whether they saw this write and are all dropped.
+
+        Args:
+            before: Database version read just before the write
+            after: Database version read just after the write committed
+            tables: Names of tables the write modified
+        """
+        written = {table.lower() for table in tables}
+
+        with self._lock:
+            if self._version != before:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return
+            stale = [
+                key for key, (_, _, read) in self._entries.items()
+                if not read.isdisjoint(written)
+            ]
+            for key in stale:
+                self._remove(key)
+            self._invalidations += len(stale)
+            self._version = after
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+class AuthCache:
+    """
+    Thread-safe LRU cache of validated tokens and their user records
+
+    Entries live for at most ``ttl`` seconds and never past the token's own
+    expiry. Any write to the users table made by this process calls
+    invalidate(); writes from other processes are picked up once the TTL
+    runs out.
+
+    Lookups that race with an invalidation must not store what they read,
+    so callers take ``generation`` before reading the user and pass it to
+    put().
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """True if entries can be cached at all"""
+        return self.max_entries > 0 and self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidation"""
+        return self._generation
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the user record for a token
+
+        Returns:
+            The cached user record, or None on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._misses += 1
+                return None
+            user, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[token]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self._hits += 1
+            return user
+
+    def put(
+        self,
+        token: str,
+        user: Dict[str, Any],
+        token_expires_at: Optional[float],
+        generation: int,
+    ) -> bool:
+        """
+        Remember the user record a token resolved to
+
+        Args:
+            token: The bearer token
+            user: User record read from the database
+            token_expires_at: The token's exp claim (Unix time), if any
+            generation: Value of ``generation`` taken before the user was read
+
+        Returns:
+            True if the entry was stored
+        """
+        if not self.enabled:
+            return False
+
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self) -> None:
+        """Drop all entries, e.g. after the users table changed"""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+
+class TableVersions:
+    """
+    Per-table change counters derived from this process's writes
+
+    Every write committed through this process bumps the counters of the
+    tables it modified. A database version change that no recorded write
+    explains (another process wrote, or a write touched unknown tables)
+    may have changed anything, so it bumps the epoch, which is part of
+    every token. Tokens therefore change whenever the data behind them
+    may have changed, and stay equal while unrelated tables are written.
+
+    The counters and the epoch start from zero in every process, so every
+    token also carries a random nonce drawn when the process starts: a
+    token issued before a restart, or by another worker, never matches
+    one issued now.
+    """
+
+    def __init__(self):
+        self._nonce = uuid.uuid4().hex
+        self._version: Optional[Hashable] = None
+        self._epoch = 0
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nonce(self) -> str:
+        """Random value that tells this process's tokens from any other's"""
+        return self._nonce
+
+    def _sync_version(self, version: Hashable) -> None:
+        """Treat an unexplained version change as a change to everything (lock held)"""
+        if version != self._version:
+            if self._version is not None:
+                self._epoch += 1
+            self._version = version
+
+    def record_write(
+        self,
+        before: Hashable,
+        after: Hashable,
+        tables: Optional[Iterable[str]],
+    ) -> None:
+        """
+        Account for a write this process committed
+
+        Args:
+            before: Database version read just before the write
+            after: Database version read just after the write committed
+            tables: Names of tables the write modified, or None if unknown
+        """
+        with self._lock:
+            if tables is None or self._version != before:
+                self._epoch += 1
+            else:
+                for table in tables:
+                    table = table.lower()
+                    self._counters[table] = self._counters.get(table, 0) + 1
+            self._version = after
+
+    def token(self, tables: Iterable[str], version: Hashable) -> tuple:
+        """
+        Return a token that changes whenever one of the tables may have changed
+
+        Args:
+            tables: Names of the tables the data depends on
+            version: Current database version
+        """
+        names = sorted({table.lower() for table in tables})
+        with self._lock:
+            self._sync_version(version)
+            return (self._nonce, self._epoch) + tuple((name, self._counters.get(name, 0)) for name in names)
+
+
+class WriteVolume:
+    """
+    Rows changed per table since its statistics were last refreshed
+
+    Inserts, updates and deletes add their affected row counts to the
+    tables they wrote. The maintenance scheduler reads the totals to decide
+    which tables need a new ANALYZE and subtracts what it accounted for
+    once one ran, so writes made during the ANALYZE still count.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tables: Iterable[str], rows: int) -> None:
+        """Add rows changed by one write to each table it modified"""
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._rows[table] = self._rows.get(table, 0) + rows
+
+    def pending(self) -> Dict[str, int]:
+        """Rows changed per table, by lower-cased table name"""
+        with self._lock:
+            return dict(self._rows)
+
+    def subtract(self, table: str, rows: int) -> None:
+        """Forget rows that a statistics refresh has accounted for"""
+        table = table.lower()
+        with self._lock:
+            remaining = self._rows.get(table, 0) - rows
+            if remaining > 0:
+                self._rows[table] = remaining
+            else:
+                self._rows.pop(table, None)
@@ -0,0 +1,331 @@
+"""
+Server-side cursors for paginated SELECT results
+
+A cursor keeps its SELECT statement open on a pooled connection that is
+bound to the cursor for its whole life, so later pages continue where the
+previous one stopped instead of re-running the query. Cursors expire after
+sitting idle and each user may only hold a few open at once, because every
+open cursor pins one connection of the shared pool. The query timeout
+applies to opening the cursor and, afresh, to every page fetched from it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import DB_POOL_SIZE, PROGRESS_HANDLER_INTERVAL, QueryContext, QueryParams, pool
+from .pool import ConnectionPool
+
+# Cursor configuration
+CURSOR_IDLE_TIMEOUT = float(os.getenv('CURSOR_IDLE_TIMEOUT', '300'))
+CURSOR_MAX_PER_USER = int(os.getenv('CURSOR_MAX_PER_USER', '3'))
+# Never let cursors pin more than half of the pool
+CURSOR_MAX_TOTAL = int(os.getenv('CURSOR_MAX_TOTAL', str(max(1, DB_POOL_SIZE // 2))))
+
+
+class CursorLimitError(Exception):
+    """Raised when a user (or the server) has too many open cursors"""
+
+
+class CursorNotFoundError(Exception):
+    """Raised when a cursor id is unknown, expired, or owned by another user"""
+
+
+class ServerCursor:
+    """An open SELECT statement bound to one pooled connection"""
+
+    def __init__(
+        self,
+        username: str,
+        conn: sqlite3.Connection,
+        cursor: sqlite3.Cursor,
+        context: Optional[QueryContext] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.conn = conn
+        self.cursor = cursor
+        self.context = context
+        self.columns = [column[0] for column in cursor.description or []]
+        self.rows_fetched = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._lookahead = cursor.fetchone()
+
+    @property
+    def exhausted(self) -> bool:
+        """True once every row has been handed out"""
+        return self._lookahead is None
+
+    def fetch_page(self, page_size: int) -> List[Dict[str, Any]]:
+        """
+        Fetch the next page of rows
+
+        One row is always read ahead so the caller knows whether another
+        page exists without issuing an extra request.
+
+        Raises:
+            sqlite3.Error: If fetching fails, times out or is cancelled
+        """
+        rows = []
+        if self._lookahead is not None:
+            rows.append(self._lookahead)
+            try:
+                rows.extend(self.cursor.fetchmany(page_size - 1) if page_size > 1 else [])
+                self._lookahead = self.cursor.fetchone()
+            except sqlite3.Error as e:
+                if self.context is None:
+                    raise
+                raise self.context.abort_error(e) from e
+
+        self.rows_fetched += len(rows)
+        self.last_used = time.monotonic()
+        return [dict(zip(self.columns, row)) for row in rows]
+
+
+class CursorManager:
+    """
+    Registry of open server-side cursors
+
+    All methods are thread-safe; fetching from one cursor is serialized by
+    that cursor's own lock so different cursors can be read concurrently.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        idle_timeout: float = CURSOR_IDLE_TIMEOUT,
+        max_per_user: int = CURSOR_MAX_PER_USER,
+        max_total: int = CURSOR_MAX_TOTAL,
+    ):
+        self.pool = pool
+        self.idle_timeout = idle_timeout
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self._cursors: Dict[str, ServerCursor] = {}
+        # Slots taken by opens whose query is still running, per user
+        self._reserved: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _release(self, server_cursor: ServerCursor) -> None:
+        """Close the statement and give its connection back to the pool"""
+        try:
+            server_cursor.cursor.close()
+        except sqlite3.Error:
+            pass
+        self._unbind(server_cursor.conn, server_cursor.context)
+        self.pool.release(server_cursor.conn)
+
+    def _bind(self, conn: sqlite3.Connection, context: Optional[QueryContext]) -> None:
+        """
+        Enforce the context's timeout and cancellation on conn
+
+        Raises:
+            sqlite3.OperationalError: If the context was already cancelled
+        """
+        if context is None:
+            return
+        if not context.attach(conn):
+            raise sqlite3.OperationalError("Query cancelled")
+        conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+
+    def _unbind(self, conn: sqlite3.Connection, context: Optional[QueryContext]) -> None:
+        """Undo _bind() before the connection goes back to the pool"""
+        if context is None:
+            return
+        conn.set_progress_handler(None, 0)
+        context.detach()
+
+    def _reserve(self, username: str) -> None:
+        """
+        Take a cursor slot for an open that is about to run its query
+
+        Raises:
+            CursorLimitError: If another cursor may not be opened
+        """
+        with self._lock:
+            open_for_user = sum(1 for c in self._cursors.values() if c.username == username)
+            if open_for_user + self._reserved.get(username, 0) >= self.max_per_user:
+                raise CursorLimitError(
+                    f"Too many open cursors (limit {self.max_per_user} per user). "
+                    "Close or finish an existing cursor first."
+                )
+            if len(self._cursors) + sum(self._reserved.values()) >= self.max_total:
+                raise CursorLimitError("Server cursor capacity reached, try again later")
+            self._reserved[username] = self._reserved.get(username, 0) + 1
+
+    def _unreserve(self, username: str) -> None:
+        """Give back a slot taken by _reserve(); call with the lock held"""
+        remaining = self._reserved[username] - 1
+        if remaining:
+            self._reserved[username] = remaining
+        else:
+            del self._reserved[username]
+
+    def open(
+        self,
+        username: str,
+        query: str,
+        page_size: int,
+        params: Optional[QueryParams] = None,
+        context: Optional[QueryContext] = None,
+    ) -> Tuple[Optional[str], List[str], List[Dict[str, Any]], bool]:
+        """
+        Execute a SELECT and return its first page
+
+        The cursor is only kept open if more rows remain after the first page.
+
+        Args:
+            username: Owner of the cursor
+            query: SQL SELECT query string
+            page_size: Rows per page
+            params: Optional values for the query's placeholders
+            context: Optional timeout and cancellation; the timeout restarts
+                with every page
+
+        Returns:
+            Tuple of (cursor id or None, column names, first page rows, has_more)
+
+        Raises:
+            CursorLimitError: If the user or server cursor limit is reached
+            sqlite3.Error: If the query fails, times out or is cancelled
+        """
+        self.expire_idle()
+        # The slot is held while the query runs, so concurrent opens cannot
+        # all pass the limit check before any of them is registered
+        self._reserve(username)
+
+        try:
+            conn = self.pool.acquire(long_lived=True)
+            try:
+                self._bind(conn, context)
+                if context is not None:
+                    context.start_timer()
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                try:
+                    cursor.execute(query.strip().rstrip(';'), () if params is None else params)
+                    server_cursor = ServerCursor(username, conn, cursor, context)
+                except sqlite3.Error as e:
+                    if context is None:
+                        raise
+                    raise context.abort_error(e) from e
+                rows = server_cursor.fetch_page(page_size)
+            except BaseException:
+                self._unbind(conn, context)
+                self.pool.release(conn)
+                raise
+        except BaseException:
+            with self._lock:
+                self._unreserve(username)
+            raise
+
+        if server_cursor.exhausted:
+            with self._lock:
+                self._unreserve(username)
+            self._release(server_cursor)
+            return None, server_cursor.columns, rows, False
+
+        with self._lock:
+            self._unreserve(username)
+            self._cursors[server_cursor.id] = server_cursor
+        return server_cursor.id, server_cursor.columns, rows, True
+
+    def fetch(self, cursor_id: str, username: str, page_size: int) -> Tuple[List[str], List[Dict[str, Any]], bool]:
+        """
+        Fetch the next page from an open cursor
+
+        The cursor is closed automatically once its last row is returned.
+
+        Returns:
+            Tuple of (column names, page rows, has_more)
+
+        Raises:
+            CursorNotFoundError: If the cursor does not exist for this user
+            sqlite3.Error: If fetching fails or times out (the cursor is closed)
+        """
+        self.expire_idle()
+
+        with self._lock:
+            server_cursor = self._cursors.get(cursor_id)
+        if server_cursor is None or server_cursor.username != username:
+            raise CursorNotFoundError(f"Cursor '{cursor_id}' not found or expired")
+
+        with server_cursor.lock:
+            # close() or expire_idle() may have released it since the lookup
+            with self._lock:
+                registered = self._cursors.get(cursor_id) is server_cursor
+            if not registered:
+                raise CursorNotFoundError(f"Cursor '{cursor_id}' not found or expired")
+            if server_cursor.context is not None:
+                server_cursor.context.start_timer()
+            try:
+                rows = server_cursor.fetch_page(page_size)
+                error = None
+            except sqlite3.Error as e:
+                error = e
+            has_more = error is None and not server_cursor.exhausted
+
+        # close() takes the cursor's lock itself, so it runs after releasing it
+        if error is not None:
+            self.close(cursor_id, username)
+            raise error
+        if not has_more:
+            self.close(cursor_id, username)
+        return server_cursor.columns, rows, has_more
+
+    def close(self, cursor_id: str, username: str) -> bool:
+        """
+        Close a cursor owned by username
+
+        Returns:
+            True if the cursor was open and is now closed, False otherwise
+        """
+        with self._lock:
+            server_cursor = self._cursors.get(cursor_id)
+            if server_cursor is None or server_cursor.username != username:
+                return False
+            del self._cursors[cursor_id]
+
+        with server_cursor.lock:
+            self._release(server_cursor)
+        return True
+
+    def expire_idle(self) -> int:
+        """
+        Close cursors that have been idle longer than the idle timeout
+
+        Returns:
+            Number of cursors closed
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [c for c in self._cursors.values() if c.last_used < cutoff]
+            for server_cursor in expired:
+                del self._cursors[server_cursor.id]
+
+        for server_cursor in expired:
+            with server_cursor.lock:
+                self._release(server_cursor)
+        return len(expired)
+
+    def close_all(self) -> None:
+        """Close every open cursor (used on shutdown)"""
+        with self._lock:
+            cursors = list(self._cursors.values())
+            self._cursors.clear()
+
+        for server_cursor in cursors:
+            with server_cursor.lock:
+                self._release(server_cursor)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of open cursors"""
+        with self._lock:
+            return {"open": len(self._cursors)}
+
+
+cursor_manager = CursorManager(pool)
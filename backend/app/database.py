@@ -1,145 +1,999 @@
 import sqlite3
-from typing import List, Dict, Any, Union, Optional
+from typing import List, Dict, Any, Union, Optional, Iterator, Iterable, Sequence, Tuple
 from dotenv import load_dotenv
 import os
-import re
+import json
+import threading
+import time
 from datetime import datetime
 
+from .access import TableAccess, TrackedConnection
+from .cache import AuthCache, QueryResultCache, TableVersions, WriteVolume, normalize_query, is_deterministic, estimate_size
+from .history_writer import HistoryWriter
+from .statements import Statement, classify_statement
+from .pool import ConnectionPool
+
 load_dotenv()
 
 # Database configuration
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'backend/sql_runner.db')
 print(f"Database path: {DATABASE_PATH}")
 
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Access columns by name
-    return conn
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))
+# Connections that streams, server-side cursors, exports and jobs may keep
+# checked out at once; the rest of the pool stays free for short requests
+DB_LONG_LIVED_CONNECTIONS = int(os.getenv('DB_LONG_LIVED_CONNECTIONS', str(max(1, DB_POOL_SIZE // 2))))
+# Prepared statements kept per connection. Repeated query shapes (the same
+# SQL text with different parameters) skip parsing and planning entirely.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '1024'))
+
+# PRAGMA profile applied to every pooled connection when it is opened.
+# WAL lets readers and writers proceed concurrently (an open server-side
+# cursor or a history flush no longer blocks the other side), and in WAL
+# mode synchronous=NORMAL only fsyncs at checkpoints: a power loss may undo
+# the most recent commits but never corrupts the database.
+# cache_size is in pages when positive and in KiB when negative.
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-65536'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+
+# Rows ANALYZE examines per index in background maintenance (0 = all), and
+# whether pooled connections run PRAGMA optimize when the pool closes them.
+# SQLite recommends running it before closing a connection: it analyzes
+# the tables that connection's queries would have planned better with
+# fresh statistics.
+SQLITE_ANALYSIS_LIMIT = int(os.getenv('SQLITE_ANALYSIS_LIMIT', '1000'))
+SQLITE_OPTIMIZE_ON_CLOSE = os.getenv('SQLITE_OPTIMIZE_ON_CLOSE', '1') == '1'
+
+CONNECTION_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "cache_size": SQLITE_CACHE_SIZE,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "temp_store": SQLITE_TEMP_STORE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT,
+}
+
+
+def optimize_connection(conn: sqlite3.Connection) -> None:
+    """Run PRAGMA optimize on a connection, bounded by SQLITE_ANALYSIS_LIMIT"""
+    conn.execute(f"PRAGMA analysis_limit = {SQLITE_ANALYSIS_LIMIT}")
+    conn.execute("PRAGMA optimize")
+
+
+pool = ConnectionPool(
+    DATABASE_PATH,
+    size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    pragmas=CONNECTION_PRAGMAS,
+    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+    factory=TrackedConnection,
+    cached_statements=DB_STATEMENT_CACHE_SIZE,
+    on_close=optimize_connection if SQLITE_OPTIMIZE_ON_CLOSE else None,
+    max_long_lived=DB_LONG_LIVED_CONNECTIONS,
+)
+
+
+# Rows fetched per fetchmany() call when streaming results
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '500'))
+
+# Result cache configuration (0 disables the cache)
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+result_cache = QueryResultCache(max_bytes=RESULT_CACHE_MAX_BYTES)
+
+# Per-table change counters, used to version data derived from tables
+table_versions = TableVersions()
+
+# Rows changed per table by DML, read by the maintenance scheduler
+write_volume = WriteVolume()
+
+# Statement kinds whose affected rows count towards the next ANALYZE
+_DML_KINDS = frozenset({"insert", "update", "delete"})
+
+# Validated-token cache used by authentication (0 disables the cache).
+# AUTH_CACHE_TTL bounds how long a change to a user made by another process
+# can go unnoticed.
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '1024'))
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', '60'))
+
+auth_cache = AuthCache(max_entries=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
 
+# Query execution limits. Requests may ask for less but never for more than
+# the limits that apply to their user. QUERY_USER_LIMITS overrides them per
+# user, e.g. '{"admin": {"timeout": 120, "max_rows": 500000}}'.
+QUERY_TIMEOUT = float(os.getenv('QUERY_TIMEOUT', '30'))
+QUERY_JOB_TIMEOUT = float(os.getenv('QUERY_JOB_TIMEOUT', '600'))
+QUERY_MAX_ROWS = int(os.getenv('QUERY_MAX_ROWS', '100000'))
+QUERY_MAX_BYTES = int(os.getenv('QUERY_MAX_BYTES', str(50 * 1024 * 1024)))
+QUERY_USER_LIMITS: Dict[str, Dict[str, Any]] = json.loads(os.getenv('QUERY_USER_LIMITS', '{}'))
 
-def close_db_connection(conn):
-    """Close database connection"""
+# SQLite VM instructions between two timeout checks
+PROGRESS_HANDLER_INTERVAL = 10000
+
+# Result shapes execute_query can return for SELECTs: a dict per row
+# ("objects"), column names plus a list per row ("rows"), or column names
+# plus a list per column ("columnar")
+OBJECTS = "objects"
+ROWS = "rows"
+COLUMNAR = "columnar"
+RESULT_FORMATS = (OBJECTS, ROWS, COLUMNAR)
+
+# Bound parameters: a sequence for ? placeholders or a mapping for :name
+QueryParams = Union[Sequence[Any], Dict[str, Any]]
+
+# Write-behind query history: records are written in one transaction every
+# HISTORY_FLUSH_SIZE records or HISTORY_FLUSH_INTERVAL_MS milliseconds.
+# When HISTORY_QUEUE_SIZE records are waiting, callers block for up to
+# HISTORY_ENQUEUE_TIMEOUT seconds before writing their record directly.
+# A batch that fails to write is retried HISTORY_WRITE_RETRIES times, after
+# HISTORY_RETRY_DELAY_MS milliseconds and then twice as long each time.
+HISTORY_FLUSH_SIZE = int(os.getenv('HISTORY_FLUSH_SIZE', '100'))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv('HISTORY_FLUSH_INTERVAL_MS', '200'))
+HISTORY_QUEUE_SIZE = int(os.getenv('HISTORY_QUEUE_SIZE', '10000'))
+HISTORY_ENQUEUE_TIMEOUT = float(os.getenv('HISTORY_ENQUEUE_TIMEOUT', '1'))
+HISTORY_WRITE_RETRIES = int(os.getenv('HISTORY_WRITE_RETRIES', '5'))
+HISTORY_RETRY_DELAY_MS = float(os.getenv('HISTORY_RETRY_DELAY_MS', '50'))
+
+# Dedicated connection used only to read the database version. It never
+# writes, so its PRAGMA data_version changes whenever any other connection
+# (pooled or in another process) commits.
+_version_conn: Optional[sqlite3.Connection] = None
+_version_lock = threading.Lock()
+
+
+def get_db_connection(long_lived: bool = False):
+    """
+    Check out a database connection from the pool
+    
+    Args:
+        long_lived: The connection is kept across many executor tasks (a
+            stream, cursor, export or job); see ConnectionPool
+    """
+    return pool.acquire(long_lived=long_lived)
+
+
+def close_db_connection(conn, discard: bool = False):
+    """Return database connection to the pool (or close it, with discard=True)"""
     if conn:
-        conn.close()
+        pool.release(conn, discard)
+
+
+def get_database_version() -> Tuple[int, int]:
+    """
+    Get the current database version
+    
+    Returns:
+        Tuple of (PRAGMA data_version, PRAGMA schema_version) as seen by the
+        dedicated version connection
+    """
+    global _version_conn
+    
+    with _version_lock:
+        if _version_conn is None:
+            _version_conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+        data_version = _version_conn.execute("PRAGMA data_version").fetchone()[0]
+        schema_version = _version_conn.execute("PRAGMA schema_version").fetchone()[0]
+        return data_version, schema_version
+
+
+def get_tables_version(tables: Optional[Iterable[str]]) -> tuple:
+    """
+    Version token for data derived from the given tables
+    
+    Args:
+        tables: Tables the data was read from, or None if unknown
+        
+    Returns:
+        A hashable token that changes whenever one of the tables may have
+        changed (with unknown tables, whenever anything changed). Tokens
+        from before a restart or from another process never match, since
+        data_version only counts commits seen by this process's connection
+    """
+    version = get_database_version()
+    if tables is None:
+        return ("database", table_versions.nonce) + version
+    return table_versions.token(tables, version)
+
+
+def commit_write(conn, tables: Optional[Iterable[str]], before: Optional[Tuple[int, int]]):
+    """
+    Commit a write and drop only the cached results it can have changed
+    
+    Writes that may have touched the users table also drop every cached
+    token, so changed or deactivated users are looked up again. The
+    counters of the written tables are bumped in table_versions.
+    
+    The versions read before and after only describe this write if no
+    other connection committed in between. While the transaction holds the
+    write lock nobody else can commit, so the version is read again then,
+    and the connection's own PRAGMA data_version (which only moves for
+    other connections' commits) tells whether one landed between the
+    commit and reading ``after``. When that cannot be shown (including
+    DDL, which commits as it runs), the write counts as touching unknown
+    tables and every cached result is dropped.
+    
+    Args:
+        conn: Connection holding the write
+        tables: Tables modified by the write, or None if unknown (the cache
+            then flushes everything on its next lookup)
+        before: Database version read before the write started
+    """
+    locked = own_version = None
+    if before is not None and conn.in_transaction:
+        locked = get_database_version()
+        own_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    conn.commit()
+    if tables is not None:
+        tables = [table.lower() for table in tables]
+    if tables is None or "users" in tables:
+        auth_cache.invalidate()
+    if before is None:
+        return
+    after = get_database_version()
+    alone = (
+        locked == before
+        and conn.execute("PRAGMA data_version").fetchone()[0] == own_version
+    )
+    if tables is not None and not alone:
+        tables = None
+        result_cache.clear()
+    table_versions.record_write(before, after, tables)
+    if tables is not None:
+        result_cache.rebase(before, after, tables)
+
+
+def record_write_volume(statement: Statement, tables: Optional[Iterable[str]], rows: int) -> None:
+    """
+    Count the rows an INSERT, UPDATE or DELETE changed towards the next
+    ANALYZE of the tables it wrote
+    
+    Args:
+        statement: Classified statement that ran
+        tables: Tables it modified, or None if unknown (nothing is counted)
+        rows: Rows it changed (from conn.total_changes, which unlike
+            cursor.rowcount also counts WITH ... INSERT statements)
+    """
+    if statement.kind in _DML_KINDS and tables and rows > 0:
+        write_volume.record(tables, rows)
+
+
+class QueryContext:
+    """
+    Per-execution state shared between execute_query and its caller
+    
+    Carries the limits a query runs under (wall-clock timeout, maximum rows
+    and serialized bytes returned) and reports back whether they were hit.
+    Also lets another thread follow the progress of a running query and
+    cancel it. Cancelling interrupts the statement through
+    sqlite3.Connection.interrupt() on the connection executing it.
+    """
+    
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.truncated = False
+        self.timed_out = False
+        self.cancelled = False
+        # Background jobs keep their connection for a long time
+        self.long_lived = False
+        self._deadline: Optional[float] = None
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def start_timer(self):
+        """Start the wall-clock timeout"""
+        if self.timeout:
+            self._deadline = time.monotonic() + self.timeout
+    
+    def check_progress(self) -> int:
+        """
+        SQLite progress handler: a non-zero return aborts the statement
+        
+        Returns:
+            1 if the query timed out or was cancelled, 0 to keep running
+        """
+        if self.cancelled:
+            return 1
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self.timed_out = True
+            return 1
+        return 0
+    
+    def accept_row(self, row: Union[Dict[str, Any], Sequence[Any]]) -> bool:
+        """
+        Count a row against the row and byte limits
+        
+        Rows may be dicts or plain value sequences; column names only count
+        towards the size when they are repeated in every row.
+        
+        Returns:
+            False if the row does not fit; the result is then truncated
+        """
+        if self.max_rows is not None and self.rows_fetched >= self.max_rows:
+            self.truncated = True
+            return False
+        size = _estimate_json_size(row)
+        if self.max_bytes is not None and self.bytes_fetched + size > self.max_bytes:
+            self.truncated = True
+            return False
+        self.rows_fetched += 1
+        self.bytes_fetched += size
+        return True
+    
+    def attach(self, conn) -> bool:
+        """Bind the executing connection; returns False if already cancelled"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._conn = conn
+            return True
+    
+    def detach(self):
+        """Unbind the connection once execution has finished"""
+        with self._lock:
+            self._conn = None
+    
+    def cancel(self):
+        """Cancel the query, interrupting it if it is running"""
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def abort_error(self, error: sqlite3.Error) -> sqlite3.Error:
+        """
+        The error to raise for a statement that failed under this context
+
+        SQLite only reports "interrupted" when the progress handler stops a
+        statement; this says whether it was cancelled or timed out instead.
+        """
+        if self.cancelled:
+            return sqlite3.OperationalError("Query cancelled")
+        if self.timed_out:
+            return sqlite3.OperationalError(f"Query timed out after {self.timeout:g} seconds")
+        return error
+
+
+def _estimate_json_size(row: Union[Dict[str, Any], Sequence[Any]]) -> int:
+    """Approximate the number of bytes a row takes up once JSON-encoded"""
+    size = 2
+    if isinstance(row, dict):
+        size += sum(len(key) + 3 for key in row)
+        values = row.values()
+    else:
+        values = row
+    for value in values:
+        size += 1
+        if value is None:
+            size += 4
+        elif isinstance(value, (str, bytes)):
+            size += len(value) + 2
+        else:
+            size += len(str(value))
+    return size
+
+
+def make_query_context(
+    username: str,
+    timeout: Optional[float] = None,
+    max_rows: Optional[int] = None,
+    background: bool = False
+) -> QueryContext:
+    """
+    Build the execution context for a user's query
+    
+    Requested limits are capped at the user's limits (QUERY_USER_LIMITS,
+    falling back to the global defaults).
+    
+    Args:
+        username: User running the query
+        timeout: Requested wall-clock timeout in seconds
+        max_rows: Requested maximum number of rows
+        background: Whether the query runs as a background job (or holds
+            its connection for a stream or export), which uses the longer
+            job timeout
+        
+    Returns:
+        QueryContext with the effective limits
+    """
+    user_limits = QUERY_USER_LIMITS.get(username, {})
+    if background:
+        timeout_limit = float(user_limits.get("job_timeout", QUERY_JOB_TIMEOUT))
+    else:
+        timeout_limit = float(user_limits.get("timeout", QUERY_TIMEOUT))
+    rows_limit = int(user_limits.get("max_rows", QUERY_MAX_ROWS))
+    bytes_limit = int(user_limits.get("max_bytes", QUERY_MAX_BYTES))
+    
+    context = QueryContext(
+        timeout=min(timeout, timeout_limit) if timeout else timeout_limit,
+        max_rows=min(max_rows, rows_limit) if max_rows else rows_limit,
+        max_bytes=bytes_limit
+    )
+    context.long_lived = background
+    return context
+
+
+def is_select_query(query: str) -> bool:
+    """
+    Check whether a query is a read-only statement that returns rows
+    
+    Covers SELECT, VALUES, WITH ... SELECT and EXPLAIN, also when they
+    start with comments. PRAGMAs and writes with a RETURNING clause also
+    return rows but may change the database, so they are not included.
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        True if the query only reads and returns rows, False otherwise
+    """
+    return classify_statement(query).read_only
 
 
-def execute_query(query: str) -> Union[List[Dict[str, Any]], Dict[str, str]]:
+def _status_message(statement: Statement, affected_rows: int) -> Dict[str, Any]:
+    """Result row reporting a statement that returned no rows"""
+    kind = statement.kind
+    if kind == "create_table":
+        message = f"Table '{statement.object_name or 'table'}' created successfully!"
+        affected_rows = 0
+    elif kind == "create_index":
+        message = "Index created successfully!"
+        affected_rows = 0
+    elif kind == "drop_table":
+        message = f"Table '{statement.object_name or 'table'}' dropped successfully!"
+        affected_rows = 0
+    elif kind == "alter_table":
+        message = "Table altered successfully!"
+        affected_rows = 0
+    elif kind == "insert":
+        message = f"Successfully inserted {affected_rows} row(s)!"
+    elif kind == "update":
+        message = f"Successfully updated {affected_rows} row(s)!"
+    elif kind == "delete":
+        message = f"Successfully deleted {affected_rows} row(s)!"
+    else:
+        kind = "other"
+        message = f"Query executed successfully. {affected_rows} row(s) affected."
+    return {"message": message, "type": kind, "affected_rows": affected_rows}
+
+
+def format_result(rows: List[Dict[str, Any]], format: str) -> Dict[str, Any]:
+    """
+    Convert a list of row dictionaries to the "rows" or "columnar" shape
+    
+    Args:
+        rows: Rows as dictionaries, e.g. a statement's status message
+        format: ROWS or COLUMNAR
+        
+    Returns:
+        Dictionary with "columns" and "data"
+    """
+    columns = list(rows[0].keys()) if rows else []
+    if format == COLUMNAR:
+        data = [[row[column] for row in rows] for column in columns]
+    else:
+        data = [[row[column] for column in columns] for row in rows]
+    return {"columns": columns, "data": data}
+
+
+def _fetch_objects(cursor, context: Optional[QueryContext]) -> List[Dict[str, Any]]:
+    """Fetch a SELECT result as one dictionary per row, honouring the context's limits"""
+    results = []
+    while True:
+        batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+        if not batch:
+            break
+        if context is None:
+            results.extend(dict(row) for row in batch)
+            continue
+        for row in batch:
+            row = dict(row)
+            if not context.accept_row(row):
+                break
+            results.append(row)
+        if context.truncated:
+            break
+    return results
+
+
+def _fetch_values(cursor, context: Optional[QueryContext], format: str) -> Dict[str, Any]:
+    """
+    Fetch a SELECT result as plain value lists, without a dict per row
+    
+    The cursor must return plain tuples. Rows are appended batch by batch;
+    for the columnar shape each batch is transposed with zip() and appended
+    to the per-column lists.
+    """
+    columns = [column[0] for column in cursor.description or []]
+    data: List[Any] = [[] for _ in columns] if format == COLUMNAR else []
+    
+    while True:
+        batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+        if not batch:
+            break
+        if context is not None:
+            accepted = 0
+            for row in batch:
+                if not context.accept_row(row):
+                    break
+                accepted += 1
+            batch = batch[:accepted]
+        if format == COLUMNAR:
+            for values, column_values in zip(data, zip(*batch)):
+                values.extend(column_values)
+        else:
+            data.extend(batch)
+        if context is not None and context.truncated:
+            break
+    
+    return {"columns": columns, "data": data}
+
+
+def execute_query(
+    query: str,
+    access: Optional[TableAccess] = None,
+    context: Optional[QueryContext] = None,
+    format: str = OBJECTS,
+    params: Optional[QueryParams] = None
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Execute an SQL query and return results
     
+    The tables the statement reads and writes are recorded through the
+    connection's authorizer. Writes drop the cached results that read any
+    of the written tables.
+    
+    With a QueryContext, the statement is aborted once its timeout passes
+    (checked from an SQLite progress handler) and SELECT results stop at
+    the row and byte limits, setting ``context.truncated``.
+    
+    Statements that change the connection itself (PRAGMA, ATTACH, DETACH,
+    TEMP tables, views, indexes and triggers) close it afterwards instead of
+    returning it to the pool, so the next request starts from a clean one.
+    
     Args:
         query: SQL query string
+        access: Optional TableAccess to fill in with the tables touched
+        context: Optional QueryContext with limits, progress and cancellation
+        format: Shape of SELECT results (OBJECTS, ROWS or COLUMNAR)
+        params: Optional values for the query's ? or :name placeholders
         
     Returns:
-        List of dictionaries for SELECT queries
-        Dictionary with success message for DDL/DML queries
+        List of dictionaries for SELECT queries (OBJECTS)
+        Dictionary with "columns" and "data" for SELECT queries (ROWS, COLUMNAR)
+        List with a success message dictionary for DDL/DML queries
         Dictionary with error message if query fails
     """
-    conn = get_db_connection()
+    # Remove any trailing semicolons and whitespace
+    query = query.strip().rstrip(';')
+    statement = classify_statement(query)
+    
+    conn = get_db_connection(long_lived=context is not None and context.long_lived)
     cursor = conn.cursor()
+    if format != OBJECTS:
+        cursor.row_factory = None  # Plain tuples, cheaper than sqlite3.Row
     
     try:
-        # Remove any trailing semicolons and whitespace
-        query = query.strip().rstrip(';')
-        query_upper = query.strip().upper()
-        
-        cursor.execute(query)
-        
-        # Check if it's a SELECT query
-        if query_upper.startswith('SELECT'):
-            results = cursor.fetchall()
-            return [dict(row) for row in results]
-        
-        # For CREATE TABLE queries
-        elif query_upper.startswith('CREATE TABLE'):
-            conn.commit()
-            # Extract table name
-            match = re.search(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([^\s(]+)', query_upper)
-            table_name = match.group(1) if match else "table"
-            return [{
-                "message": f"Table '{table_name}' created successfully!",
-                "type": "create_table",
-                "affected_rows": 0
-            }]
-        
-        # For CREATE INDEX queries
-        elif query_upper.startswith('CREATE INDEX') or query_upper.startswith('CREATE UNIQUE INDEX'):
-            conn.commit()
-            return [{
-                "message": "Index created successfully!",
-                "type": "create_index",
-                "affected_rows": 0
-            }]
-        
-        # For DROP TABLE queries
-        elif query_upper.startswith('DROP TABLE'):
-            conn.commit()
-            match = re.search(r'DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?([^\s;]+)', query_upper)
-            table_name = match.group(1) if match else "table"
-            return [{
-                "message": f"Table '{table_name}' dropped successfully!",
-                "type": "drop_table",
-                "affected_rows": 0
-            }]
-        
-        # For ALTER TABLE queries
-        elif query_upper.startswith('ALTER TABLE'):
-            conn.commit()
-            return [{
-                "message": "Table altered successfully!",
-                "type": "alter_table",
-                "affected_rows": 0
-            }]
-        
-        # For INSERT queries
-        elif query_upper.startswith('INSERT'):
-            conn.commit()
-            affected_rows = cursor.rowcount
-            return [{
-                "message": f"Successfully inserted {affected_rows} row(s)!",
-                "type": "insert",
-                "affected_rows": affected_rows
-            }]
-        
-        # For UPDATE queries
-        elif query_upper.startswith('UPDATE'):
-            conn.commit()
-            affected_rows = cursor.rowcount
-            return [{
-                "message": f"Successfully updated {affected_rows} row(s)!",
-                "type": "update",
-                "affected_rows": affected_rows
-            }]
-        
-        # For DELETE queries
-        elif query_upper.startswith('DELETE'):
-            conn.commit()
-            affected_rows = cursor.rowcount
-            return [{
-                "message": f"Successfully deleted {affected_rows} row(s)!",
-                "type": "delete",
-                "affected_rows": affected_rows
-            }]
-        
-        # For other queries
-        else:
-            conn.commit()
-            affected_rows = cursor.rowcount
-            return [{
-                "message": f"Query executed successfully. {affected_rows} row(s) affected.",
-                "type": "other",
-                "affected_rows": affected_rows
-            }]
+        if context is not None:
+            if not context.attach(conn):
+                return {"error": "Query cancelled"}
+            context.start_timer()
+            conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+        
+        # DDL runs in autocommit mode, so take the version before executing
+        before = None if statement.read_only else get_database_version()
+        
+        changes = conn.total_changes
+        with conn.track_tables(query, access) as access:
+            cursor.execute(query, () if params is None else params)
+        written = access.writes if access.known else None
+        
+        # Anything that returns rows: SELECT, VALUES, EXPLAIN, PRAGMA
+        # queries and writes with a RETURNING clause
+        if cursor.description is not None:
+            if format == OBJECTS:
+                result = _fetch_objects(cursor, context)
+            else:
+                result = _fetch_values(cursor, context, format)
+            if not statement.read_only:
+                # Finish a partly fetched statement so the commit can go through
+                cursor.close()
+                commit_write(conn, written, before)
+                record_write_volume(statement, written, conn.total_changes - changes)
+            return result
+        
+        commit_write(conn, written, before)
+        record_write_volume(statement, written, conn.total_changes - changes)
+        return [_status_message(statement, cursor.rowcount)]
             
     except sqlite3.Error as e:
+        if context is not None and context.cancelled:
+            return {"error": "Query cancelled"}
+        if context is not None and context.timed_out:
+            return {"error": f"Query timed out after {context.timeout:g} seconds"}
         return {"error": f"Database error: {str(e)}"}
     except Exception as e:
         return {"error": f"Unexpected error: {str(e)}"}
     finally:
+        if context is not None:
+            conn.set_progress_handler(None, 0)
+            context.detach()
+        # PRAGMAs, attached databases and TEMP objects would carry over
+        # to the next request on this connection
+        close_db_connection(conn, discard=statement.changes_session)
+
+
+def split_statements(script: str) -> List[str]:
+    """
+    Split an SQL script into its statements
+    
+    A semicolon only ends a statement when sqlite3.complete_statement()
+    agrees, so semicolons inside string literals, comments and trigger
+    bodies (CREATE TRIGGER ... BEGIN ...; END;) do not split it. Text after
+    the last semicolon is a final statement. Statements that are empty or
+    only hold comments are dropped.
+    
+    Args:
+        script: SQL text with one or more statements
+        
+    Returns:
+        List of statements, each including its terminating semicolon
+    """
+    statements = []
+    current = ""
+    pieces = script.split(";")
+    for piece in pieces[:-1]:
+        current += piece + ";"
+        if sqlite3.complete_statement(current):
+            statements.append(current)
+            current = ""
+    statements.append(current + pieces[-1])
+    
+    return [
+        statement.strip() for statement in statements
+        if classify_statement(statement).kind != "empty"
+    ]
+
+
+def execute_script(
+    script: str,
+    context: Optional[QueryContext] = None,
+    format: str = OBJECTS
+) -> Dict[str, Any]:
+    """
+    Run a multi-statement script in a single transaction
+    
+    The statements run one after the other on one connection inside one
+    transaction, so the whole script costs a single commit. If any of them
+    fails, everything the script did is rolled back. Scripts may use
+    savepoints but not BEGIN, COMMIT or ROLLBACK.
+    
+    The context's timeout and row limits apply to the script as a whole.
+    
+    Args:
+        script: SQL text with one or more statements
+        context: Optional QueryContext with limits, progress and cancellation
+        format: Shape of returned rows (OBJECTS, ROWS or COLUMNAR)
+        
+    Returns:
+        Dictionary with "results", one entry per statement holding the
+        "statement" and either "columns" and "data" (statements that
+        return rows) or "affected_rows"
+        Dictionary with "error" and the failing "statement_index" if the
+        script fails
+    """
+    statements = split_statements(script)
+    if not statements:
+        return {"error": "Script contains no statements", "statement_index": None}
+    for index, statement in enumerate(statements):
+        if classify_statement(statement).kind == "transaction":
+            return {
+                "error": "Scripts run in a single transaction; remove BEGIN, COMMIT and ROLLBACK",
+                "statement_index": index
+            }
+    
+    changes_session = any(classify_statement(statement).changes_session for statement in statements)
+    
+    conn = get_db_connection(long_lived=context is not None and context.long_lived)
+    cursor = conn.cursor()
+    if format != OBJECTS:
+        cursor.row_factory = None  # Plain tuples, cheaper than sqlite3.Row
+    index = None
+    
+    try:
+        if context is not None:
+            if not context.attach(conn):
+                return {"error": "Query cancelled", "statement_index": None}
+            context.start_timer()
+            conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+        
+        before = get_database_version()
+        cursor.execute("BEGIN")
+        written: Optional[set] = set()
+        volume = []
+        results = []
+        
+        for index, statement in enumerate(statements):
+            changes = conn.total_changes
+            with conn.track_tables(statement) as access:
+                cursor.execute(statement)
+            if written is not None:
+                written = written | access.writes if access.known else None
+            
+            if cursor.description is None:
+                if access.known:
+                    volume.append((classify_statement(statement), access.writes, conn.total_changes - changes))
+                results.append({"statement": statement, "affected_rows": max(cursor.rowcount, 0)})
+            elif format == OBJECTS:
+                columns = [column[0] for column in cursor.description]
+                results.append({
+                    "statement": statement,
+                    "columns": columns,
+                    "data": _fetch_objects(cursor, context)
+                })
+            else:
+                results.append({"statement": statement, **_fetch_values(cursor, context, format)})
+        
+        commit_write(conn, written, before)
+        for statement, tables, rows in volume:
+            record_write_volume(statement, tables, rows)
+        return {"results": results}
+    
+    except sqlite3.Error as e:
+        conn.rollback()
+        if context is not None and context.cancelled:
+            error = "Query cancelled"
+        elif context is not None and context.timed_out:
+            error = f"Query timed out after {context.timeout:g} seconds"
+        else:
+            error = f"Database error: {str(e)}"
+        return {"error": error, "statement_index": index}
+    finally:
+        if context is not None:
+            conn.set_progress_handler(None, 0)
+            context.detach()
+        close_db_connection(conn, discard=changes_session)
+
+
+def _limit_cached(
+    result: Union[List[Dict[str, Any]], Dict[str, Any]],
+    format: str,
+    context: QueryContext
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Apply a request's row and byte limits to a full cached result"""
+    if format == OBJECTS:
+        limited = []
+        for row in result:
+            if not context.accept_row(row):
+                break
+            limited.append(row)
+        return limited
+    
+    rows = zip(*result["data"]) if format == COLUMNAR else result["data"]
+    accepted = 0
+    for row in rows:
+        if not context.accept_row(row):
+            break
+        accepted += 1
+    if not context.truncated:
+        return result
+    if format == COLUMNAR:
+        data = [values[:accepted] for values in result["data"]]
+    else:
+        data = result["data"][:accepted]
+    return {"columns": result["columns"], "data": data}
+
+
+def execute_query_cached(
+    query: str,
+    context: Optional[QueryContext] = None,
+    format: str = OBJECTS,
+    params: Optional[QueryParams] = None
+) -> Tuple[Union[List[Dict[str, Any]], Dict[str, Any]], bool]:
+    """
+    Execute an SQL query, serving deterministic SELECTs from the result cache
+    
+    Cached results are keyed by normalized query text, bound parameters and
+    result format.
+    Writes made through this process drop the results that read a written
+    table; a write from another process flushes the whole cache.
+    
+    Args:
+        query: SQL query string
+        context: Optional QueryContext for progress reporting and cancellation
+        format: Shape of the result (OBJECTS, ROWS or COLUMNAR); status
+            messages of other statements are converted to it as well
+        params: Optional values for the query's placeholders
+        
+    Returns:
+        Tuple of (result as returned by execute_query, whether it was a cache hit)
+    """
+    if not (result_cache.enabled and is_select_query(query) and is_deterministic(query)):
+        result = execute_query(query, context=context, format=format, params=params)
+        if format != OBJECTS and isinstance(result, list):
+            result = format_result(result, format)
+        return result, False
+    
+    key = normalize_query(query)
+    if params:
+        # 1, 1.0 and true are different parameters; JSON keeps them apart
+        key = (key, json.dumps(params, sort_keys=True))
+    if format != OBJECTS:
+        key = (format, key)
+    version = get_database_version()
+    
+    cached = result_cache.get(key, version)
+    if cached is not None:
+        if context is None:
+            return cached, True
+        return _limit_cached(cached, format, context), True
+    
+    access = TableAccess()
+    result = execute_query(query, access, context, format, params)
+    
+    # Only cache complete results whose source tables are known, and only
+    # if nothing was committed while the query ran
+    if (not (isinstance(result, dict) and "error" in result) and access.known
+            and not (context is not None and context.truncated)
+            and get_database_version() == version):
+        result_cache.put(key, version, result, estimate_size(result), access.reads)
+    
+    return result, False
+
+
+def execute_many(
+    query: str,
+    param_sets: Sequence[QueryParams],
+    context: Optional[QueryContext] = None
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Execute one write statement once per parameter set
+    
+    The statement is prepared once and all executions share one
+    transaction, so the whole batch costs a single commit and fails or
+    succeeds as a whole.
+    
+    Args:
+        query: INSERT, UPDATE, DELETE or REPLACE statement with placeholders
+        param_sets: One sequence or mapping of values per execution
+        context: Optional QueryContext with timeout and cancellation
+        
+    Returns:
+        List with a success message dictionary
+        Dictionary with error message if the statement fails
+    """
+    query = query.strip().rstrip(';')
+    statement = classify_statement(query)
+    
+    conn = get_db_connection(long_lived=context is not None and context.long_lived)
+    cursor = conn.cursor()
+    
+    try:
+        if context is not None:
+            if not context.attach(conn):
+                return {"error": "Query cancelled"}
+            context.start_timer()
+            conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+        
+        before = get_database_version()
+        changes = conn.total_changes
+        with conn.track_tables(query) as access:
+            cursor.executemany(query, param_sets)
+        written = access.writes if access.known else None
+        commit_write(conn, written, before)
+        
+        affected_rows = cursor.rowcount
+        record_write_volume(statement, written, conn.total_changes - changes)
+        return [{
+            "message": f"Statement executed {len(param_sets)} time(s). {affected_rows} row(s) affected.",
+            "type": "executemany",
+            "affected_rows": affected_rows
+        }]
+    
+    except sqlite3.Error as e:
+        if context is not None and context.cancelled:
+            return {"error": "Query cancelled"}
+        if context is not None and context.timed_out:
+            return {"error": f"Query timed out after {context.timeout:g} seconds"}
+        return {"error": f"Database error: {str(e)}"}
+    finally:
+        if context is not None:
+            conn.set_progress_handler(None, 0)
+            context.detach()
+        close_db_connection(conn, discard=statement.changes_session)
+
+
+def stream_query(
+    query: str,
+    batch_size: int = STREAM_BATCH_SIZE,
+    params: Optional[QueryParams] = None,
+    context: Optional[QueryContext] = None
+) -> Iterator[List[Any]]:
+    """
+    Execute a SELECT query and yield its results batch by batch
+    
+    The pooled connection stays checked out until the generator is exhausted
+    or closed, so callers must always close it. Rows are plain tuples; no
+    per-row dict is built. The context's timeout covers the whole stream,
+    so a stalled client cannot pin the connection indefinitely; its row
+    and byte limits do not apply.
+    
+    Args:
+        query: SQL SELECT query string
+        batch_size: Number of rows per fetchmany() call
+        params: Optional values for the query's placeholders
+        context: Optional timeout and cancellation for the statement
+        
+    Yields:
+        The list of column names first, then lists of row tuples
+        
+    Raises:
+        sqlite3.Error: If the query fails, times out or is cancelled
+    """
+    conn = get_db_connection(long_lived=True)
+    
+    try:
+        if context is not None:
+            if not context.attach(conn):
+                raise sqlite3.OperationalError("Query cancelled")
+            context.start_timer()
+            conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+        
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples, cheaper than sqlite3.Row
+        try:
+            cursor.execute(query.strip().rstrip(';'), () if params is None else params)
+            
+            yield [column[0] for column in cursor.description or []]
+            
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        except sqlite3.Error as e:
+            if context is None:
+                raise
+            raise context.abort_error(e) from e
+    finally:
+        if context is not None:
+            conn.set_progress_handler(None, 0)
+            context.detach()
         close_db_connection(conn)
 
 
+def fetch_table_names(cursor) -> List[str]:
+    """
+    Read the names of the user tables
+    
+    Args:
+        cursor: Cursor to query sqlite_master with
+        
+    Returns:
+        Sorted table names, excluding users, query_history and SQLite's
+        internal tables
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT IN ('users', 'query_history') ORDER BY name;"
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
 def get_table_names() -> List[str]:
     """
     Get list of all tables in the database
@@ -151,17 +1005,39 @@ def get_table_names() -> List[str]:
     cursor = conn.cursor()
     
     try:
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT IN ('users', 'query_history') ORDER BY name;"
-        )
-        tables = [row[0] for row in cursor.fetchall()]
-        return tables
+        return fetch_table_names(cursor)
     except sqlite3.Error as e:
         return []
     finally:
         close_db_connection(conn)
 
 
+def fetch_table_columns(cursor, table_name: str) -> List[Dict[str, Any]]:
+    """
+    Read the column definitions of a table
+    
+    Args:
+        cursor: Cursor to run PRAGMA table_info on
+        table_name: Name of the table
+        
+    Returns:
+        List of dictionaries with name, declared type, notnull,
+        default_value and primary_key
+    """
+    quoted = table_name.replace('"', '""')
+    cursor.execute(f'PRAGMA table_info("{quoted}");')
+    return [
+        {
+            "name": row[1],
+            "type": row[2],
+            "notnull": bool(row[3]),
+            "default_value": row[4],
+            "primary_key": bool(row[5])
+        }
+        for row in cursor.fetchall()
+    ]
+
+
 def get_table_info(table_name: str) -> Dict[str, Any]:
     """
     Get schema and sample data for a specific table
@@ -185,17 +1061,7 @@ def get_table_info(table_name: str) -> Dict[str, Any]:
             return {"error": f"Table '{table_name}' not found"}
         
         # Get column information
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        columns = [
-            {
-                "name": row[1],
-                "type": row[2],
-                "notnull": bool(row[3]),
-                "default_value": row[4],
-                "primary_key": bool(row[5])
-            }
-            for row in cursor.fetchall()
-        ]
+        columns = fetch_table_columns(cursor, table_name)
         
         # Get sample data (first 5 rows)
         cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
@@ -238,7 +1104,7 @@ def create_user(username: str, email: str, full_name: str, hashed_password: str)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (username, email, full_name, hashed_password, datetime.utcnow().isoformat(), True))
         
-        conn.commit()
+        commit_write(conn, ["users"], get_database_version())
         
         user_id = cursor.lastrowid
         
@@ -322,10 +1188,37 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
 
 # Query History Functions
 
+def _write_history_batch(records) -> None:
+    """Insert a batch of history records in a single transaction"""
+    conn = get_db_connection()
+    try:
+        conn.executemany("""
+            INSERT INTO query_history (username, query, success, error, rows_affected, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, records)
+        commit_write(conn, ["query_history"], get_database_version())
+    finally:
+        close_db_connection(conn)
+
+
+history_writer = HistoryWriter(
+    _write_history_batch,
+    flush_size=HISTORY_FLUSH_SIZE,
+    flush_interval=HISTORY_FLUSH_INTERVAL_MS / 1000,
+    max_queue=HISTORY_QUEUE_SIZE,
+    enqueue_timeout=HISTORY_ENQUEUE_TIMEOUT,
+    max_retries=HISTORY_WRITE_RETRIES,
+    retry_delay=HISTORY_RETRY_DELAY_MS / 1000,
+)
+
+
 def save_query_history(username: str, query: str, success: bool, error: Optional[str] = None, rows_affected: Optional[int] = None) -> bool:
     """
     Save query to history
     
+    While the history writer is running the record is only queued and
+    written with the next batch; otherwise it is written immediately.
+    
     Args:
         username: Username who executed the query
         query: SQL query string
@@ -334,25 +1227,18 @@ def save_query_history(username: str, query: str, success: bool, error: Optional
         rows_affected: Number of rows affected
         
     Returns:
-        True if saved successfully, False otherwise
+        True if saved (or queued) successfully, False otherwise
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    record = (username, query, success, error, rows_affected, datetime.utcnow().isoformat())
+    if history_writer.submit(record):
+        return True
     
     try:
-        cursor.execute("""
-            INSERT INTO query_history (username, query, success, error, rows_affected, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (username, query, success, error, rows_affected, datetime.utcnow().isoformat()))
-        
-        conn.commit()
+        _write_history_batch([record])
         return True
-        
     except sqlite3.Error as e:
         print(f"Error saving query history: {str(e)}")
         return False
-    finally:
-        close_db_connection(conn)
 
 
 def get_query_history(username: str, limit: int = 50) -> List[Dict[str, Any]]:
@@ -366,6 +1252,9 @@ def get_query_history(username: str, limit: int = 50) -> List[Dict[str, Any]]:
     Returns:
         List of query history items
     """
+    # Make queued records visible first
+    history_writer.flush()
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -407,6 +1296,9 @@ def clear_query_history(username: str) -> bool:
     Returns:
         True if cleared successfully, False otherwise
     """
+    # Write queued records first so they are cleared as well
+    history_writer.flush()
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -416,7 +1308,7 @@ def clear_query_history(username: str) -> bool:
             WHERE username = ?
         """, (username,))
         
-        conn.commit()
+        commit_write(conn, ["query_history"], get_database_version())
         return True
         
     except sqlite3.Error as e:
@@ -0,0 +1,54 @@
+"""
+Dedicated executor for blocking database work
+
+sqlite3 calls block the calling thread, so running them directly inside
+``async def`` endpoints stalls the event loop for every other request on the
+worker. Endpoints hand their database work to this size-limited thread pool
+instead, keeping the loop free to serve ``/health`` and other requests.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from .database import DB_LONG_LIVED_CONNECTIONS, DB_POOL_SIZE
+
+T = TypeVar("T")
+
+# One worker per connection left for short requests. A task holds at most
+# one such connection while it runs; streams, cursors, exports and jobs keep
+# theirs between tasks, but the pool caps those at DB_LONG_LIVED_CONNECTIONS
+# and refuses more instead of letting a worker wait. So the workers never
+# queue on the pool for each other, and a larger executor would only queue
+# there instead.
+DB_EXECUTOR_WORKERS = int(os.getenv(
+    "DB_EXECUTOR_WORKERS", str(max(1, DB_POOL_SIZE - DB_LONG_LIVED_CONNECTIONS))
+))
+
+db_executor = ThreadPoolExecutor(
+    max_workers=DB_EXECUTOR_WORKERS,
+    thread_name_prefix="sql-runner-db",
+)
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking database function on the database executor
+
+    Args:
+        func: Synchronous function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor() -> None:
+    """Wait for queued database work to finish and stop the worker threads"""
+    db_executor.shutdown(wait=True)
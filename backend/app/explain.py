@@ -0,0 +1,224 @@
+"""
+EXPLAIN QUERY PLAN as a tree with warnings
+
+SQLite reports a query plan as rows of (id, parent, notused, detail). The
+plan is returned as the tree those rows describe, and the steps that
+usually make a query slow are flagged so they can be fixed before the
+query runs:
+
+  full_scan        SCAN of a table: every row is read
+  temp_btree       USE TEMP B-TREE FOR ORDER BY / GROUP BY / DISTINCT: all
+                   result rows are collected and sorted before the first
+                   one is returned
+  automatic_index  AUTOMATIC ... INDEX: SQLite builds a temporary index on
+                   every execution because no suitable one exists
+
+Plan details name tables by their alias, so aliases are resolved with the
+statement lexer against the tables the authorizer saw the statement read;
+full scans of analyzed tables then carry the row count from sqlite_stat1.
+Scans of names that resolve to no such table (CTEs, subqueries in FROM)
+are not flagged, since no index can be created on them.
+"""
+
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from .database import QueryParams, close_db_connection, get_db_connection
+from .statements import QUOTED, STRING, SYMBOL, WORD, classify_statement, tokenize, unquote
+
+# Statements that have a query plan
+EXPLAINABLE_KINDS = frozenset({"select", "insert", "update", "delete"})
+
+# Keywords that can follow a table name, so are never its alias
+_NOT_ALIASES = frozenset({
+    "WHERE", "JOIN", "ON", "USING", "LEFT", "RIGHT", "FULL", "INNER", "OUTER",
+    "CROSS", "NATURAL", "ORDER", "GROUP", "HAVING", "LIMIT", "WINDOW", "UNION",
+    "INTERSECT", "EXCEPT", "INDEXED", "NOT", "SET", "VALUES", "DEFAULT",
+    "SELECT", "RETURNING", "DO", "FROM",
+})
+
+
+def _table_aliases(sql: str, tables: List[str]) -> Dict[str, str]:
+    """Map lower-cased table names and their aliases to the tables as spelled in the query"""
+    known = {table.lower() for table in tables}
+    aliases: Dict[str, str] = {}
+    tokens = list(tokenize(sql))
+    for i, (kind, text) in enumerate(tokens):
+        table = unquote(kind, text)
+        if kind not in (WORD, QUOTED) or table.lower() not in known:
+            continue
+        aliases.setdefault(table.lower(), table)
+        j = i + 1
+        if j < len(tokens) and tokens[j] == (SYMBOL, "."):
+            continue  # A column qualified by the table name
+        if j < len(tokens) and tokens[j][0] == WORD and tokens[j][1].upper() == "AS":
+            j += 1
+        if j < len(tokens) and tokens[j][0] in (WORD, QUOTED, STRING):
+            alias = unquote(*tokens[j])
+            if tokens[j][0] != WORD or alias.upper() not in _NOT_ALIASES:
+                aliases.setdefault(alias.lower(), table)
+    # Tables read only through views or triggers
+    for table in known:
+        aliases.setdefault(table, table)
+    return aliases
+
+
+def _scanned_name(detail: str) -> Optional[str]:
+    """Table or alias a SCAN step reads, or None for constant rows and subqueries"""
+    if not detail.startswith("SCAN "):
+        return None
+    name = detail[5:].split(" USING ", 1)[0].strip()
+    if name == "CONSTANT ROW" or name.startswith("("):
+        return None
+    return name
+
+
+def _warnings(node: Dict[str, Any], aliases: Dict[str, str], rows: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Flag one plan step; returns the warnings it raises"""
+    detail = node["detail"]
+    found = []
+
+    name = _scanned_name(detail)
+    table = aliases.get(name.lower()) if name is not None else None
+    if table is not None:
+        found.append({
+            "kind": "full_scan",
+            "table": table,
+            "estimated_rows": rows.get(table.lower()),
+            "hint": (
+                f"Every entry of an index on {table} is read; an index on the "
+                f"filtered columns would let SQLite SEARCH instead"
+                if "COVERING INDEX" in detail else
+                f"Every row of {table} is read; an index on the columns in its "
+                f"WHERE or JOIN condition would let SQLite SEARCH instead"
+            ),
+        })
+
+    if "USE TEMP B-TREE FOR " in detail:
+        clause = detail.split(" FOR ", 1)[1]
+        found.append({
+            "kind": "temp_btree",
+            "table": None,
+            "estimated_rows": None,
+            "hint": (
+                f"All rows are collected in a temporary B-tree for {clause} before "
+                f"the first one is returned; an index matching the {clause} columns avoids it"
+            ),
+        })
+    elif "USING TEMP B-TREE" in detail:
+        operator = detail.split()[0]
+        found.append({
+            "kind": "temp_btree",
+            "table": None,
+            "estimated_rows": None,
+            "hint": (
+                f"{operator} removes duplicate rows in a temporary B-tree; UNION ALL "
+                f"avoids it when duplicates cannot occur or do not matter"
+                if operator == "UNION" else
+                f"{operator} compares the results in a temporary B-tree"
+            ),
+        })
+
+    target = detail.split()[1] if len(detail.split()) > 1 else ""
+    table = aliases.get(target.lower())
+    if "AUTOMATIC" in detail and "INDEX" in detail and table is not None:
+        found.append({
+            "kind": "automatic_index",
+            "table": table,
+            "estimated_rows": rows.get(table.lower()),
+            "hint": (
+                f"SQLite builds a temporary index on {table} every time the query "
+                f"runs; create it with CREATE INDEX to build it once"
+            ),
+        })
+
+    for warning in found:
+        warning["id"] = node["id"]
+        warning["detail"] = detail
+    node["flags"] = [warning["kind"] for warning in found]
+    return found
+
+
+def build_plan_tree(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Turn EXPLAIN QUERY PLAN rows into a tree
+
+    Args:
+        rows: (id, parent, notused, detail) rows in the order SQLite returned them
+
+    Returns:
+        Top-level nodes, each with id, detail, flags (empty) and children
+    """
+    nodes: Dict[int, Dict[str, Any]] = {}
+    roots = []
+    for node_id, parent, _, detail in rows:
+        node = {"id": node_id, "detail": detail, "flags": [], "children": []}
+        nodes[node_id] = node
+        (nodes[parent]["children"] if parent in nodes else roots).append(node)
+    return roots
+
+
+def explain_query(query: str, params: Optional[QueryParams] = None) -> Dict[str, Any]:
+    """
+    Get the query plan of a statement without running it
+
+    Args:
+        query: SELECT, INSERT, UPDATE or DELETE statement
+        params: Optional values for its placeholders
+
+    Returns:
+        Dictionary with statement_type, plan (the tree), warnings and
+        execution_time
+        Dictionary with error message if the statement cannot be planned
+    """
+    started = time.perf_counter()
+    query = query.strip().rstrip(';')
+    statement = classify_statement(query)
+    if statement.kind == "explain":
+        return {"error": "Pass the statement itself; EXPLAIN QUERY PLAN is added for you"}
+    if statement.kind not in EXPLAINABLE_KINDS:
+        return {"error": "Only SELECT, INSERT, UPDATE and DELETE statements have a query plan"}
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        with conn.track_tables(query) as access:
+            cursor.execute(f"EXPLAIN QUERY PLAN {query}", () if params is None else params)
+        plan = build_plan_tree(cursor.fetchall())
+
+        tables = sorted(access.reads | access.writes)
+        analyzed_rows: Dict[str, int] = {}
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if tables and cursor.fetchone():
+            placeholders = ", ".join("?" for _ in tables)
+            cursor.execute(
+                f"SELECT tbl, stat FROM sqlite_stat1 WHERE lower(tbl) IN ({placeholders})",
+                [table.lower() for table in tables],
+            )
+            for table, stat in cursor.fetchall():
+                head = stat.split()[0] if stat else ""
+                if head.isdigit():
+                    analyzed_rows[table.lower()] = max(int(head), analyzed_rows.get(table.lower(), 0))
+    except sqlite3.Error as e:
+        return {"error": f"Database error: {str(e)}"}
+    finally:
+        close_db_connection(conn)
+
+    aliases = _table_aliases(query, tables)
+    warnings: List[Dict[str, Any]] = []
+
+    def flag(nodes: List[Dict[str, Any]]) -> None:
+        for node in nodes:
+            warnings.extend(_warnings(node, aliases, analyzed_rows))
+            flag(node["children"])
+
+    flag(plan)
+
+    return {
+        "statement_type": statement.kind,
+        "plan": plan,
+        "warnings": warnings,
+        "execution_time": time.perf_counter() - started,
+    }
@@ -0,0 +1,413 @@
+"""
+Export of SELECT results as Arrow IPC, Parquet or CSV
+
+Analytics clients load columnar files far faster than JSON rows, and people
+downloading a table usually want a plain CSV file. An export runs the
+SELECT on a pooled connection, encodes every fetchmany() batch as soon as
+it is fetched and hands the resulting bytes out as they are produced, so
+memory use is bounded by one batch whatever the size of the result.
+The query timeout covers the whole export, so a client that stops reading
+cannot keep the connection checked out forever.
+
+Arrow types come from the declared types of the result columns and fall
+back to what the first batch contains. The sqlite3 module does not expose
+sqlite3_column_decltype(), so the declared types are read with PRAGMA
+table_info from a temporary view over the query: a column taken straight
+from a table keeps its declared type there, computed columns have none.
+pyarrow is an optional dependency; without it only CSV is available.
+
+Encoding is deterministic (the gzip header carries no timestamp), so an
+export of unchanged tables produces the same bytes every time. Its ETag is
+derived from the query and the versions of the tables it reads, which is
+what lets an interrupted download resume with an HTTP Range request. Table
+versions are only known to this process, so ETags change when it restarts;
+an export whose query started while another write committed, or that
+reads the result of a clock function, gets no ETag at all.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple
+
+from .cache import is_deterministic, normalize_query
+from .database import (
+    PROGRESS_HANDLER_INTERVAL,
+    QueryContext,
+    fetch_table_columns,
+    get_db_connection,
+    close_db_connection,
+    get_database_version,
+    get_tables_version,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+# Rows per fetchmany() call, and so per record batch / Parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '10000'))
+EXPORT_GZIP_LEVEL = int(os.getenv('EXPORT_GZIP_LEVEL', '6'))
+# Complete export sizes remembered by ETag for Range requests
+EXPORT_SIZE_CACHE = int(os.getenv('EXPORT_SIZE_CACHE', '256'))
+
+# Tables ANALYZE writes; their versions are part of export ETags
+_STAT_TABLES = frozenset({"sqlite_stat1", "sqlite_stat4"})
+
+# Export formats
+ARROW = "arrow"
+PARQUET = "parquet"
+CSV = "csv"
+
+EXPORT_MEDIA_TYPES = {
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+    CSV: "text/csv; charset=utf-8",
+}
+EXPORT_EXTENSIONS = {ARROW: "arrows", PARQUET: "parquet", CSV: "csv"}
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when pyarrow is needed but not installed"""
+
+
+class ExportSizes:
+    """
+    Total sizes of complete exports, by ETag
+
+    A Range request needs the full length of the file for Content-Range.
+    Once an export has been produced completely its size is remembered, so
+    resuming it only generates the bytes that are actually sent.
+    """
+
+    def __init__(self, max_entries: int = EXPORT_SIZE_CACHE):
+        self.max_entries = max_entries
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str) -> Optional[int]:
+        with self._lock:
+            size = self._sizes.get(etag)
+            if size is not None:
+                self._sizes.move_to_end(etag)
+            return size
+
+    def put(self, etag: str, size: int) -> None:
+        with self._lock:
+            self._sizes[etag] = size
+            self._sizes.move_to_end(etag)
+            while len(self._sizes) > self.max_entries:
+                self._sizes.popitem(last=False)
+
+
+export_sizes = ExportSizes()
+
+
+def arrow_type_for(declared: Optional[str]):
+    """
+    Map a declared SQLite column type to an Arrow type
+
+    Follows SQLite's type affinity rules. Columns without a declared type,
+    BLOB columns and NUMERIC-affinity columns other than booleans can hold
+    values of any type, so they return None and are inferred from the data.
+    """
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+        return pa.string()
+    if not declared or "BLOB" in declared:
+        return None
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pa.float64()
+    if "BOOL" in declared:
+        return pa.bool_()
+    return None
+
+
+class _ChunkSink:
+    """Write-only file object that collects what pyarrow writes to it"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        """Return and forget everything written since the last call"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _to_array(name: str, values: List[Any], arrow_type):
+    """
+    Build one column of a record batch
+
+    Values are converted with type inference and then cast safely, so a
+    REAL stored in an INTEGER column raises instead of being truncated.
+    SQLite allows mixed types in one column; for text columns other values
+    are exported as their string form.
+    """
+    try:
+        array = pa.array(values)
+        return array if array.type == arrow_type else array.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        if arrow_type != pa.string():
+            raise ValueError(
+                f"Column '{name}' holds values that do not fit {arrow_type}; "
+                f"CAST it in the query to export it"
+            )
+    return pa.array(
+        [
+            None if value is None
+            else value.decode("utf-8", errors="replace") if isinstance(value, bytes)
+            else str(value)
+            for value in values
+        ],
+        type=pa.string(),
+    )
+
+
+class _ArrowEncoder:
+    """Encodes row batches as an Arrow IPC stream or a Parquet file"""
+
+    def __init__(self, format: str, columns: List[str], declared: List[Optional[str]], first_batch: List[tuple]):
+        self.schema = self._schema(columns, declared, first_batch)
+        self._sink = _ChunkSink()
+        if format == PARQUET:
+            self._writer = pq.ParquetWriter(self._sink, self.schema)
+        else:
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    @staticmethod
+    def _schema(columns: List[str], declared: List[Optional[str]], batch: List[tuple]):
+        """Arrow schema from declared types, inferring the rest from the first batch"""
+        fields = []
+        for index, name in enumerate(columns):
+            arrow_type = arrow_type_for(declared[index]) if index < len(declared) else None
+            if arrow_type is None:
+                try:
+                    inferred = pa.array([row[index] for row in batch]).type
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    inferred = pa.null()  # Mixed types: export as text
+                arrow_type = pa.string() if inferred == pa.null() else inferred
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    def encode(self, batch: List[tuple]) -> bytes:
+        arrays = [
+            _to_array(field.name, list(values), field.type)
+            for field, values in zip(self.schema, zip(*batch))
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self._sink.take()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+    def abort(self) -> None:
+        try:
+            self._writer.close()
+        except (pa.ArrowException, sqlite3.Error):
+            pass
+
+
+class _CsvEncoder:
+    """Encodes row batches as UTF-8 CSV with a header row, optionally gzipped"""
+
+    def __init__(self, columns: List[str], compress: bool):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        # wbits=31 selects the gzip container; zlib leaves its mtime at 0
+        self._compressor = (
+            zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        )
+        self._writer.writerow(columns)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return self._compressor.compress(data) if self._compressor else data
+
+    def encode(self, batch: List[tuple]) -> bytes:
+        self._writer.writerows(batch)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        data = self._drain()
+        return data + self._compressor.flush() if self._compressor else data
+
+    def abort(self) -> None:
+        pass
+
+
+class QueryExport:
+    """
+    Export of one SELECT as an Arrow IPC stream, a Parquet file or CSV
+
+    ``chunks`` is a generator of file bytes that holds a pooled connection
+    until it is exhausted or closed. The first chunk is only produced once
+    the statement has run and its first batch has been encoded, so SQL and
+    type errors surface before any bytes are sent. From then on ``etag``
+    identifies the output (None when the query is not deterministic) and
+    ``rows`` counts the rows exported so far. ``context`` bounds the
+    export with its timeout and lets it be cancelled.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        format: str = ARROW,
+        compress: bool = False,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        context: Optional[QueryContext] = None,
+    ):
+        if format not in EXPORT_MEDIA_TYPES:
+            raise ValueError(f"Unknown export format '{format}'")
+        if format != CSV and pa is None:
+            raise ExportUnavailableError("Arrow and Parquet export require the pyarrow package")
+        if compress and format != CSV:
+            raise ValueError("Only CSV exports can be gzip-compressed")
+        self.query = query
+        self.format = format
+        self.compress = compress
+        self.batch_size = batch_size
+        self.context = context
+        self.rows = 0
+        self.etag: Optional[str] = None
+        self.chunks = self._generate()
+
+    @property
+    def media_type(self) -> str:
+        return GZIP_MEDIA_TYPE if self.compress else EXPORT_MEDIA_TYPES[self.format]
+
+    @property
+    def filename(self) -> str:
+        return f"export.{EXPORT_EXTENSIONS[self.format]}" + (".gz" if self.compress else "")
+
+    def _declared_types(self, conn, query: str) -> List[Optional[str]]:
+        """Declared type of each result column, in cursor.description order"""
+        view = f"_export_{uuid.uuid4().hex}"
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'CREATE TEMP VIEW "{view}" AS {query}')
+        except sqlite3.Error:
+            # Let the query itself report the problem; types are then inferred
+            return []
+        try:
+            return [column["type"] for column in fetch_table_columns(cursor, view)]
+        finally:
+            cursor.execute(f'DROP VIEW temp."{view}"')
+
+    def _make_etag(self, access, before: Tuple[int, int]) -> Optional[str]:
+        """
+        Strong validator for the exported bytes, or None if they can vary
+
+        Args:
+            access: Tables the query read, from track_tables()
+            before: Database version read before the query started reading
+        """
+        if not is_deterministic(self.query):
+            return None
+        # A commit between reading ``before`` and now may or may not be in
+        # the query's snapshot, so the token cannot be trusted to describe it
+        if get_database_version() != before:
+            return None
+        # ANALYZE writes the statistics tables and can change the plan, and
+        # with it the order of rows the query does not sort
+        tables_version = get_tables_version(access.reads | _STAT_TABLES if access.known else None)
+        # Schema changes such as a new index can change the row order
+        schema_version = get_database_version()[1]
+        key = repr((
+            normalize_query(self.query), self.format, self.compress,
+            self.batch_size, schema_version, tables_version,
+        ))
+        return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+    def _generate(self) -> Iterator[bytes]:
+        conn = get_db_connection(long_lived=True)
+        context = self.context
+
+        try:
+            if context is not None:
+                if not context.attach(conn):
+                    raise sqlite3.OperationalError("Query cancelled")
+                context.start_timer()
+                conn.set_progress_handler(context.check_progress, PROGRESS_HANDLER_INTERVAL)
+            yield from self._encode(conn)
+        except sqlite3.Error as e:
+            if context is None:
+                raise
+            raise context.abort_error(e) from e
+        finally:
+            if context is not None:
+                conn.set_progress_handler(None, 0)
+                context.detach()
+            close_db_connection(conn)
+
+    def _encode(self, conn) -> Iterator[bytes]:
+        """Run the query on conn and yield the encoded file"""
+        encoder = None
+
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, cheaper than sqlite3.Row
+            query = self.query.strip().rstrip(';')
+            declared = self._declared_types(conn, query) if self.format != CSV else []
+            before = get_database_version()
+            with conn.track_tables(query) as access:
+                cursor.execute(query)
+            self.etag = self._make_etag(access, before)
+
+            columns = [column[0] for column in cursor.description or []]
+            batch = cursor.fetchmany(self.batch_size)
+            if self.format == CSV:
+                encoder = _CsvEncoder(columns, self.compress)
+            else:
+                encoder = _ArrowEncoder(self.format, columns, declared, batch)
+
+            while batch:
+                chunk = encoder.encode(batch)
+                self.rows += len(batch)
+                batch = cursor.fetchmany(self.batch_size)
+                if not batch:
+                    chunk += encoder.finish()
+                    encoder = None
+                yield chunk
+
+            if encoder is not None:
+                # Empty result: header (or schema) only
+                chunk = encoder.finish()
+                encoder = None
+                yield chunk
+        finally:
+            if encoder is not None:
+                encoder.abort()
@@ -0,0 +1,145 @@
+"""
+Process pool for password hashing
+
+bcrypt is deliberately expensive (a few hundred milliseconds of CPU per
+hash or verify). Run inside an ``async def`` endpoint it freezes the event
+loop, and on a thread it still competes for the GIL with everything else.
+Login and signup therefore hand bcrypt work to a small process pool. A
+concurrency limit keeps a burst of logins from occupying every core: excess
+callers wait in line for a bounded time and are turned away when the line
+is full.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .auth import get_password_hash, verify_password
+
+# Hashing configuration
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_WAITING = int(os.getenv('PASSWORD_HASH_MAX_WAITING', '64'))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '10'))
+
+
+class PasswordHashBusyError(Exception):
+    """Raised when too many hash operations are already waiting"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hash/verify calls on a bounded process pool
+
+    At most ``workers`` operations run at once. Up to ``max_waiting`` more
+    wait for a slot, each for at most ``queue_timeout`` seconds, before
+    PasswordHashBusyError is raised.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_waiting: int = PASSWORD_HASH_MAX_WAITING,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._running = 0
+
+        # Counters reported by stats()
+        self._rejected = 0
+        self._ops: Dict[str, Dict[str, float]] = {
+            op: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+            for op in ("hash", "verify")
+        }
+
+    def start(self) -> None:
+        """Create the worker processes' executor and the concurrency limit"""
+        if self._executor is not None:
+            return
+        # spawn, not fork: the server process holds SQLite connections and
+        # threads that must not be duplicated into the workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._semaphore = asyncio.Semaphore(self.workers)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._semaphore = None
+
+    async def hash(self, password: str) -> str:
+        """Hash a password for storing"""
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a plain password against its hash"""
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def _run(self, op: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Wait for a free slot, then run func on the process pool"""
+        self.start()
+        if self._waiting >= self.max_waiting:
+            self._rejected += 1
+            raise PasswordHashBusyError("Too many authentication requests in progress")
+
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise PasswordHashBusyError("Timed out waiting for an authentication slot")
+        finally:
+            self._waiting -= 1
+
+        started = time.perf_counter()
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+            finished = time.perf_counter()
+            self._record(op, (started - queued) * 1000, (finished - queued) * 1000)
+
+    def _record(self, op: str, wait_ms: float, total_ms: float) -> None:
+        stats = self._ops[op]
+        stats["count"] += 1
+        stats["total_ms"] += total_ms
+        stats["max_ms"] = max(stats["max_ms"], total_ms)
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return concurrency and latency metrics for hash and verify calls"""
+        result: Dict[str, Any] = {
+            "workers": self.workers,
+            "running": self._running,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+        }
+        for op, stats in self._ops.items():
+            count = stats["count"]
+            result[op] = {
+                "count": int(count),
+                "avg_ms": round(stats["total_ms"] / count, 3) if count else 0.0,
+                "max_ms": round(stats["max_ms"], 3),
+                "avg_wait_ms": round(stats["total_wait_ms"] / count, 3) if count else 0.0,
+                "max_wait_ms": round(stats["max_wait_ms"], 3),
+            }
+        return result
+
+
+password_hasher = PasswordHasher()
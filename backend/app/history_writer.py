@@ -0,0 +1,186 @@
+"""
+Write-behind buffer for query history
+
+Recording history used to cost a connection checkout, an INSERT and a
+commit (an fsync) on every /query/execute call. The HistoryWriter instead
+collects records in memory and a background thread writes them in batches,
+one transaction per batch, whenever enough records have piled up or the
+flush interval has passed. A batch that fails to write (the database is
+locked by an import or ANALYZE, say) is retried with exponential backoff
+and only dropped once every attempt failed.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("sql_runner")
+
+
+class HistoryWriter:
+    """
+    Buffers history records and flushes them in batches from a background thread
+
+    ``write_batch`` receives a list of records and must persist them in a
+    single transaction. When the buffer is full, submit() blocks for up to
+    ``enqueue_timeout`` seconds (backpressure); if there is still no room the
+    record is written synchronously rather than lost. A failed write is tried
+    again up to ``max_retries`` times, waiting ``retry_delay`` seconds before
+    the first retry and twice as long before each further one.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[Sequence[tuple]], None],
+        flush_size: int = 100,
+        flush_interval: float = 0.2,
+        max_queue: int = 10000,
+        enqueue_timeout: float = 1.0,
+        max_retries: int = 5,
+        retry_delay: float = 0.05,
+    ):
+        self.write_batch = write_batch
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._buffer: List[tuple] = []
+        self._cond = threading.Condition(threading.Lock())
+        # Held while a batch is being written so flush() can wait for it
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Counters reported by stats()
+        self._flushes = 0
+        self._records_written = 0
+        self._sync_writes = 0
+        self._errors = 0
+        self._retries = 0
+        self._records_dropped = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="sql-runner-history", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and write everything still buffered"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def submit(self, record: tuple) -> bool:
+        """
+        Queue a record for writing
+
+        Returns:
+            False if the writer is not running; the caller should write the
+            record itself
+        """
+        if not self.running:
+            return False
+
+        with self._cond:
+            has_room = self._cond.wait_for(
+                lambda: len(self._buffer) < self.max_queue,
+                timeout=self.enqueue_timeout,
+            )
+            if has_room:
+                self._buffer.append(record)
+                if len(self._buffer) >= self.flush_size:
+                    self._cond.notify_all()
+                return True
+            self._sync_writes += 1
+
+        logger.warning("History buffer full, writing record synchronously")
+        with self._write_lock:
+            self._write([record])
+        return True
+
+    def flush(self) -> None:
+        """Write all buffered records now and wait until they are committed"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                self._cond.notify_all()
+            if batch:
+                self._write(batch)
+
+    def _run(self) -> None:
+        """Background loop: flush every flush_size records or flush_interval seconds"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._buffer) >= self.flush_size,
+                    timeout=self.flush_interval,
+                )
+                if self._stopping:
+                    return
+            self.flush()
+
+    def _write(self, batch: List[tuple]) -> None:
+        """Persist one batch, retrying failures, and record timing (write lock held)"""
+        start = time.perf_counter()
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_batch(batch)
+                break
+            except Exception as e:
+                self._errors += 1
+                if attempt == self.max_retries:
+                    self._records_dropped += len(batch)
+                    logger.exception(
+                        f"Error writing {len(batch)} query history record(s); "
+                        f"dropping them after {attempt + 1} attempt(s)"
+                    )
+                    return
+                self._retries += 1
+                logger.warning(f"Error writing {len(batch)} query history record(s), retrying in {delay:.3f}s: {e}")
+                time.sleep(delay)
+                delay *= 2
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._flushes += 1
+        self._records_written += len(batch)
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and flush metrics"""
+        with self._cond:
+            queue_depth = len(self._buffer)
+        return {
+            "running": self.running,
+            "queue_depth": queue_depth,
+            "max_queue": self.max_queue,
+            "flushes": self._flushes,
+            "records_written": self._records_written,
+            "sync_writes": self._sync_writes,
+            "errors": self._errors,
+            "retries": self._retries,
+            "records_dropped": self._records_dropped,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+            "max_flush_ms": round(self._max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self._flushes, 3) if self._flushes else 0.0,
+        }
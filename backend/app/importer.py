@@ -0,0 +1,332 @@
+"""
+Bulk import of CSV and NDJSON files into a table
+
+Loading data through /query/execute means one INSERT per request, each on
+its own connection with its own commit. An import instead streams the
+uploaded file through executemany() in batches inside one transaction, so
+the whole file costs a single commit and only one batch of rows is held in
+memory at a time.
+
+A missing table is created with column types inferred from the first rows
+of the file. While the import runs its connection uses synchronous=OFF:
+the load is still atomic, but a power failure shortly after it finished
+may lose it. Indexes asked for are built after the rows are in, which is
+much cheaper than keeping them up to date row by row.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+from itertools import chain, islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .database import (
+    CONNECTION_PRAGMAS,
+    commit_write,
+    fetch_table_columns,
+    get_database_version,
+    get_db_connection,
+    close_db_connection,
+    write_volume,
+)
+
+# Rows per executemany() call, and rows read to infer column types
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '5000'))
+IMPORT_SAMPLE_ROWS = int(os.getenv('IMPORT_SAMPLE_ROWS', '1000'))
+
+# Import formats
+CSV = "csv"
+NDJSON = "ndjson"
+
+IMPORT_EXTENSIONS = {".csv": CSV, ".ndjson": NDJSON, ".jsonl": NDJSON}
+
+# Tables the application owns; they cannot be imported into
+PROTECTED_TABLES = {"users", "query_history"}
+
+# Integers without leading zeros (so ZIP codes and IDs like 007 stay
+# text) and decimal numbers; NaN and infinity are left as text
+_INTEGER = re.compile(r"[+-]?(?:0|[1-9][0-9]*)")
+_REAL = re.compile(r"[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _value_type(value: Any, parse_text: bool) -> Optional[str]:
+    """SQLite type of one value, or None for NULL"""
+    if value is None:
+        return None
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    if not isinstance(value, str) or not parse_text:
+        return "TEXT"
+    if _INTEGER.fullmatch(value):
+        return "INTEGER" if -2**63 <= int(value) < 2**63 else "TEXT"
+    if _REAL.fullmatch(value):
+        return "REAL"
+    return "TEXT"
+
+
+def infer_column_type(values: Iterable[Any], parse_text: bool = True) -> str:
+    """
+    Narrowest SQLite type that holds every non-NULL value
+
+    Args:
+        values: Sample values of one column
+        parse_text: Whether strings that look like numbers count as numbers
+            (CSV fields are always strings; NDJSON strings are text)
+
+    Returns:
+        "INTEGER", "REAL" or "TEXT" (also for columns with only NULLs)
+    """
+    found = None
+    for value in values:
+        kind = _value_type(value, parse_text)
+        if kind is None or kind == found:
+            continue
+        if found is None:
+            found = kind
+        elif {found, kind} == {"INTEGER", "REAL"}:
+            found = "REAL"
+        else:
+            return "TEXT"
+    return found or "TEXT"
+
+
+def _column_names(header: Sequence[str]) -> List[str]:
+    columns = [name.strip() or f"column_{index + 1}" for index, name in enumerate(header)]
+    seen = set()
+    for name in columns:
+        if name.lower() in seen:
+            raise ValueError(f"Column '{name}' appears more than once in the header")
+        seen.add(name.lower())
+    return columns
+
+
+def _read_csv(text: Iterable[str], delimiter: str) -> Tuple[List[str], Iterator[tuple]]:
+    """Column names from the header row, and the remaining rows (empty fields are NULL)"""
+    reader = csv.reader(text, delimiter=delimiter)
+    try:
+        columns = _column_names(next(reader))
+    except StopIteration:
+        raise ValueError("The file is empty")
+
+    def rows() -> Iterator[tuple]:
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(columns):
+                raise ValueError(
+                    f"Line {reader.line_num}: expected {len(columns)} fields, found {len(row)}"
+                )
+            yield tuple(None if value == "" else value for value in row)
+
+    return columns, rows()
+
+
+def _read_ndjson(text: Iterable[str], sample_size: int) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    Column names and rows of a file with one JSON object per line
+
+    Columns are the keys seen in the first ``sample_size`` objects, in the
+    order they first appear. Nested objects and arrays are stored as JSON.
+    """
+    def objects() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e})")
+            if not isinstance(value, dict):
+                raise ValueError(f"Line {number}: expected a JSON object")
+            yield number, value
+
+    remaining = objects()
+    sample = list(islice(remaining, sample_size))
+    if not sample:
+        raise ValueError("The file is empty")
+    columns = list(dict.fromkeys(key for _, value in sample for key in value))
+    _column_names(columns)
+    known = set(columns)
+
+    def rows() -> Iterator[tuple]:
+        for number, value in chain(sample, remaining):
+            unknown = value.keys() - known
+            if unknown:
+                raise ValueError(
+                    f"Line {number}: column '{sorted(unknown)[0]}' does not appear "
+                    f"in the first {sample_size} lines"
+                )
+            yield tuple(
+                json.dumps(item, ensure_ascii=False) if isinstance(item, (dict, list)) else item
+                for item in (value.get(column) for column in columns)
+            )
+
+    return columns, rows()
+
+
+def _index_exists(cursor, index_name: str, table_name: str, column: str) -> bool:
+    """
+    Whether the index an import would create is already there
+
+    Raises:
+        ValueError: If an index of that name exists but on something else
+    """
+    cursor.execute(
+        "SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND name = ? COLLATE NOCASE",
+        (index_name,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    cursor.execute("SELECT name FROM pragma_index_info(?)", (index_name,))
+    indexed = [(name or "").lower() for name, in cursor.fetchall()]
+    if row[0].lower() != table_name.lower() or indexed != [column.lower()]:
+        raise ValueError(f"Index '{index_name}' already exists on other columns")
+    return True
+
+
+def import_file(
+    file: BinaryIO,
+    table_name: str,
+    format: str = CSV,
+    create: bool = True,
+    indexes: Sequence[str] = (),
+    delimiter: str = ",",
+    batch_size: int = IMPORT_BATCH_SIZE,
+    sample_size: int = IMPORT_SAMPLE_ROWS,
+) -> Dict[str, Any]:
+    """
+    Load a CSV or NDJSON file into a table in one transaction
+
+    CSV files need a header row; its names must match columns of an
+    existing table. Any error rolls the whole import back.
+
+    Args:
+        file: Binary file positioned at the start of UTF-8 data
+        table_name: Table to load into
+        format: CSV or NDJSON
+        create: Create the table if it does not exist
+        indexes: Columns to index once the rows are loaded
+        delimiter: CSV field delimiter
+        batch_size: Rows per executemany() call
+        sample_size: Rows used to infer the types of a new table
+
+    Returns:
+        Dictionary with table, created, columns, rows_imported,
+        indexes_created, execution_time and rows_per_second
+        Dictionary with error message if the import fails
+    """
+    if table_name.lower() in PROTECTED_TABLES or table_name.lower().startswith("sqlite_"):
+        return {"error": f"Cannot import into table '{table_name}'"}
+
+    started = time.perf_counter()
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if format == CSV:
+            columns, rows = _read_csv(text, delimiter)
+        elif format == NDJSON:
+            columns, rows = _read_ndjson(text, sample_size)
+        else:
+            raise ValueError(f"Unknown import format '{format}'")
+        sample = list(islice(rows, sample_size))
+        rows = chain(sample, rows)
+        types = [
+            infer_column_type((row[index] for row in sample), parse_text=format == CSV)
+            for index in range(len(columns))
+        ]
+
+        cursor.execute("PRAGMA synchronous=OFF")
+        before = get_database_version()
+        cursor.execute("BEGIN IMMEDIATE")
+
+        existing = {column["name"].lower(): column for column in fetch_table_columns(cursor, table_name)}
+        created = not existing
+        if created:
+            if not create:
+                raise ValueError(f"Table '{table_name}' not found")
+            definitions = ", ".join(f"{_quote(name)} {kind}" for name, kind in zip(columns, types))
+            cursor.execute(f"CREATE TABLE {_quote(table_name)} ({definitions})")
+            table_columns = [{"name": name, "type": kind} for name, kind in zip(columns, types)]
+        else:
+            missing = [name for name in columns if name.lower() not in existing]
+            if missing:
+                raise ValueError(f"Table '{table_name}' has no column '{missing[0]}'")
+            columns = [existing[name.lower()]["name"] for name in columns]
+            table_columns = [
+                {"name": column["name"], "type": column["type"]} for column in existing.values()
+            ]
+
+        insert = (
+            f"INSERT INTO {_quote(table_name)} ({', '.join(_quote(name) for name in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        imported = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            cursor.executemany(insert, batch)
+            imported += len(batch)
+
+        index_names = []
+        table_names = {column["name"].lower(): column["name"] for column in table_columns}
+        for column in indexes:
+            if column.lower() not in table_names:
+                raise ValueError(f"Cannot index unknown column '{column}'")
+            column = table_names[column.lower()]
+            index_name = f"idx_{table_name}_{column}"
+            if _index_exists(cursor, index_name, table_name, column):
+                continue
+            cursor.execute(f"CREATE INDEX {_quote(index_name)} ON {_quote(table_name)} ({_quote(column)})")
+            index_names.append(index_name)
+
+        written = [table_name]
+        if created or index_names:
+            written.append("sqlite_master")
+        commit_write(conn, written, before)
+        write_volume.record([table_name], imported)
+
+        elapsed = time.perf_counter() - started
+        return {
+            "table": table_name,
+            "created": created,
+            "columns": table_columns,
+            "rows_imported": imported,
+            "indexes_created": index_names,
+            "execution_time": elapsed,
+            "rows_per_second": round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    except sqlite3.Error as e:
+        return {"error": f"Database error: {str(e)}"}
+    except UnicodeDecodeError:
+        return {"error": "The file is not valid UTF-8"}
+    except csv.Error as e:
+        return {"error": f"Invalid CSV file: {str(e)}"}
+    except ValueError as e:
+        return {"error": str(e)}
+    finally:
+        # A connection left at synchronous=OFF must not go back to the pool,
+        # and a failing reset must not hide the import's own error
+        restored = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            cursor.execute(f"PRAGMA synchronous={CONNECTION_PRAGMAS['synchronous']}")
+        except sqlite3.Error:
+            restored = False
+        text.detach()
+        close_db_connection(conn, discard=not restored)
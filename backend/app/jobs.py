@@ -0,0 +1,224 @@
+"""
+Background query jobs
+
+Long-running queries can be submitted as jobs instead of holding an HTTP
+request open until they finish. Jobs run on their own small worker pool,
+report their progress while running, can be cancelled (which interrupts the
+statement inside SQLite), and keep their results around for a limited time
+after they finish.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from .database import QueryContext, execute_query_cached, save_query_history
+
+# Job configuration
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', '600'))
+JOB_MAX_ACTIVE_PER_USER = int(os.getenv('JOB_MAX_ACTIVE_PER_USER', '5'))
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has too many active jobs"""
+
+
+class Job:
+    """A query submitted for background execution"""
+
+    def __init__(self, username: str, query: str, context: QueryContext):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.query = query
+        self.status = PENDING
+        self.context = context
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[Union[List[Dict[str, Any]], Dict[str, str]]] = None
+        self.cached = False
+        self.future: Optional[Future] = None
+        self._finished_monotonic: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """Seconds spent running so far (or in total, once finished)"""
+        if self.started_at is None:
+            return None
+        end = self.finished_at or datetime.utcnow()
+        return (end - self.started_at).total_seconds()
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.utcnow()
+        self._finished_monotonic = time.monotonic()
+
+
+class JobManager:
+    """
+    Runs query jobs on a dedicated worker pool and tracks their state
+
+    Every running job holds one long-lived pooled connection, shared with
+    streams, cursors and exports (DB_LONG_LIVED_CONNECTIONS), so the number
+    of workers should stay well below that.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        result_ttl: float = JOB_RESULT_TTL,
+        max_active_per_user: int = JOB_MAX_ACTIVE_PER_USER,
+    ):
+        self.result_ttl = result_ttl
+        self.max_active_per_user = max_active_per_user
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-runner-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, job: Job) -> None:
+        """Execute a job on a worker thread"""
+        with self._lock:
+            if job.status != PENDING:
+                return
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+
+        try:
+            result, cached = execute_query_cached(job.query, job.context)
+        except Exception as e:
+            # Anything escaping the query must still finish the job, or it
+            # stays RUNNING and counts against the user's active jobs forever
+            result, cached = {"error": f"Unexpected error: {str(e)}"}, False
+
+        with self._lock:
+            job.result = result
+            job.cached = cached
+            if job.context.cancelled:
+                job.finish(CANCELLED)
+            elif isinstance(result, dict) and "error" in result:
+                job.finish(FAILED)
+            else:
+                job.finish(SUCCEEDED)
+
+        error = result.get("error") if isinstance(result, dict) else None
+        save_query_history(
+            username=job.username,
+            query=job.query,
+            success=job.status == SUCCEEDED,
+            error=error,
+            rows_affected=len(result) if job.status == SUCCEEDED else None
+        )
+
+    def submit(self, username: str, query: str, context: QueryContext) -> Job:
+        """
+        Queue a query for background execution
+
+        Args:
+            username: Owner of the job
+            query: SQL query string
+            context: Execution limits for the query
+
+        Raises:
+            JobLimitError: If the user already has too many active jobs
+        """
+        self.expire_finished()
+        job = Job(username, query, context)
+
+        with self._lock:
+            active = sum(
+                1 for j in self._jobs.values()
+                if j.username == username and not j.finished
+            )
+            if active >= self.max_active_per_user:
+                raise JobLimitError(
+                    f"Too many active jobs (limit {self.max_active_per_user} per user)"
+                )
+            self._jobs[job.id] = job
+
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str, username: str) -> Optional[Job]:
+        """Return the job if it exists and belongs to username"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.username != username:
+            return None
+        return job
+
+    def cancel(self, job_id: str, username: str) -> Optional[Job]:
+        """
+        Cancel a pending or running job
+
+        Pending jobs never start; running jobs are interrupted inside SQLite.
+        Cancelling a finished job has no effect.
+
+        Returns:
+            The job, or None if it does not exist for this user
+        """
+        job = self.get(job_id, username)
+        if job is None:
+            return None
+
+        with self._lock:
+            if job.finished:
+                return job
+            job.context.cancel()
+            if job.status == PENDING:
+                job.finish(CANCELLED)
+                job.future.cancel()
+        return job
+
+    def expire_finished(self) -> int:
+        """
+        Forget finished jobs whose results are older than the TTL
+
+        Returns:
+            Number of jobs removed
+        """
+        cutoff = time.monotonic() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and job._finished_monotonic < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def shutdown(self) -> None:
+        """Cancel outstanding jobs and stop the worker pool"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job.id, job.username)
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counts by status"""
+        counts = {state: 0 for state in (PENDING, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+
+job_manager = JobManager()
@@ -5,29 +5,76 @@ FastAPI application for executing SQL queries with user authentication.
 Provides endpoints for user management, query execution, and database exploration.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, File, Header, Query, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional, Tuple
 from datetime import datetime
+import asyncio
+import json
 import logging
+import os
+import sqlite3
 
 # Import authentication utilities
-from .auth import verify_password, get_password_hash, create_access_token, verify_token
+from .auth import create_access_token, decode_token
 
 # Import database operations
 from .database import (
-    execute_query,
-    get_table_names,
-    get_table_info,
+    execute_query_cached,
+    execute_many,
+    execute_script,
+    format_result,
+    make_query_context,
+    is_select_query,
+    stream_query,
     create_user,
     get_user_by_username,
     get_user_by_email,
     save_query_history,
     get_query_history,
     clear_query_history,
+    auth_cache,
+    history_writer,
+    pool,
+    result_cache,
 )
 
+# Import the executor that keeps blocking database calls off the event loop
+from .executor import run_db, shutdown_db_executor
+
+# Import the process pool that runs bcrypt off the event loop
+from .hashing import password_hasher, PasswordHashBusyError
+
+# Import server-side cursor registry for paginated results
+from .cursors import cursor_manager, CursorLimitError, CursorNotFoundError
+
+# Import the fast JSON path for query results
+from .responses import FastJSONResponse, query_response
+
+# Import Arrow/Parquet/CSV export of SELECT results
+from .export import QueryExport, ExportUnavailableError, EXPORT_MEDIA_TYPES, GZIP_MEDIA_TYPE, export_sizes
+
+# Import bulk CSV/NDJSON loading
+from .importer import import_file, IMPORT_EXTENSIONS
+
+# Import the schema catalog behind the table endpoints
+from .schema import schema_catalog, etag_matches, SCHEMA_REFRESH_INTERVAL
+
+# Import row counts, index selectivity and column histograms
+from .table_stats import table_stats
+
+# Import the background ANALYZE / PRAGMA optimize scheduler
+from .maintenance import maintenance_scheduler, MAINTENANCE_INTERVAL
+
+# Import EXPLAIN QUERY PLAN trees with cost warnings
+from .explain import explain_query
+
+# Import background job manager for long-running queries
+from .jobs import job_manager, Job, JobLimitError
+
 # Import all Pydantic models
 from .models import (
     # Authentication models
@@ -38,14 +85,26 @@ from .models import (
     SignupResponse,
     # Query execution models
     QueryRequest,
+    ScriptRequest,
+    ScriptResponse,
+    ExplainRequest,
+    ExplainResponse,
+    ExportRequest,
     QueryResponse,
     QueryHistoryItem,
+    CursorPageResponse,
+    JobRequest,
+    JobResponse,
     # Table management models
     TableListResponse,
     TableInfoResponse,
     ColumnInfo,
-    # Health check model
+    SchemaResponse,
+    TableStatsResponse,
+    ImportResponse,
+    # Health check models
     HealthResponse,
+    MetricsResponse,
 )
 
 # Configure logging
@@ -55,6 +114,80 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+
+# Seconds between sweeps for idle cursors and expired job results
+SWEEP_INTERVAL = 30
+
+
+async def _sweep_expired():
+    """Periodically close idle server-side cursors and drop old job results"""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        try:
+            expired = await run_db(cursor_manager.expire_idle)
+            if expired:
+                logger.info(f"Closed {expired} idle cursor(s)")
+            job_manager.expire_finished()
+        except Exception:
+            logger.exception("Error sweeping expired cursors and jobs")
+
+
+async def _refresh_schema():
+    """Reload the schema catalog soon after any schema change"""
+    while True:
+        try:
+            await run_db(schema_catalog.refresh, True)
+        except Exception:
+            logger.exception("Error refreshing the schema catalog")
+        await asyncio.sleep(SCHEMA_REFRESH_INTERVAL)
+
+
+async def _run_maintenance():
+    """Periodically ANALYZE heavily written tables and run PRAGMA optimize"""
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            result = await run_db(maintenance_scheduler.run)
+            if result.get("analyzed") or result.get("optimized"):
+                logger.info(
+                    f"Maintenance analyzed {result['analyzed']}, "
+                    f"optimized: {result['optimized']}"
+                )
+        except Exception:
+            logger.exception("Error running database maintenance")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan handler
+
+    Starts the cursor/job sweeper, the schema catalog refresher, the
+    maintenance scheduler, the query history writer and the password
+    hashing pool. On shutdown, stops the background tasks and the hashing
+    workers, cancels
+    background jobs, closes open cursors, drains the database executor,
+    flushes pending history records and closes pooled connections, which
+    run PRAGMA optimize first.
+    """
+    history_writer.start()
+    password_hasher.start()
+    sweeper = asyncio.create_task(_sweep_expired())
+    schema_refresher = asyncio.create_task(_refresh_schema())
+    maintenance = asyncio.create_task(_run_maintenance()) if MAINTENANCE_INTERVAL > 0 else None
+    yield
+    sweeper.cancel()
+    schema_refresher.cancel()
+    if maintenance is not None:
+        maintenance.cancel()
+    password_hasher.shutdown()
+    job_manager.shutdown()
+    cursor_manager.close_all()
+    shutdown_db_executor()
+    history_writer.stop()
+    pool.close()
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="SQL Runner API",
@@ -62,6 +195,7 @@ app = FastAPI(
     description="A powerful SQL query execution platform with user authentication",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "authentication",
@@ -103,25 +237,33 @@ security = HTTPBearer()
 # AUTHENTICATION DEPENDENCY
 # ============================================================================
 
-async def get_current_user(
+async def get_current_user_record(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> str:
+) -> Dict[str, Any]:
     """
-    Dependency to verify JWT token and return username
+    Dependency to verify JWT token and return the user record
+    
+    Validated tokens are cached with the user they resolve to, so repeated
+    requests skip both the JWT decode and the database lookup. FastAPI
+    resolves a dependency once per request, so endpoints that need the full
+    record share this lookup with get_current_user.
     
     Args:
         credentials: HTTP Bearer token from Authorization header
         
     Returns:
-        str: Username of authenticated user
+        Dict[str, Any]: User record of the authenticated user
         
     Raises:
-        HTTPException: If token is invalid, expired, or user not found
+        HTTPException: If token is invalid, expired, or user not found/inactive
     """
     token = credentials.credentials
-    username = verify_token(token)
+    user = auth_cache.get(token)
+    if user is not None:
+        return user
     
-    if not username:
+    payload = decode_token(token)
+    if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
@@ -129,7 +271,8 @@ async def get_current_user(
         )
     
     # Verify user exists in database
-    user = get_user_by_username(username)
+    generation = auth_cache.generation
+    user = await run_db(get_user_by_username, payload["sub"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -137,7 +280,29 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return username
+    if not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
+    auth_cache.put(token, user, payload.get("exp"), generation)
+    return user
+
+
+async def get_current_user(
+    user: Dict[str, Any] = Depends(get_current_user_record)
+) -> str:
+    """
+    Dependency to verify JWT token and return username
+    
+    Args:
+        user: User record resolved from the bearer token
+        
+    Returns:
+        str: Username of authenticated user
+    """
+    return user["username"]
 
 
 # ============================================================================
@@ -168,14 +333,27 @@ async def root():
             },
             "query": {
                 "execute": "POST /query/execute",
+                "script": "POST /query/script",
+                "explain": "POST /query/explain",
+                "cursor_next": "POST /query/cursor/{cursor_id}/next",
+                "cursor_close": "DELETE /query/cursor/{cursor_id}",
+                "export": "POST /query/export",
+                "download": "GET /query/export",
+                "submit_job": "POST /query/jobs",
+                "job_status": "GET /query/jobs/{job_id}",
+                "cancel_job": "DELETE /query/jobs/{job_id}",
                 "history": "GET /query/history",
                 "clear_history": "DELETE /query/history"
             },
             "tables": {
                 "list": "GET /tables",
-                "info": "GET /tables/{table_name}"
+                "info": "GET /tables/{table_name}",
+                "stats": "GET /tables/{table_name}/stats",
+                "import": "POST /tables/{table_name}/import",
+                "schema": "GET /schema"
             },
-            "health": "GET /health"
+            "health": "GET /health",
+            "metrics": "GET /metrics"
         },
         "documentation": {
             "swagger": "/docs",
@@ -212,9 +390,10 @@ async def signup(user_data: UserCreate):
     Raises:
         HTTPException 400: If username or email already exists
         HTTPException 500: If user creation fails
+        HTTPException 503: If too many password hashes are already queued
     """
     # Check if username already exists
-    existing_user = get_user_by_username(user_data.username)
+    existing_user = await run_db(get_user_by_username, user_data.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -223,7 +402,7 @@ async def signup(user_data: UserCreate):
     
     # Check if email already exists (if provided)
     if user_data.email:
-        existing_email = get_user_by_email(user_data.email)
+        existing_email = await run_db(get_user_by_email, user_data.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -231,10 +410,18 @@ async def signup(user_data: UserCreate):
             )
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHashBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
     
     # Create user in database
-    user = create_user(
+    user = await run_db(
+        create_user,
         username=user_data.username,
         email=user_data.email or "",
         full_name=user_data.full_name,
@@ -278,11 +465,23 @@ async def login(request: UserLogin):
     Raises:
         HTTPException 401: If username or password is incorrect
         HTTPException 403: If user account is inactive
+        HTTPException 503: If too many password checks are already queued
     """
     # Get user from database
-    user = get_user_by_username(request.username)
+    user = await run_db(get_user_by_username, request.username)
     
-    if not user or not verify_password(request.password, user["hashed_password"]):
+    try:
+        password_ok = user is not None and await password_hasher.verify(
+            request.password, user["hashed_password"]
+        )
+    except PasswordHashBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -316,29 +515,21 @@ async def login(request: UserLogin):
     summary="Get Current User",
     description="Retrieve information about the currently authenticated user"
 )
-async def get_current_user_info(current_user: str = Depends(get_current_user)):
+async def get_current_user_info(user: Dict[str, Any] = Depends(get_current_user_record)):
     """
     Get current user information
     
     Returns profile information for the authenticated user.
     
     Args:
-        current_user: Username from JWT token (injected by dependency)
+        user: User record resolved from the JWT token (injected by dependency)
         
     Returns:
         User: Current user's profile data
         
     Raises:
-        HTTPException 404: If user not found
         HTTPException 401: If authentication fails
     """
-    user = get_user_by_username(current_user)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     return User(
         user_id=user["user_id"],
         username=user["username"],
@@ -353,6 +544,57 @@ async def get_current_user_info(current_user: str = Depends(get_current_user)):
 # QUERY EXECUTION ENDPOINTS
 # ============================================================================
 
+async def _ndjson_stream(
+    rows: Iterator[Any],
+    columns: List[str],
+    query: str,
+    username: str,
+    start_time: datetime,
+) -> AsyncIterator[str]:
+    """
+    Serialize a stream_query() generator as NDJSON
+
+    Emits a header line with the column names, one JSON array per row, and a
+    trailer line with the row count (or the error that ended the stream).
+    Batches are pulled on the database executor so only one batch is held in
+    memory at a time.
+    """
+    row_count = 0
+    error = None
+
+    try:
+        yield json.dumps({"columns": columns}) + "\n"
+
+        while True:
+            batch = await run_db(next, rows, None)
+            if batch is None:
+                break
+            row_count += len(batch)
+            yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+        yield json.dumps({
+            "success": True,
+            "row_count": row_count,
+            "execution_time": (datetime.utcnow() - start_time).total_seconds()
+        }) + "\n"
+
+    except Exception as e:
+        logger.exception("Error while streaming query results")
+        error = str(e)
+        yield json.dumps({"success": False, "error": error}) + "\n"
+
+    finally:
+        await run_db(rows.close)
+        await run_db(
+            save_query_history,
+            username=username,
+            query=query,
+            success=error is None,
+            error=error,
+            rows_affected=row_count if error is None else None
+        )
+
+
 @app.post(
     "/query/execute",
     response_model=QueryResponse,
@@ -371,6 +613,40 @@ async def execute_sql_query(
     CREATE TABLE, DROP TABLE, ALTER TABLE, etc. Query history is automatically
     saved for the authenticated user.
     
+    With ``stream=true`` a SELECT is answered with an NDJSON stream
+    (``application/x-ndjson``): a ``{"columns": [...]}`` header, one JSON
+    array per row, and a trailer with ``row_count`` or ``error``. Rows are
+    fetched in batches, so memory use does not grow with the result size.
+    
+    With ``page_size`` a SELECT returns only its first page. If more rows
+    remain, the response carries a ``cursor_id`` to pass to
+    ``POST /query/cursor/{cursor_id}/next``.
+    
+    Deterministic SELECTs are served from the result cache while the
+    database is unchanged; ``cached`` in the response tells whether that
+    happened.
+    
+    Queries are aborted after their timeout, and SELECT results are cut
+    off at the row and byte limits (``truncated`` is then true). A stream
+    must finish within the longer job timeout; a cursor applies the timeout
+    to every page. Requests
+    can lower, but not raise, the limits configured for their user.
+    
+    Responses are serialized directly (with orjson when installed) rather
+    than validated row by row through the QueryResponse model; the JSON
+    document has the same schema.
+    
+    ``format`` picks the shape of ``data``: ``objects`` (default, one
+    object per row), ``rows`` (one array per row) or ``columnar`` (one
+    array per column). The latter two list the column names only once in
+    ``columns``, which keeps responses for wide tables much smaller.
+    
+    ``params`` binds values to ``?`` (array) or ``:name`` (object)
+    placeholders. Sending the same SQL text with different values lets
+    SQLite reuse the prepared statement and keeps literals out of the
+    query. ``executemany`` runs a write statement once per parameter set
+    in a single transaction.
+    
     Args:
         request: Query request containing SQL string
         current_user: Username from JWT token (injected by dependency)
@@ -379,65 +655,779 @@ async def execute_sql_query(
         QueryResponse: Query results or error message with execution time
     """
     start_time = datetime.utcnow()
+    cached = False
     
     try:
-        result = execute_query(request.query)
+        if request.stream and is_select_query(request.query):
+            # Streams hold their connection for as long as the client reads
+            context = make_query_context(current_user, request.timeout, background=True)
+            rows = stream_query(request.query, params=request.params, context=context)
+            # Run the statement before committing to a 200 streaming response,
+            # so that SQL errors still come back as a regular QueryResponse
+            try:
+                columns = await run_db(next, rows)
+            except sqlite3.Error as e:
+                result = {"error": f"Database error: {str(e)}"}
+            else:
+                return StreamingResponse(
+                    _ndjson_stream(rows, columns, request.query, current_user, start_time),
+                    media_type="application/x-ndjson"
+                )
+        elif request.page_size and is_select_query(request.query):
+            try:
+                cursor_id, columns, page, has_more = await run_db(
+                    cursor_manager.open, current_user, request.query, request.page_size, request.params,
+                    make_query_context(current_user, request.timeout)
+                )
+            except CursorLimitError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=str(e)
+                )
+            except sqlite3.Error as e:
+                result = {"error": f"Database error: {str(e)}"}
+            else:
+                await run_db(
+                    save_query_history,
+                    username=current_user,
+                    query=request.query,
+                    success=True,
+                    rows_affected=len(page)
+                )
+                return query_response(
+                    success=True,
+                    data=page,
+                    columns=columns,
+                    execution_time=(datetime.utcnow() - start_time).total_seconds(),
+                    cursor_id=cursor_id,
+                    has_more=has_more
+                )
+        elif request.executemany is not None:
+            context = make_query_context(current_user, request.timeout, request.max_rows)
+            result = await run_db(execute_many, request.query, request.executemany, context)
+            if request.format != "objects" and isinstance(result, list):
+                result = format_result(result, request.format)
+        else:
+            context = make_query_context(current_user, request.timeout, request.max_rows)
+            result, cached = await run_db(
+                execute_query_cached, request.query, context, request.format, request.params
+            )
         execution_time = (datetime.utcnow() - start_time).total_seconds()
         
         # Handle error results
         if isinstance(result, dict) and "error" in result:
             # Save failed query to database
-            save_query_history(
+            await run_db(
+                save_query_history,
                 username=current_user,
                 query=request.query,
                 success=False,
                 error=result["error"]
             )
             
-            return QueryResponse(
+            return query_response(
                 success=False,
                 error=result["error"],
                 execution_time=execution_time
             )
         
         # Handle successful results
-        columns = list(result[0].keys()) if result else []
-        rows_affected = len(result)
+        if request.format == "objects":
+            data = result
+            columns = list(result[0].keys()) if result else []
+            rows_affected = len(result)
+        else:
+            data = result["data"]
+            columns = result["columns"]
+            if request.format == "columnar":
+                rows_affected = len(data[0]) if data else 0
+            else:
+                rows_affected = len(data)
         
         # Save successful query to database
-        save_query_history(
+        await run_db(
+            save_query_history,
             username=current_user,
             query=request.query,
             success=True,
             rows_affected=rows_affected
         )
         
-        return QueryResponse(
+        return query_response(
             success=True,
-            data=result,
+            data=data,
             columns=columns,
-            execution_time=execution_time
+            format=request.format,
+            execution_time=execution_time,
+            cached=cached,
+            truncated=context.truncated
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Unexpected error executing query")
         execution_time = (datetime.utcnow() - start_time).total_seconds()
         
         # Save error to database
-        save_query_history(
+        await run_db(
+            save_query_history,
             username=current_user,
             query=request.query,
             success=False,
             error=str(e)
         )
         
-        return QueryResponse(
+        return query_response(
             success=False,
             error=str(e),
             execution_time=execution_time
         )
 
 
+@app.post(
+    "/query/script",
+    response_model=ScriptResponse,
+    tags=["queries"],
+    summary="Execute SQL Script",
+    description="Run several SQL statements in one transaction, all or nothing"
+)
+async def execute_sql_script(
+    request: ScriptRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Execute a multi-statement SQL script
+    
+    The script is split into statements with ``sqlite3.complete_statement``
+    (semicolons in strings, comments and trigger bodies are handled) and
+    they run in order on one connection inside a single transaction: one
+    commit covers the whole script, and if any statement fails nothing it
+    did is kept. Every statement gets an entry in ``results``. The script
+    is saved to history as one entry.
+    
+    Args:
+        request: Script, limits and result format
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        ScriptResponse: Per-statement results, or the error and the index
+        of the failing statement
+    """
+    start_time = datetime.utcnow()
+    context = make_query_context(current_user, request.timeout, request.max_rows)
+    result = await run_db(execute_script, request.script, context, request.format)
+    execution_time = (datetime.utcnow() - start_time).total_seconds()
+    
+    if "error" in result:
+        await run_db(
+            save_query_history,
+            username=current_user,
+            query=request.script,
+            success=False,
+            error=result["error"]
+        )
+        return FastJSONResponse({
+            "success": False,
+            "results": [],
+            "format": request.format,
+            "error": result["error"],
+            "statement_index": result["statement_index"],
+            "execution_time": execution_time,
+            "truncated": None
+        })
+    
+    rows_affected = 0
+    for statement in result["results"]:
+        if "data" not in statement:
+            rows_affected += statement["affected_rows"]
+        elif request.format == "columnar":
+            rows_affected += len(statement["data"][0]) if statement["data"] else 0
+        else:
+            rows_affected += len(statement["data"])
+    
+    await run_db(
+        save_query_history,
+        username=current_user,
+        query=request.script,
+        success=True,
+        rows_affected=rows_affected
+    )
+    
+    return FastJSONResponse({
+        "success": True,
+        "results": result["results"],
+        "format": request.format,
+        "error": None,
+        "statement_index": None,
+        "execution_time": execution_time,
+        "truncated": context.truncated
+    })
+
+
+@app.post(
+    "/query/explain",
+    response_model=ExplainResponse,
+    tags=["queries"],
+    summary="Explain Query Plan",
+    description="Show how SQLite would run a statement, flagging full scans, temp B-trees and automatic indexes"
+)
+async def explain_sql_query(
+    request: ExplainRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Get the query plan of a statement without running it
+    
+    Runs EXPLAIN QUERY PLAN on a pooled connection and returns the plan as
+    a tree. Steps that read every row of a table (SCAN), sort or
+    deduplicate in a temporary B-tree (ORDER BY, GROUP BY, DISTINCT,
+    UNION) or build an automatic index are flagged and listed in
+    ``warnings`` with a hint; full scans of analyzed tables carry their
+    row count. The statement is classified like in /query/execute and
+    only SELECT, INSERT, UPDATE and DELETE are accepted. Nothing is saved
+    to history.
+    
+    Args:
+        request: Statement and its parameters
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        ExplainResponse: Plan tree and warnings
+        
+    Raises:
+        HTTPException 400: If the statement cannot be planned
+    """
+    result = await run_db(explain_query, request.query, request.params)
+    if "error" in result:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result["error"]
+        )
+    return ExplainResponse(**result)
+
+
+@app.post(
+    "/query/cursor/{cursor_id}/next",
+    response_model=CursorPageResponse,
+    tags=["queries"],
+    summary="Fetch Next Page",
+    description="Fetch the next page of rows from a server-side cursor"
+)
+async def fetch_cursor_page(
+    cursor_id: str,
+    page_size: int = Query(100, ge=1, le=10000, description="Rows to return"),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Fetch the next page from a server-side cursor
+    
+    Continues the SELECT opened by ``POST /query/execute`` with ``page_size``.
+    The cursor is closed automatically after its last page.
+    
+    Args:
+        cursor_id: Cursor identifier returned by /query/execute
+        page_size: Number of rows to return
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        CursorPageResponse: The next page of rows
+        
+    Raises:
+        HTTPException 404: If the cursor does not exist or has expired
+        HTTPException 400: If fetching from the cursor fails
+    """
+    try:
+        columns, page, has_more = await run_db(
+            cursor_manager.fetch, cursor_id, current_user, page_size
+        )
+    except CursorNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Database error: {str(e)}"
+        )
+    
+    return CursorPageResponse(
+        cursor_id=cursor_id,
+        data=page,
+        columns=columns,
+        has_more=has_more
+    )
+
+
+@app.delete(
+    "/query/cursor/{cursor_id}",
+    tags=["queries"],
+    summary="Close Cursor",
+    description="Close a server-side cursor before reading all of its pages"
+)
+async def close_cursor(cursor_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Close a server-side cursor
+    
+    Releases the database connection held by the cursor.
+    
+    Args:
+        cursor_id: Cursor identifier returned by /query/execute
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        dict: Success message
+        
+    Raises:
+        HTTPException 404: If the cursor does not exist or has expired
+    """
+    closed = await run_db(cursor_manager.close, cursor_id, current_user)
+    
+    if not closed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cursor '{cursor_id}' not found or expired"
+        )
+    return {"message": "Cursor closed successfully"}
+
+
+def _job_response(job: Job) -> JobResponse:
+    """Build the API representation of a background job"""
+    result = None
+    if job.finished and job.result is not None:
+        if isinstance(job.result, dict):
+            result = QueryResponse(
+                success=False,
+                error=job.result.get("error"),
+                execution_time=job.elapsed
+            )
+        else:
+            result = QueryResponse(
+                success=True,
+                data=job.result,
+                columns=list(job.result[0].keys()) if job.result else [],
+                execution_time=job.elapsed,
+                cached=job.cached,
+                truncated=job.context.truncated
+            )
+    
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        query=job.query,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        rows_fetched=job.context.rows_fetched,
+        elapsed=job.elapsed,
+        result=result
+    )
+
+
+def _parse_byte_range(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single-range ``Range: bytes=start-end`` header
+    
+    Returns (start, end), where end is None for ``bytes=start-`` and start
+    is None for the suffix form ``bytes=-length``. Missing, malformed and
+    multi-range headers return None and are answered with the whole file.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, _, last = spec.partition("-")
+    try:
+        start = int(first) if first.strip() else None
+        end = int(last) if last.strip() else None
+    except ValueError:
+        return None
+    if start is None and end is None:
+        return None
+    if start is not None and end is not None and end < start:
+        return None
+    return start, end
+
+
+async def _start_export(query: str, format: str, compress: bool, username: str) -> Tuple[QueryExport, bytes]:
+    """
+    Create a QueryExport and produce its first chunk on the database executor
+    
+    Running the statement and encoding the first batch before responding
+    means errors still come back as a regular JSON error.
+    
+    Raises:
+        HTTPException 400: If the query is not a SELECT or fails
+        HTTPException 501: If the format needs pyarrow and it is not installed
+    """
+    if not is_select_query(query):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only SELECT queries can be exported"
+        )
+    
+    try:
+        export = QueryExport(query, format, compress, context=make_query_context(username, background=True))
+    except ExportUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    try:
+        first_chunk = await run_db(next, export.chunks)
+    except (sqlite3.Error, ValueError) as e:
+        error = f"Database error: {str(e)}" if isinstance(e, sqlite3.Error) else str(e)
+        await run_db(
+            save_query_history,
+            username=username,
+            query=query,
+            success=False,
+            error=error
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+    return export, first_chunk
+
+
+def _measure_export(export: QueryExport, first_chunk: bytes) -> int:
+    """Produce the rest of an export without sending it and return its total size"""
+    size = len(first_chunk) + sum(len(chunk) for chunk in export.chunks)
+    if export.etag is not None:
+        export_sizes.put(export.etag, size)
+    return size
+
+
+def _export_headers(export: QueryExport) -> Dict[str, str]:
+    headers = {"Content-Disposition": f'attachment; filename="{export.filename}"'}
+    if export.etag is not None:
+        headers["ETag"] = export.etag
+        headers["Accept-Ranges"] = "bytes"
+    return headers
+
+
+async def _export_stream(
+    export: QueryExport,
+    first_chunk: bytes,
+    username: str,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Send the chunks of a QueryExport, pulling each one on the database executor
+    
+    With ``start``/``end`` only that inclusive byte range of the file is
+    sent; chunks before it are generated and dropped, and generation stops
+    once the range is complete. Saves the query to history once the export
+    has finished or failed. A failure part-way leaves the file truncated,
+    which readers report as an error.
+    """
+    error = None
+    position = 0  # Offset of the current chunk in the complete file
+    
+    try:
+        chunk = first_chunk
+        while chunk is not None:
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                stop = len(chunk) if end is None else min(len(chunk), end + 1 - position)
+                yield chunk[max(start - position, 0):stop]
+            position = chunk_end
+            if end is not None and position > end:
+                break
+            chunk = await run_db(next, export.chunks, None)
+        else:
+            if export.etag is not None:
+                export_sizes.put(export.etag, position)
+    
+    except Exception as e:
+        logger.exception("Error while exporting query results")
+        error = str(e)
+    
+    finally:
+        await run_db(export.chunks.close)
+        await run_db(
+            save_query_history,
+            username=username,
+            query=export.query,
+            success=error is None,
+            error=error,
+            rows_affected=export.rows if error is None else None
+        )
+
+
+_EXPORT_RESPONSES = {
+    200: {
+        "description": "Arrow IPC stream, Parquet file or CSV (gzip-compressed on request)",
+        "content": {media_type: {} for media_type in [*EXPORT_MEDIA_TYPES.values(), GZIP_MEDIA_TYPE]}
+    },
+    400: {"description": "Not a SELECT, or the query failed"},
+    501: {"description": "pyarrow is not installed (Arrow and Parquet only)"}
+}
+
+
+@app.post(
+    "/query/export",
+    tags=["queries"],
+    summary="Export Query Results",
+    description="Export the result of a SELECT as an Arrow IPC stream, a Parquet file or CSV",
+    responses=_EXPORT_RESPONSES
+)
+async def export_query_results(
+    request: ExportRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Export SELECT results as a file
+    
+    Rows are fetched in batches and each batch is encoded straight away
+    (an Arrow record batch, a Parquet row group or a block of CSV lines),
+    so large results are streamed with bounded memory. Arrow column types
+    follow the declared types of the table columns the query reads;
+    computed columns get the type of their values. pandas and Polars read
+    the output directly, e.g. with ``pyarrow.ipc.open_stream``,
+    ``pandas.read_parquet`` or ``pandas.read_csv``.
+    
+    Args:
+        request: Query, export format and whether to gzip the file
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        StreamingResponse: The exported file
+        
+    Raises:
+        HTTPException 400: If the query is not a SELECT or fails
+        HTTPException 501: If the format needs pyarrow and it is not installed
+    """
+    export, first_chunk = await _start_export(request.query, request.format, request.gzip, current_user)
+    return StreamingResponse(
+        _export_stream(export, first_chunk, current_user),
+        media_type=export.media_type,
+        headers=_export_headers(export)
+    )
+
+
+@app.get(
+    "/query/export",
+    tags=["queries"],
+    summary="Download Query Results",
+    description="Download the result of a SELECT as a file, with support for resuming via Range requests",
+    responses={
+        **_EXPORT_RESPONSES,
+        206: {"description": "The requested byte range of the file"},
+        416: {"description": "The requested range starts beyond the end of the file"}
+    }
+)
+async def download_query_results(
+    query: str = Query(..., min_length=1, description="SQL SELECT query to export"),
+    format: Literal["arrow", "parquet", "csv"] = Query("csv", description="Arrow IPC stream, Parquet file or CSV"),
+    gzip: bool = Query(False, description="Gzip-compress the file (CSV only)"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None, alias="If-Range"),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Download SELECT results as a file, resumable with HTTP Range requests
+    
+    The same export as POST /query/export, addressed by URL so browsers and
+    download tools can fetch it. Exports of deterministic queries carry an
+    ETag built from the query and the versions of the tables it reads, and
+    the same ETag always means the same bytes. A request with
+    ``Range: bytes=N-`` (and ``If-Range: <etag>``) therefore resumes an
+    interrupted download with 206 Partial Content; if the data changed in
+    the meantime the whole new file is sent with 200 instead.
+    
+    The total size in Content-Range is known once the export has been
+    produced completely; the first Range request for an export that has
+    not been downloaded in full yet generates it once to measure it.
+    
+    Args:
+        query: SQL SELECT query
+        format: Export format
+        gzip: Whether to gzip the file (CSV only)
+        range_header: Optional single byte range
+        if_range: Optional ETag the range is conditional on
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        StreamingResponse: The file (200) or the requested part of it (206)
+        
+    Raises:
+        HTTPException 400: If the query is not a SELECT or fails
+        HTTPException 416: If the range starts beyond the end of the file
+        HTTPException 501: If the format needs pyarrow and it is not installed
+    """
+    export, first_chunk = await _start_export(query, format, gzip, current_user)
+    byte_range = _parse_byte_range(range_header)
+    
+    if (byte_range is not None and export.etag is not None
+            and (if_range is None or if_range == export.etag)):
+        total = export_sizes.get(export.etag)
+        if total is None:
+            etag = export.etag
+            try:
+                total = await run_db(_measure_export, export, first_chunk)
+            except (sqlite3.Error, ValueError) as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            export, first_chunk = await _start_export(query, format, gzip, current_user)
+            if export.etag != etag:
+                # The data changed while measuring; send the new file whole
+                byte_range = None
+    
+        if byte_range is not None:
+            start, end = byte_range
+            if start is None:
+                start, end = max(total - end, 0), total - 1
+            elif end is None or end >= total:
+                end = total - 1
+            
+            if start >= total:
+                await run_db(export.chunks.close)
+                raise HTTPException(
+                    status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                    detail="Requested range starts beyond the end of the file",
+                    headers={"Content-Range": f"bytes */{total}"}
+                )
+            
+            headers = _export_headers(export)
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _export_stream(export, first_chunk, current_user, start, end),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=export.media_type,
+                headers=headers
+            )
+    
+    return StreamingResponse(
+        _export_stream(export, first_chunk, current_user),
+        media_type=export.media_type,
+        headers=_export_headers(export)
+    )
+
+
+@app.post(
+    "/query/jobs",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["queries"],
+    summary="Submit Query Job",
+    description="Run a long SQL query in the background and poll for its result"
+)
+async def submit_query_job(
+    request: JobRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Submit a background query job
+    
+    Returns immediately with a job id. Poll ``GET /query/jobs/{job_id}``
+    for status, progress and the result, or cancel with
+    ``DELETE /query/jobs/{job_id}``.
+    
+    Args:
+        request: Job request containing SQL string
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        JobResponse: The queued job
+        
+    Raises:
+        HTTPException 429: If the user has too many active jobs
+    """
+    try:
+        context = make_query_context(
+            current_user, request.timeout, request.max_rows, background=True
+        )
+        job = job_manager.submit(current_user, request.query, context)
+    except JobLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+    
+    return _job_response(job)
+
+
+@app.get(
+    "/query/jobs/{job_id}",
+    response_model=JobResponse,
+    tags=["queries"],
+    summary="Get Query Job",
+    description="Get status, progress and result of a background query job"
+)
+async def get_query_job(job_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Get a background query job
+    
+    Finished jobs include their result until it expires.
+    
+    Args:
+        job_id: Job identifier returned by POST /query/jobs
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        JobResponse: Job status, progress and result
+        
+    Raises:
+        HTTPException 404: If the job does not exist or has expired
+    """
+    job = job_manager.get(job_id, current_user)
+    
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job '{job_id}' not found or expired"
+        )
+    return _job_response(job)
+
+
+@app.delete(
+    "/query/jobs/{job_id}",
+    response_model=JobResponse,
+    tags=["queries"],
+    summary="Cancel Query Job",
+    description="Cancel a pending or running background query job"
+)
+async def cancel_query_job(job_id: str, current_user: str = Depends(get_current_user)):
+    """
+    Cancel a background query job
+    
+    A running query is interrupted inside SQLite. Cancelling a job that
+    has already finished leaves it unchanged.
+    
+    Args:
+        job_id: Job identifier returned by POST /query/jobs
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        JobResponse: The job after cancellation
+        
+    Raises:
+        HTTPException 404: If the job does not exist or has expired
+    """
+    job = job_manager.cancel(job_id, current_user)
+    
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job '{job_id}' not found or expired"
+        )
+    return _job_response(job)
+
+
 @app.get(
     "/query/history",
     response_model=List[QueryHistoryItem],
@@ -458,7 +1448,7 @@ async def get_query_history_endpoint(current_user: str = Depends(get_current_use
     Returns:
         List[QueryHistoryItem]: List of past query executions
     """
-    history = get_query_history(current_user, limit=50)
+    history = await run_db(get_query_history, current_user, limit=50)
     return history
 
 
@@ -484,7 +1474,7 @@ async def clear_query_history_endpoint(current_user: str = Depends(get_current_u
     Raises:
         HTTPException 500: If history clearing fails
     """
-    success = clear_query_history(current_user)
+    success = await run_db(clear_query_history, current_user)
     
     if success:
         return {"message": "Query history cleared successfully"}
@@ -499,6 +1489,11 @@ async def clear_query_history_endpoint(current_user: str = Depends(get_current_u
 # TABLE MANAGEMENT ENDPOINTS
 # ============================================================================
 
+def _schema_headers(etag: str) -> Dict[str, str]:
+    """Validator headers of a schema response: always revalidate, privately"""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
 @app.get(
     "/tables",
     response_model=TableListResponse,
@@ -506,14 +1501,22 @@ async def clear_query_history_endpoint(current_user: str = Depends(get_current_u
     summary="List All Tables",
     description="Get list of all available database tables"
 )
-async def list_tables(current_user: str = Depends(get_current_user)):
+async def list_tables(
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    current_user: str = Depends(get_current_user)
+):
     """
     Get list of all available database tables
     
     Returns names of all tables in the database, excluding system tables
-    (users, query_history, and SQLite internal tables).
+    (users, query_history, and SQLite internal tables). The list comes
+    from the schema catalog and carries an ETag that changes with the
+    schema version; a request with a matching If-None-Match gets a 304.
     
     Args:
+        response: Response whose validator headers are set
+        if_none_match: ETag(s) the client already has
         current_user: Username from JWT token (injected by dependency)
         
     Returns:
@@ -523,8 +1526,7 @@ async def list_tables(current_user: str = Depends(get_current_user)):
         HTTPException 500: If table list retrieval fails
     """
     try:
-        tables = get_table_names()
-        return TableListResponse(tables=tables)
+        etag, tables = await run_db(schema_catalog.tables)
     except Exception as e:
         logger.exception("Error fetching table list")
         raise HTTPException(
@@ -532,6 +1534,11 @@ async def list_tables(current_user: str = Depends(get_current_user)):
             detail=str(e)
         )
 
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_schema_headers(etag))
+    response.headers.update(_schema_headers(etag))
+    return TableListResponse(tables=tables)
+
 
 @app.get(
     "/tables/{table_name}",
@@ -542,16 +1549,22 @@ async def list_tables(current_user: str = Depends(get_current_user)):
 )
 async def get_table_details(
     table_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     current_user: str = Depends(get_current_user)
 ):
     """
     Get detailed information about a specific table
     
     Returns table schema (column names, types, constraints) and
-    sample data (first 5 rows) for the specified table.
+    sample data (first 5 rows) for the specified table. The ETag changes
+    with the schema version and with writes to the table, so a client
+    revalidating with If-None-Match gets a 304 until either changes.
     
     Args:
         table_name: Name of the table to query
+        response: Response whose validator headers are set
+        if_none_match: ETag(s) the client already has
         current_user: Username from JWT token (injected by dependency)
         
     Returns:
@@ -562,32 +1575,219 @@ async def get_table_details(
         HTTPException 500: If table info retrieval fails
     """
     try:
-        info = get_table_info(table_name)
-        
-        if isinstance(info, dict) and info.get("error"):
+        etag = await run_db(schema_catalog.table_etag, table_name)
+        if etag is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=info["error"]
+                detail=f"Table '{table_name}' not found"
             )
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_schema_headers(etag))
+
+        found = await run_db(schema_catalog.table_info, table_name)
+        if found is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Table '{table_name}' not found"
+            )
+        etag, info = found
+
+    except HTTPException:
+        raise
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Database error: {str(e)}"
+        )
+    except Exception as e:
+        logger.exception("Error fetching table info")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    response.headers.update(_schema_headers(etag))
+    return TableInfoResponse(
+        columns=[ColumnInfo(**col) for col in info["columns"]],
+        sample_data=info["sample_data"]
+    )
+
+
+@app.get(
+    "/tables/{table_name}/stats",
+    response_model=TableStatsResponse,
+    tags=["tables"],
+    summary="Get Table Statistics",
+    description="Row count, index selectivity and column histograms of a table"
+)
+async def get_table_statistics(
+    table_name: str,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Get statistics of a table
+    
+    Returns the row count, the selectivity of every index and, per column,
+    the estimated distinct values, NULL fraction and an equi-depth
+    histogram, to judge what a query will cost before running it. Index
+    numbers come from sqlite_stat1 once ANALYZE has run and histograms of
+    leading index columns from sqlite_stat4 where SQLite was built with
+    it; the rest is estimated from a random sample of rows. Large tables
+    are not counted: their row count comes from sqlite_stat1 or the rowid
+    range (see ``row_count_source``). The sample is cached until the table
+    changes.
+    
+    Args:
+        table_name: Name of the table
+        current_user: Username from JWT token (injected by dependency)
         
-        # Convert column dicts to ColumnInfo models for better typing
-        from .models import ColumnInfo
-        columns = [ColumnInfo(**col) for col in info["columns"]]
+    Returns:
+        TableStatsResponse: Row count, index and column statistics
         
-        return TableInfoResponse(
-            columns=columns,
-            sample_data=info["sample_data"]
+    Raises:
+        HTTPException 400: If table doesn't exist or cannot be read
+        HTTPException 500: If the statistics cannot be computed
+    """
+    try:
+        result = await run_db(table_stats.table_stats, table_name)
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Database error: {str(e)}"
+        )
+    except Exception as e:
+        logger.exception("Error computing table statistics")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Table '{table_name}' not found"
         )
+    return TableStatsResponse(**result)
+
+
+@app.get(
+    "/schema",
+    response_model=SchemaResponse,
+    tags=["tables"],
+    summary="Get Schema Catalog",
+    description="Columns, indexes and foreign keys of every table in one call"
+)
+async def get_schema(
+    since: Optional[int] = Query(None, description="Schema version to return changes since"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Get the schema catalog
+    
+    Returns the columns, indexes and foreign keys of every table, for
+    editor autocomplete, from the in-memory schema catalog. ``version`` is
+    SQLite's schema version; passing it back as ``since`` returns only the
+    tables that changed after it (and the dropped ones in ``removed``),
+    or the full catalog if that version is no longer kept. The ETag
+    follows the version, so If-None-Match gets a 304 while the schema is
+    unchanged.
+    
+    Args:
+        since: Schema version the client already has
+        if_none_match: ETag(s) the client already has
+        current_user: Username from JWT token (injected by dependency)
         
-    except HTTPException:
-        raise
+    Returns:
+        SchemaResponse: Tables by name, or the changes since ``since``
+        
+    Raises:
+        HTTPException 500: If the catalog cannot be read
+    """
+    try:
+        etag, catalog = await run_db(schema_catalog.schema, since)
     except Exception as e:
-        logger.exception("Error fetching table info")
+        logger.exception("Error reading the schema catalog")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_schema_headers(etag))
+    return FastJSONResponse(catalog, headers=_schema_headers(etag))
+
+
+@app.post(
+    "/tables/{table_name}/import",
+    response_model=ImportResponse,
+    tags=["tables"],
+    summary="Import Rows",
+    description="Bulk-load a CSV or NDJSON file into a new or existing table"
+)
+async def import_table_rows(
+    table_name: str,
+    file: UploadFile = File(..., description="CSV file with a header row, or one JSON object per line"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="File format; inferred from the file name if omitted"),
+    create: bool = Query(True, description="Create the table if it does not exist"),
+    index: List[str] = Query([], description="Columns to index after loading"),
+    delimiter: str = Query(",", min_length=1, max_length=1, description="CSV field delimiter"),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Bulk-load a file into a table
+    
+    The file is inserted with executemany() in batches inside a single
+    transaction, so the whole import costs one commit and fails or
+    succeeds as a whole. A missing table is created with INTEGER, REAL or
+    TEXT columns inferred from the first rows; for an existing table the
+    file's columns must match table columns. Empty CSV fields load as NULL.
+    
+    Args:
+        table_name: Table to load into
+        file: Uploaded CSV or NDJSON file (UTF-8)
+        format: csv or ndjson; taken from the file extension when omitted
+        create: Whether a missing table may be created
+        index: Columns to index once the rows are loaded
+        delimiter: CSV field delimiter
+        current_user: Username from JWT token (injected by dependency)
+        
+    Returns:
+        ImportResponse: Rows imported, table columns and throughput
+        
+    Raises:
+        HTTPException 400: If the format is unknown or the import fails
+    """
+    if format is None:
+        extension = os.path.splitext(file.filename or "")[1].lower()
+        format = IMPORT_EXTENSIONS.get(extension)
+        if format is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot tell the file format from its name; pass format=csv or format=ndjson"
+            )
+    
+    result = await run_db(
+        import_file,
+        file.file,
+        table_name,
+        format,
+        create=create,
+        indexes=index,
+        delimiter=delimiter
+    )
+    if "error" in result:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result["error"]
+        )
+    
+    logger.info(
+        f"{current_user} imported {result['rows_imported']} row(s) into {table_name} "
+        f"({result['rows_per_second']:.0f} rows/s)"
+    )
+    return ImportResponse(success=True, **result)
+
 
 # ============================================================================
 # HEALTH CHECK ENDPOINT
@@ -617,6 +1817,41 @@ async def health_check():
     )
 
 
+@app.get(
+    "/metrics",
+    response_model=MetricsResponse,
+    tags=["health"],
+    summary="Runtime Metrics",
+    description="Connection pool, cursor, result cache and history writer statistics"
+)
+async def metrics():
+    """
+    Runtime metrics endpoint
+    
+    Returns counters for the connection pool, open server-side cursors,
+    background jobs, the result cache (hits, misses, evictions,
+    invalidations), the token cache, password hashing (queueing and
+    latency), the history writer (queue depth, flush latency) and the
+    schema catalog (reloads, sample row cache hits), the table statistics
+    sample cache and the maintenance scheduler (passes, tables analyzed).
+    
+    Returns:
+        MetricsResponse: Current runtime counters
+    """
+    return MetricsResponse(
+        pool=pool.stats(),
+        cursors=cursor_manager.stats(),
+        jobs=job_manager.stats(),
+        result_cache=result_cache.stats(),
+        auth_cache=auth_cache.stats(),
+        password_hashing=password_hasher.stats(),
+        history_writer=history_writer.stats(),
+        schema_cache=schema_catalog.stats(),
+        table_stats=table_stats.stats(),
+        maintenance=maintenance_scheduler.stats()
+    )
+
+
 # ============================================================================
 # APPLICATION STARTUP
 # ============================================================================
@@ -0,0 +1,285 @@
+"""
+Background ANALYZE and PRAGMA optimize
+
+SQLite's query planner relies on the statistics ANALYZE stores in
+sqlite_stat1. Without them, or with statistics from before a table grew a
+hundredfold, it can pick a full scan over a selective index. Users create
+and fill tables through /query/execute and never run ANALYZE themselves.
+
+The scheduler runs every MAINTENANCE_INTERVAL seconds. INSERT, UPDATE and
+DELETE statements count their affected rows per table (see
+cache.WriteVolume), and a table is analyzed once the rows changed since its
+last ANALYZE reach ANALYZE_MIN_ROWS and ANALYZE_CHANGE_FRACTION of its
+analyzed size. Tables with indexes that have no statistics yet are analyzed
+too. Every MAINTENANCE_OPTIMIZE_INTERVAL seconds a pass also runs PRAGMA
+optimize, and pooled connections run it when the pool closes them.
+
+Each pass gets MAINTENANCE_TIME_BUDGET seconds: ANALYZE only reads
+SQLITE_ANALYSIS_LIMIT rows per index, and a statement still running when
+the budget is used up is interrupted and rolled back, leaving the table due
+for the next pass. ANALYZE runs in a deferred transaction, so writers are
+only blocked while it stores its results; if another connection holds the
+write lock at that point, and keeps it past the remaining budget, the
+table is also left for the next pass. Passes are skipped during
+MAINTENANCE_PEAK_HOURS and while MAINTENANCE_BUSY_CONNECTIONS or more
+pooled connections are in use.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import (
+    DB_POOL_SIZE,
+    SQLITE_ANALYSIS_LIMIT,
+    SQLITE_BUSY_TIMEOUT,
+    close_db_connection,
+    commit_write,
+    get_database_version,
+    get_db_connection,
+    pool,
+    write_volume,
+)
+
+# Seconds between maintenance passes (0 disables the scheduler)
+MAINTENANCE_INTERVAL = float(os.getenv('MAINTENANCE_INTERVAL', '60'))
+# Wall-clock budget of one pass, in seconds
+MAINTENANCE_TIME_BUDGET = float(os.getenv('MAINTENANCE_TIME_BUDGET', '2'))
+# Seconds between PRAGMA optimize runs (0 disables them)
+MAINTENANCE_OPTIMIZE_INTERVAL = float(os.getenv('MAINTENANCE_OPTIMIZE_INTERVAL', '3600'))
+# Local hours without maintenance, e.g. "9-12,14-18" (end hour excluded;
+# "22-6" wraps around midnight)
+MAINTENANCE_PEAK_HOURS = os.getenv('MAINTENANCE_PEAK_HOURS', '')
+# Skip a pass while at least this many pooled connections are in use
+MAINTENANCE_BUSY_CONNECTIONS = int(os.getenv('MAINTENANCE_BUSY_CONNECTIONS', str(max(1, DB_POOL_SIZE // 2))))
+
+# A table is analyzed once the rows changed since its last ANALYZE reach
+# both of these
+ANALYZE_MIN_ROWS = int(os.getenv('ANALYZE_MIN_ROWS', '1000'))
+ANALYZE_CHANGE_FRACTION = float(os.getenv('ANALYZE_CHANGE_FRACTION', '0.1'))
+
+# VM instructions between checks of the time budget
+_PROGRESS_INTERVAL = 1000
+
+
+def parse_hours(spec: str) -> List[Tuple[int, int]]:
+    """
+    Parse a list of hour ranges such as "9-12,14-18"
+
+    Raises:
+        ValueError: If a range is not "start-end" with hours from 0 to 24
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start_hour, end_hour = int(start), int(end)
+        if not (0 <= start_hour <= 24 and 0 <= end_hour <= 24):
+            raise ValueError(f"Invalid hour range '{part}'")
+        ranges.append((start_hour, end_hour))
+    return ranges
+
+
+def _in_hours(hour: int, ranges: List[Tuple[int, int]]) -> bool:
+    for start, end in ranges:
+        if start <= end and start <= hour < end:
+            return True
+        if start > end and (hour >= start or hour < end):
+            return True
+    return False
+
+
+class MaintenanceScheduler:
+    """
+    Runs ANALYZE on heavily written tables and PRAGMA optimize periodically
+
+    ``run()`` performs one pass on a pooled connection. Statistics writes
+    go through commit_write like any other write, so they do not discard
+    cached results.
+    """
+
+    def __init__(
+        self,
+        time_budget: float = MAINTENANCE_TIME_BUDGET,
+        optimize_interval: float = MAINTENANCE_OPTIMIZE_INTERVAL,
+        peak_hours: str = MAINTENANCE_PEAK_HOURS,
+        busy_connections: int = MAINTENANCE_BUSY_CONNECTIONS,
+        min_rows: int = ANALYZE_MIN_ROWS,
+        change_fraction: float = ANALYZE_CHANGE_FRACTION,
+    ):
+        self.time_budget = time_budget
+        self.optimize_interval = optimize_interval
+        self.peak_hours = parse_hours(peak_hours)
+        self.busy_connections = busy_connections
+        self.min_rows = min_rows
+        self.change_fraction = change_fraction
+
+        self._last_optimize = time.monotonic()
+        # Indexes already analyzed once; one that stays without statistics
+        # (its table is empty) is not analyzed on every pass
+        self._seen_indexes: set = set()
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._runs = 0
+        self._skipped_peak = 0
+        self._skipped_busy = 0
+        self._tables_analyzed = 0
+        self._optimizes = 0
+        self._interrupted = 0
+        self._lock_conflicts = 0
+        self._last_run_ms: Optional[float] = None
+
+    def _skip_reason(self) -> Optional[str]:
+        if _in_hours(datetime.now().hour, self.peak_hours):
+            self._skipped_peak += 1
+            return "peak_hours"
+        if pool.stats()["in_use"] >= self.busy_connections:
+            self._skipped_busy += 1
+            return "busy"
+        return None
+
+    def _due_tables(self, cursor) -> List[Tuple[str, int, List[str]]]:
+        """
+        Tables to analyze, most changed first
+
+        Returns:
+            List of (table name, rows changed, indexes without statistics)
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        tables = {row[0].lower(): row[0] for row in cursor.fetchall()}
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        analyzed_rows: Dict[str, int] = {}
+        if cursor.fetchone():
+            cursor.execute("SELECT tbl, stat FROM sqlite_stat1")
+            for table, stat in cursor.fetchall():
+                rows = int(stat.split()[0]) if stat and stat.split()[0].isdigit() else 0
+                analyzed_rows[table.lower()] = max(rows, analyzed_rows.get(table.lower(), 0))
+            cursor.execute(
+                "SELECT name, tbl_name FROM sqlite_master AS m WHERE type = 'index' "
+                "AND NOT EXISTS (SELECT 1 FROM sqlite_stat1 WHERE idx = m.name)"
+            )
+        else:
+            cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+
+        new_indexes: Dict[str, List[str]] = {}
+        for index, table in cursor.fetchall():
+            if index not in self._seen_indexes and table.lower() in tables:
+                new_indexes.setdefault(table.lower(), []).append(index)
+
+        due = []
+        for table, rows in write_volume.pending().items():
+            if table not in tables:
+                write_volume.subtract(table, rows)  # Dropped since
+            elif table in new_indexes or rows >= max(self.min_rows, self.change_fraction * analyzed_rows.get(table, 0)):
+                due.append((tables[table], rows, new_indexes.pop(table, [])))
+        due.extend((tables[table], 0, indexes) for table, indexes in new_indexes.items())
+        due.sort(key=lambda entry: entry[1], reverse=True)
+        return due
+
+    def _run_statistics(self, conn, sql: str, deadline: float) -> bool:
+        """
+        Run ANALYZE or PRAGMA optimize as a write, within the deadline
+
+        The transaction is deferred: the index reads take no lock that
+        blocks writers, and the write lock is only taken when the results
+        are stored in sqlite_stat1. The progress handler does not run while
+        SQLite waits for that lock, so the busy timeout is cut down to what
+        is left of the budget.
+
+        Returns:
+            False if the deadline interrupted it or another connection held
+            the write lock (nothing is kept)
+        """
+        conn.execute(f"PRAGMA analysis_limit = {SQLITE_ANALYSIS_LIMIT}")
+        remaining = max(0, int((deadline - time.monotonic()) * 1000))
+        conn.execute(f"PRAGMA busy_timeout = {min(remaining, SQLITE_BUSY_TIMEOUT)}")
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, _PROGRESS_INTERVAL)
+        try:
+            before = get_database_version()
+            conn.execute("BEGIN")
+            with conn.track_tables(sql) as access:
+                conn.execute(sql).fetchall()
+            commit_write(conn, access.writes | {"sqlite_stat1"} if access.known else None, before)
+            return True
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if "interrupted" in str(e):
+                self._interrupted += 1
+            elif "locked" in str(e) or "busy" in str(e):
+                self._lock_conflicts += 1
+            else:
+                raise
+            return False
+        finally:
+            conn.set_progress_handler(None, 0)
+            conn.execute("PRAGMA analysis_limit = 0")
+            conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}")
+
+    def run(self) -> Dict[str, Any]:
+        """
+        One maintenance pass
+
+        Returns:
+            Dictionary with "skipped" (the reason) or with the tables
+            "analyzed" and whether PRAGMA optimize ran ("optimized")
+        """
+        with self._lock:
+            reason = self._skip_reason()
+            if reason is not None:
+                return {"skipped": reason}
+
+            started = time.monotonic()
+            deadline = started + self.time_budget
+            analyzed = []
+            optimized = False
+            conn = get_db_connection()
+            try:
+                for table, rows, indexes in self._due_tables(conn.cursor()):
+                    if time.monotonic() >= deadline:
+                        break
+                    quoted = table.replace('"', '""')
+                    if not self._run_statistics(conn, f'ANALYZE "{quoted}"', deadline):
+                        break
+                    write_volume.subtract(table, rows)
+                    self._seen_indexes.update(indexes)
+                    analyzed.append(table)
+
+                if (self.optimize_interval > 0
+                        and started - self._last_optimize >= self.optimize_interval
+                        and time.monotonic() < deadline):
+                    optimized = self._run_statistics(conn, "PRAGMA optimize", deadline)
+                    if optimized:
+                        self._last_optimize = started
+                        self._optimizes += 1
+            finally:
+                close_db_connection(conn)
+                self._runs += 1
+                self._tables_analyzed += len(analyzed)
+                self._last_run_ms = round((time.monotonic() - started) * 1000, 3)
+
+            return {"analyzed": analyzed, "optimized": optimized}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pass counters and the number of tables with pending writes"""
+        return {
+            "runs": self._runs,
+            "skipped_peak": self._skipped_peak,
+            "skipped_busy": self._skipped_busy,
+            "tables_analyzed": self._tables_analyzed,
+            "optimizes": self._optimizes,
+            "interrupted": self._interrupted,
+            "lock_conflicts": self._lock_conflicts,
+            "pending_tables": len(write_volume.pending()),
+            "last_run_ms": self._last_run_ms,
+        }
+
+
+maintenance_scheduler = MaintenanceScheduler()
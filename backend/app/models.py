@@ -6,7 +6,7 @@ Organized by functionality: Authentication, Query Execution, and Table Managemen
 """
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal, Union
 from datetime import datetime
 
 
@@ -160,6 +160,42 @@ class QueryRequest(BaseModel):
     Accepts any valid SQL query string.
     """
     query: str = Field(..., min_length=1, description="SQL query to execute")
+    stream: bool = Field(
+        False,
+        description="Stream SELECT results as NDJSON instead of a single JSON document"
+    )
+    page_size: Optional[int] = Field(
+        None,
+        ge=1,
+        le=10000,
+        description="Return only the first page of a SELECT and a cursor for the rest"
+    )
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Wall-clock timeout in seconds (capped at the user's limit)"
+    )
+    max_rows: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Maximum rows to return (capped at the user's limit)"
+    )
+    format: Literal["objects", "rows", "columnar"] = Field(
+        "objects",
+        description=(
+            "Result shape: an object per row, a value array per row, "
+            "or a value array per column"
+        )
+    )
+    params: Optional[Union[List[Any], Dict[str, Any]]] = Field(
+        None,
+        description="Values for ? placeholders (array) or :name placeholders (object)"
+    )
+    executemany: Optional[List[Union[List[Any], Dict[str, Any]]]] = Field(
+        None,
+        min_length=1,
+        description="Run a write statement once per parameter set, in one transaction"
+    )
 
     @field_validator('query')
     def query_not_empty(cls, v):
@@ -168,10 +204,40 @@ class QueryRequest(BaseModel):
             raise ValueError('Query cannot be empty')
         return v.strip()
 
+    @field_validator('executemany')
+    def executemany_alone(cls, v, info):
+        """executemany replaces params and returns no rows to stream or page"""
+        if v is not None:
+            if info.data.get('params') is not None:
+                raise ValueError('Use either params or executemany, not both')
+            if info.data.get('stream') or info.data.get('page_size'):
+                raise ValueError('executemany cannot be combined with stream or page_size')
+        return v
+
     model_config = {
         "json_schema_extra" : {
             "example": {
-                "query": "SELECT * FROM Customers WHERE age > 25;"
+                "query": "SELECT * FROM Customers WHERE country = :country AND age > :age;",
+                "params": {"country": "USA", "age": 25}
+            }
+        }
+    }
+
+
+class ExplainRequest(BaseModel):
+    """
+    Request model for EXPLAIN QUERY PLAN
+    """
+    query: str = Field(..., description="SELECT, INSERT, UPDATE or DELETE statement to plan", min_length=1)
+    params: Optional[Union[List[Any], Dict[str, Any]]] = Field(
+        None,
+        description="Values for ? (list) or :name (object) placeholders"
+    )
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "query": "SELECT * FROM Orders o JOIN Customers c ON c.customer_id = o.customer_id ORDER BY o.amount"
             }
         }
     }
@@ -182,12 +248,24 @@ class QueryResponse(BaseModel):
     Response model for query execution
     
     Returns execution results or error information along with execution time.
+    
+    ``data`` holds one object per row by default. With ``format=rows`` it
+    holds one value array per row, and with ``format=columnar`` one value
+    array per column, both in the order of ``columns``.
     """
     success: bool = Field(..., description="Whether query executed successfully")
-    data: Optional[List[Dict[str, Any]]] = Field(None, description="Query result rows (for SELECT)")
+    data: Optional[Union[List[Dict[str, Any]], List[List[Any]]]] = Field(
+        None,
+        description="Query result rows or columns (for SELECT)"
+    )
     columns: Optional[List[str]] = Field(None, description="Column names in result")
+    format: Optional[str] = Field(None, description="Shape of data: objects, rows or columnar")
     error: Optional[str] = Field(None, description="Error message if query failed")
     execution_time: Optional[float] = Field(None, description="Query execution time in seconds")
+    cursor_id: Optional[str] = Field(None, description="Server-side cursor for the next page (paged SELECT only)")
+    has_more: Optional[bool] = Field(None, description="Whether more pages are available (paged SELECT only)")
+    cached: Optional[bool] = Field(None, description="Whether the result was served from the result cache")
+    truncated: Optional[bool] = Field(None, description="Whether rows were cut off at the row or byte limit")
 
     model_config = {
         "json_schema_extra" : {
@@ -209,6 +287,149 @@ class QueryResponse(BaseModel):
     }
 
 
+class ScriptRequest(BaseModel):
+    """
+    Request model for running a multi-statement SQL script
+    
+    Accepts any number of statements separated by semicolons.
+    """
+    script: str = Field(..., min_length=1, description="SQL statements separated by semicolons")
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Wall-clock timeout in seconds for the whole script (capped at the user's limit)"
+    )
+    max_rows: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Maximum rows to return across all statements (capped at the user's limit)"
+    )
+    format: Literal["objects", "rows", "columnar"] = Field(
+        "objects",
+        description="Shape of the rows returned by each statement"
+    )
+
+    @field_validator('script')
+    def script_not_empty(cls, v):
+        """Ensure script is not just whitespace"""
+        if not v.strip():
+            raise ValueError('Script cannot be empty')
+        return v.strip()
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "script": (
+                    "CREATE TABLE Regions (region_id INTEGER PRIMARY KEY, name TEXT);\n"
+                    "INSERT INTO Regions (name) VALUES ('EMEA'), ('APAC');\n"
+                    "SELECT * FROM Regions;"
+                )
+            }
+        }
+    }
+
+
+class ScriptStatementResult(BaseModel):
+    """
+    Model for the outcome of one statement of a script
+    """
+    statement: str = Field(..., description="The statement as it was run")
+    columns: Optional[List[str]] = Field(None, description="Column names (statements that return rows)")
+    data: Optional[Union[List[Dict[str, Any]], List[List[Any]]]] = Field(
+        None,
+        description="Rows or columns returned, in the requested format"
+    )
+    affected_rows: Optional[int] = Field(None, description="Rows changed (statements that return no rows)")
+
+
+class ScriptResponse(BaseModel):
+    """
+    Response model for script execution
+    
+    On failure nothing the script did is kept, and ``statement_index``
+    points at the statement that failed.
+    """
+    success: bool = Field(..., description="Whether every statement succeeded")
+    results: List[ScriptStatementResult] = Field(default_factory=list, description="One entry per statement")
+    format: Optional[str] = Field(None, description="Shape of data: objects, rows or columnar")
+    error: Optional[str] = Field(None, description="Error message if the script failed")
+    statement_index: Optional[int] = Field(None, description="Zero-based index of the failing statement")
+    execution_time: Optional[float] = Field(None, description="Script execution time in seconds")
+    truncated: Optional[bool] = Field(None, description="Whether rows were cut off at the row or byte limit")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "success": True,
+                "results": [
+                    {"statement": "CREATE TABLE Regions (region_id INTEGER PRIMARY KEY, name TEXT);", "affected_rows": 0},
+                    {"statement": "INSERT INTO Regions (name) VALUES ('EMEA'), ('APAC');", "affected_rows": 2},
+                    {
+                        "statement": "SELECT * FROM Regions;",
+                        "columns": ["region_id", "name"],
+                        "data": [{"region_id": 1, "name": "EMEA"}, {"region_id": 2, "name": "APAC"}]
+                    }
+                ],
+                "format": "objects",
+                "execution_time": 0.0041
+            }
+        }
+    }
+
+
+class PlanNode(BaseModel):
+    """
+    Model for one step of a query plan
+    """
+    id: int = Field(..., description="Step id reported by SQLite")
+    detail: str = Field(..., description="Step description, e.g. 'SCAN Orders'")
+    flags: List[Literal["full_scan", "temp_btree", "automatic_index"]] = Field(..., description="Costly operations in this step")
+    children: List["PlanNode"] = Field(..., description="Nested steps")
+
+
+class PlanWarning(BaseModel):
+    """
+    Model for a costly step of a query plan and how to avoid it
+    """
+    id: int = Field(..., description="Id of the plan step")
+    kind: Literal["full_scan", "temp_btree", "automatic_index"] = Field(..., description="What makes the step costly")
+    detail: str = Field(..., description="Step description")
+    table: Optional[str] = Field(None, description="Table the step reads")
+    estimated_rows: Optional[int] = Field(None, description="Rows in the table according to sqlite_stat1, if analyzed")
+    hint: str = Field(..., description="How to avoid it")
+
+
+class ExplainResponse(BaseModel):
+    """
+    Response model for EXPLAIN QUERY PLAN
+    
+    The plan as a tree, with full table scans, temporary B-trees and
+    automatic indexes flagged and listed in ``warnings``.
+    """
+    statement_type: str = Field(..., description="Statement kind, as classified for /query/execute")
+    plan: List[PlanNode] = Field(..., description="Top-level plan steps")
+    warnings: List[PlanWarning] = Field(..., description="Flagged steps, in plan order")
+    execution_time: float = Field(..., description="Time taken to plan, in seconds")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "statement_type": "select",
+                "plan": [
+                    {"id": 4, "detail": "SCAN o", "flags": ["full_scan"], "children": []},
+                    {"id": 6, "detail": "SEARCH c USING INTEGER PRIMARY KEY (rowid=?)", "flags": [], "children": []},
+                    {"id": 21, "detail": "USE TEMP B-TREE FOR ORDER BY", "flags": ["temp_btree"], "children": []}
+                ],
+                "warnings": [
+                    {"id": 4, "kind": "full_scan", "detail": "SCAN o", "table": "Orders", "estimated_rows": 250000, "hint": "Every row of Orders is read; an index on the columns in its WHERE or JOIN condition would let SQLite SEARCH instead"},
+                    {"id": 21, "kind": "temp_btree", "detail": "USE TEMP B-TREE FOR ORDER BY", "table": None, "estimated_rows": None, "hint": "All rows are collected in a temporary B-tree for ORDER BY before the first one is returned; an index matching the ORDER BY columns avoids it"}
+                ],
+                "execution_time": 0.0004
+            }
+        }
+    }
+
+
 class QueryHistoryItem(BaseModel):
     """
     Model for a single query history entry
@@ -234,6 +455,138 @@ class QueryHistoryItem(BaseModel):
     }
 
 
+class CursorPageResponse(BaseModel):
+    """
+    Response model for a page fetched from a server-side cursor
+    
+    The cursor is closed automatically once has_more is False.
+    """
+    cursor_id: str = Field(..., description="Server-side cursor identifier")
+    data: List[Dict[str, Any]] = Field(..., description="Rows in this page")
+    columns: List[str] = Field(..., description="Column names in result")
+    has_more: bool = Field(..., description="Whether more pages are available")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "cursor_id": "3f2c9a7e5b1d4e8f9a0b1c2d3e4f5a6b",
+                "data": [
+                    {
+                        "customer_id": 3,
+                        "first_name": "David",
+                        "last_name": "Robinson",
+                        "age": 22,
+                        "country": "UK"
+                    }
+                ],
+                "columns": ["customer_id", "first_name", "last_name", "age", "country"],
+                "has_more": True
+            }
+        }
+    }
+
+
+class ExportRequest(BaseModel):
+    """
+    Request model for exporting SELECT results as Arrow IPC, Parquet or CSV
+    
+    Accepts a single SELECT query.
+    """
+    query: str = Field(..., min_length=1, description="SQL SELECT query to export")
+    format: Literal["arrow", "parquet", "csv"] = Field(
+        "arrow",
+        description="Arrow IPC stream, Parquet file or CSV"
+    )
+    gzip: bool = Field(
+        False,
+        description="Gzip-compress the file (CSV only)"
+    )
+
+    @field_validator('query')
+    def query_not_empty(cls, v):
+        """Ensure query is not just whitespace"""
+        if not v.strip():
+            raise ValueError('Query cannot be empty')
+        return v.strip()
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "query": "SELECT * FROM Orders;",
+                "format": "parquet"
+            }
+        }
+    }
+
+
+class JobRequest(BaseModel):
+    """
+    Request model for submitting a background query job
+    
+    Accepts any valid SQL query string.
+    """
+    query: str = Field(..., min_length=1, description="SQL query to run in the background")
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Wall-clock timeout in seconds (capped at the user's job limit)"
+    )
+    max_rows: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Maximum rows to return (capped at the user's limit)"
+    )
+
+    @field_validator('query')
+    def query_not_empty(cls, v):
+        """Ensure query is not just whitespace"""
+        if not v.strip():
+            raise ValueError('Query cannot be empty')
+        return v.strip()
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "query": "SELECT country, COUNT(*) FROM Customers GROUP BY country;"
+            }
+        }
+    }
+
+
+class JobResponse(BaseModel):
+    """
+    Response model for a background query job
+    
+    Reports job status and progress; the query result is included once the
+    job has finished.
+    """
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="pending, running, succeeded, failed or cancelled")
+    query: str = Field(..., description="SQL query being executed")
+    created_at: datetime = Field(..., description="Submission timestamp")
+    started_at: Optional[datetime] = Field(None, description="Execution start timestamp")
+    finished_at: Optional[datetime] = Field(None, description="Completion timestamp")
+    rows_fetched: int = Field(0, description="Rows fetched so far")
+    elapsed: Optional[float] = Field(None, description="Seconds spent executing so far")
+    result: Optional[QueryResponse] = Field(None, description="Query result once the job has finished")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "job_id": "9b1f0c2d3e4a5b6c7d8e9f0a1b2c3d4e",
+                "status": "running",
+                "query": "SELECT country, COUNT(*) FROM Customers GROUP BY country;",
+                "created_at": "2025-10-24T12:00:00",
+                "started_at": "2025-10-24T12:00:00.120000",
+                "finished_at": None,
+                "rows_fetched": 0,
+                "elapsed": 4.2,
+                "result": None
+            }
+        }
+    }
+
+
 # ============================================================================
 # TABLE MANAGEMENT MODELS
 # ============================================================================
@@ -322,6 +675,199 @@ class TableInfoResponse(BaseModel):
     }
 
 
+class ImportedColumn(BaseModel):
+    """
+    Model for a column of a table loaded by a bulk import
+    """
+    name: str = Field(..., description="Column name")
+    type: str = Field(..., description="Declared column type")
+
+
+class IndexInfo(BaseModel):
+    """
+    Model for an index of a table
+    """
+    name: str = Field(..., description="Index name")
+    unique: bool = Field(..., description="Whether the index enforces uniqueness")
+    origin: str = Field(..., description="How it was created: 'c' (CREATE INDEX), 'u' (UNIQUE) or 'pk' (PRIMARY KEY)")
+    partial: bool = Field(..., description="Whether the index has a WHERE clause")
+    columns: List[Optional[str]] = Field(..., description="Indexed columns in key order; null for expressions")
+
+
+class ForeignKeyInfo(BaseModel):
+    """
+    Model for a foreign key of a table
+    """
+    id: int = Field(..., description="Foreign key number within the table")
+    table: str = Field(..., description="Referenced table")
+    columns: List[str] = Field(..., description="Columns of this table")
+    referenced_columns: List[Optional[str]] = Field(..., description="Referenced columns; null for the primary key")
+    on_update: str = Field(..., description="ON UPDATE action")
+    on_delete: str = Field(..., description="ON DELETE action")
+
+
+class SchemaTable(BaseModel):
+    """
+    Model for the schema of one table in the catalog
+    """
+    columns: List[ColumnInfo] = Field(..., description="Column schema information")
+    indexes: List[IndexInfo] = Field(..., description="Indexes, including those behind UNIQUE and PRIMARY KEY")
+    foreign_keys: List[ForeignKeyInfo] = Field(..., description="Foreign keys")
+
+
+class SchemaResponse(BaseModel):
+    """
+    Response model for the schema catalog
+    
+    Without ``since`` it holds every table. With ``since`` it only holds
+    the tables added or changed after that version and the names of the
+    tables dropped since.
+    """
+    version: int = Field(..., description="Schema version of this catalog")
+    since: Optional[int] = Field(None, description="Version this is a diff against; null for the full catalog")
+    tables: Dict[str, SchemaTable] = Field(..., description="Tables by name")
+    removed: List[str] = Field(..., description="Tables dropped since the 'since' version")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "version": 12,
+                "since": None,
+                "tables": {
+                    "Orders": {
+                        "columns": [
+                            {"name": "order_id", "type": "INTEGER", "notnull": False, "default_value": None, "primary_key": True},
+                            {"name": "customer_id", "type": "INTEGER", "notnull": False, "default_value": None, "primary_key": False}
+                        ],
+                        "indexes": [
+                            {"name": "idx_orders_customer", "unique": False, "origin": "c", "partial": False, "columns": ["customer_id"]}
+                        ],
+                        "foreign_keys": [
+                            {"id": 0, "table": "Customers", "columns": ["customer_id"], "referenced_columns": ["customer_id"], "on_update": "NO ACTION", "on_delete": "CASCADE"}
+                        ]
+                    }
+                },
+                "removed": []
+            }
+        }
+    }
+
+
+class HistogramBucket(BaseModel):
+    """
+    Model for one bucket of an equi-depth column histogram
+    """
+    upper: Any = Field(..., description="Inclusive upper boundary value")
+    rows: int = Field(..., description="Estimated rows above the previous boundary, up to this one")
+    equal: int = Field(..., description="Estimated rows equal to the boundary")
+
+
+class IndexStats(BaseModel):
+    """
+    Model for the selectivity of an index
+    """
+    name: str = Field(..., description="Index name")
+    columns: List[Optional[str]] = Field(..., description="Indexed columns; null for expressions")
+    unique: bool = Field(..., description="Whether the index enforces uniqueness")
+    rows_per_key: List[int] = Field(..., description="Average rows per distinct value of each key prefix")
+    selectivity: Optional[float] = Field(None, description="Fraction of the table an equality lookup on the full key returns")
+    source: Literal["analyze", "sample"] = Field(..., description="Whether the numbers come from sqlite_stat1 or the row sample")
+
+
+class ColumnStats(BaseModel):
+    """
+    Model for the value distribution of a column
+    """
+    name: str = Field(..., description="Column name")
+    distinct_count: int = Field(..., description="Estimated distinct non-NULL values")
+    null_fraction: float = Field(..., description="Fraction of NULL values in the sample")
+    histogram: List[HistogramBucket] = Field(..., description="Equi-depth histogram (blobs are left out)")
+    histogram_source: Optional[Literal["stat4", "sample"]] = Field(None, description="Where the histogram comes from")
+
+
+class TableStatsResponse(BaseModel):
+    """
+    Response model for table statistics
+    
+    Row count, index selectivity and per-column distributions, from
+    ANALYZE output where available and a random row sample otherwise.
+    Large tables are never counted in full, so row_count is only exact
+    when row_count_source is "count".
+    """
+    table: str = Field(..., description="Table name")
+    row_count: int = Field(..., description="Number of rows")
+    row_count_source: Literal["count", "analyze", "estimate"] = Field(
+        ...,
+        description="Whether row_count was counted, read from sqlite_stat1 or estimated from the rowid range"
+    )
+    analyzed: bool = Field(..., description="Whether ANALYZE has statistics for this table")
+    sample_rows: int = Field(..., description="Rows in the random sample")
+    indexes: List[IndexStats] = Field(..., description="Index selectivity")
+    columns: List[ColumnStats] = Field(..., description="Column value distributions")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "table": "Orders",
+                "row_count": 250000,
+                "row_count_source": "analyze",
+                "analyzed": True,
+                "sample_rows": 10000,
+                "indexes": [
+                    {"name": "idx_orders_customer", "columns": ["customer_id"], "unique": False, "rows_per_key": [25], "selectivity": 0.0001, "source": "analyze"}
+                ],
+                "columns": [
+                    {
+                        "name": "amount",
+                        "distinct_count": 1870,
+                        "null_fraction": 0.012,
+                        "histogram": [
+                            {"upper": 100, "rows": 125000, "equal": 2050},
+                            {"upper": 2400, "rows": 123000, "equal": 25}
+                        ],
+                        "histogram_source": "sample"
+                    }
+                ]
+            }
+        }
+    }
+
+
+class ImportResponse(BaseModel):
+    """
+    Response model for bulk CSV/NDJSON imports
+    
+    Reports the target table, how many rows were loaded and how fast.
+    """
+    success: bool = Field(..., description="Whether the import succeeded")
+    table: str = Field(..., description="Table the rows were loaded into")
+    created: bool = Field(..., description="Whether the table was created by the import")
+    columns: List[ImportedColumn] = Field(..., description="Columns of the table")
+    rows_imported: int = Field(..., description="Number of rows inserted")
+    indexes_created: List[str] = Field(default_factory=list, description="Indexes built after loading")
+    execution_time: float = Field(..., description="Import duration in seconds")
+    rows_per_second: float = Field(..., description="Import throughput")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "success": True,
+                "table": "Payments",
+                "created": True,
+                "columns": [
+                    {"name": "payment_id", "type": "INTEGER"},
+                    {"name": "amount", "type": "REAL"},
+                    {"name": "method", "type": "TEXT"}
+                ],
+                "rows_imported": 250000,
+                "indexes_created": ["idx_Payments_method"],
+                "execution_time": 1.84,
+                "rows_per_second": 135869.6
+            }
+        }
+    }
+
+
 # ============================================================================
 # HEALTH CHECK MODEL
 # ============================================================================
@@ -347,6 +893,42 @@ class HealthResponse(BaseModel):
     }
 
 
+class MetricsResponse(BaseModel):
+    """
+    Response model for runtime metrics
+    
+    Exposes counters of the connection pool, server-side cursors,
+    background jobs, result cache and history writer for monitoring.
+    """
+    pool: Dict[str, Any] = Field(..., description="Connection pool usage")
+    cursors: Dict[str, Any] = Field(..., description="Open server-side cursors")
+    jobs: Dict[str, Any] = Field(..., description="Background jobs by status")
+    result_cache: Dict[str, Any] = Field(..., description="Result cache hit/miss statistics")
+    auth_cache: Dict[str, Any] = Field(..., description="Validated token cache statistics")
+    password_hashing: Dict[str, Any] = Field(..., description="Password hash/verify concurrency and latency")
+    history_writer: Dict[str, Any] = Field(..., description="Query history queue depth and flush latency")
+    schema_cache: Dict[str, Any] = Field(..., description="Schema catalog version, reloads and sample row cache statistics")
+    table_stats: Dict[str, Any] = Field(..., description="Table statistics sample cache hits and misses")
+    maintenance: Dict[str, Any] = Field(..., description="Background ANALYZE / PRAGMA optimize passes")
+
+    model_config = {
+        "json_schema_extra" : {
+            "example": {
+                "pool": {"size": 8, "open": 3, "idle": 2, "in_use": 1, "long_lived": 0, "max_long_lived": 4, "long_lived_refused": 0, "checkouts": 120, "waits": 0, "timeouts": 0, "replaced": 0},
+                "cursors": {"open": 1},
+                "jobs": {"pending": 0, "running": 1, "succeeded": 3, "failed": 0, "cancelled": 1},
+                "result_cache": {"entries": 12, "bytes": 48213, "max_bytes": 67108864, "hits": 85, "misses": 12, "hit_ratio": 0.8763, "evictions": 0, "invalidations": 4},
+                "auth_cache": {"entries": 2, "max_entries": 1024, "ttl": 60.0, "hits": 140, "misses": 2, "hit_ratio": 0.9859, "invalidations": 0},
+                "password_hashing": {"workers": 4, "running": 1, "waiting": 0, "rejected": 0, "hash": {"count": 2, "avg_ms": 251.2, "max_ms": 263.9, "avg_wait_ms": 0.04, "max_wait_ms": 0.05}, "verify": {"count": 15, "avg_ms": 248.7, "max_ms": 301.5, "avg_wait_ms": 12.3, "max_wait_ms": 95.1}},
+                "history_writer": {"running": True, "queue_depth": 3, "max_queue": 10000, "flushes": 41, "records_written": 97, "sync_writes": 0, "errors": 0, "retries": 0, "records_dropped": 0, "last_flush_ms": 1.204, "max_flush_ms": 6.871, "avg_flush_ms": 1.532},
+                "schema_cache": {"schema_version": 14, "tables": 6, "versions_kept": 2, "reloads": 3, "background_reloads": 1, "sample_hits": 27, "sample_misses": 5},
+                "table_stats": {"tables": 2, "hits": 9, "misses": 3},
+                "maintenance": {"runs": 42, "skipped_peak": 0, "skipped_busy": 1, "tables_analyzed": 3, "optimizes": 1, "interrupted": 0, "lock_conflicts": 0, "pending_tables": 2, "last_run_ms": 12.5}
+            }
+        }
+    }
+
+
 # ============================================================================
 # ERROR RESPONSE MODEL
 # ============================================================================
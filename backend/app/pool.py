@@ -0,0 +1,273 @@
+"""
+SQLite connection pool for SQL Runner
+
+Keeps a bounded set of long-lived sqlite3 connections open so that request
+handlers do not pay the connect/close cost (and lose SQLite's page cache)
+on every database call.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections
+
+    Connections are created lazily up to ``size``. Callers that find the pool
+    exhausted wait up to ``timeout`` seconds for a connection to be released.
+    Every new connection is created with ``factory`` as its class, gets
+    ``sqlite3.Row`` as row factory, room for ``cached_statements`` prepared
+    statements and has the configured PRAGMAs applied.
+    Connections that have been idle longer than ``health_check_interval``
+    are pinged before being handed out, and broken ones are replaced
+    transparently. ``on_close`` is called with every idle connection when
+    the pool is closed, just before the connection itself is closed.
+
+    Streams, server-side cursors, exports and jobs keep a connection
+    checked out across many short pieces of work. They acquire it with
+    ``long_lived=True`` and at most ``max_long_lived`` of them are out at
+    once; one more is refused straight away instead of waiting, so the
+    other ``size - max_long_lived`` connections always stay free for short
+    requests.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        size: int = 5,
+        timeout: float = 30.0,
+        pragmas: Optional[Dict[str, Any]] = None,
+        health_check_interval: float = 30.0,
+        factory: Type[sqlite3.Connection] = sqlite3.Connection,
+        cached_statements: int = 128,
+        on_close: Optional[Callable[[sqlite3.Connection], None]] = None,
+        max_long_lived: Optional[int] = None,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.health_check_interval = health_check_interval
+        self.factory = factory
+        self.cached_statements = cached_statements
+        self.on_close = on_close
+        self.max_long_lived = size if max_long_lived is None else max(0, min(max_long_lived, size))
+
+        self._idle: List[sqlite3.Connection] = []
+        self._last_used: Dict[int, float] = {}
+        self._created = 0
+        # Long-lived checkouts, counted from before the connection is handed out
+        self._long_lived = 0
+        self._long_lived_ids: set = set()
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        # Counters reported by stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._long_lived_refused = 0
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply per-connection setup"""
+        conn = sqlite3.connect(
+            self.database,
+            check_same_thread=False,
+            factory=self.factory,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row  # Access columns by name
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Ping a connection that has been idle for a while"""
+        last_used = self._last_used.get(id(conn), 0.0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Close a connection and free its slot (caller holds the lock)"""
+        self._last_used.pop(id(conn), None)
+        self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self, timeout: Optional[float] = None, long_lived: bool = False) -> sqlite3.Connection:
+        """
+        Check a connection out of the pool
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to pool timeout)
+            long_lived: The connection stays checked out across many pieces
+                of work (a stream, cursor, export or job)
+
+        Returns:
+            An open sqlite3 connection
+
+        Raises:
+            PoolTimeoutError: If no connection is released within the timeout,
+                or if max_long_lived long-lived connections are already out
+        """
+        if not long_lived:
+            return self._acquire(timeout)
+
+        with self._cond:
+            if self._long_lived >= self.max_long_lived:
+                self._long_lived_refused += 1
+                raise PoolTimeoutError(
+                    f"All {self.max_long_lived} connections for streams, cursors, exports "
+                    "and jobs are in use, try again later"
+                )
+            self._long_lived += 1
+        try:
+            conn = self._acquire(timeout)
+        except BaseException:
+            with self._cond:
+                self._long_lived -= 1
+            raise
+        with self._cond:
+            self._long_lived_ids.add(id(conn))
+        return conn
+
+    def _acquire(self, timeout: Optional[float]) -> sqlite3.Connection:
+        """Check a connection out, waiting up to timeout for one to be released"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+
+                while self._idle:
+                    conn = self._idle.pop()
+                    if self._is_healthy(conn):
+                        self._checkouts += 1
+                        return conn
+                    self._discard(conn)
+                    self._replaced += 1
+
+                if self._created < self.size:
+                    # Reserve the slot before connecting outside the lock
+                    self._created += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {timeout:.1f}s waiting for a database connection"
+                    )
+                self._waits += 1
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._checkouts += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        """
+        Return a connection to the pool
+
+        Any transaction left open by the caller is rolled back so the next
+        user starts from a clean state.
+
+        Args:
+            conn: Connection checked out with acquire()
+            discard: Close the connection instead of reusing it, e.g. when
+                the caller could not restore a setting it changed
+        """
+        healthy = not discard
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+
+        with self._cond:
+            if id(conn) in self._long_lived_ids:
+                self._long_lived_ids.discard(id(conn))
+                self._long_lived -= 1
+            if self._closed or not healthy:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """Context manager that acquires and releases a pooled connection"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            closing, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        # on_close may take a while; run it without holding the lock
+        for conn in closing:
+            if self.on_close is not None:
+                try:
+                    self.on_close(conn)
+                except sqlite3.Error:
+                    pass
+            with self._cond:
+                self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "cached_statements": self.cached_statements,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+                "long_lived": self._long_lived,
+                "max_long_lived": self.max_long_lived,
+                "long_lived_refused": self._long_lived_refused,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+            }
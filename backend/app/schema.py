@@ -0,0 +1,333 @@
+"""
+Schema catalog for the table browser
+
+The frontend sidebar asks for the table list and table details all the
+time, and each request used to open a connection, query sqlite_master and
+run PRAGMA table_info. The catalog keeps the user tables and their columns
+in memory and only reads them again when PRAGMA schema_version changes,
+which every CREATE, DROP and ALTER does. A background task reloads it
+shortly after a schema change made by any process, so requests rarely wait
+for a reload.
+
+The whole catalog (columns, indexes and foreign keys of every table) is
+read with three queries that join sqlite_master with the table-valued
+pragma functions, instead of three PRAGMA statements per table. A few
+previous versions are kept, so a client holding an older catalog can ask
+for only the tables that changed since.
+
+Responses carry an ETag built from the schema version (and, for table
+details with their sample rows, the version of that table's data), so a
+client revalidating unchanged metadata gets a 304 for the cost of one
+version check. Table data versions are only known to the process that
+issued them (see cache.TableVersions), so table detail ETags from before a
+restart or from another worker never match.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import (
+    close_db_connection,
+    get_database_version,
+    get_db_connection,
+    get_tables_version,
+)
+
+# Seconds between background checks for schema changes
+SCHEMA_REFRESH_INTERVAL = float(os.getenv('SCHEMA_REFRESH_INTERVAL', '5'))
+
+# Previous catalog versions kept for diffs
+SCHEMA_HISTORY = int(os.getenv('SCHEMA_HISTORY', '16'))
+
+# Rows of sample data returned with table details
+SCHEMA_SAMPLE_ROWS = 5
+
+# Tables shown to users, as in fetch_table_names()
+_USER_TABLES = (
+    "m.type = 'table' AND m.name NOT LIKE 'sqlite_%' "
+    "AND m.name NOT IN ('users', 'query_history')"
+)
+
+_COLUMNS_SQL = f"""
+    SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+    FROM sqlite_master AS m, pragma_table_info(m.name) AS p
+    WHERE {_USER_TABLES}
+    ORDER BY m.name, p.cid
+"""
+
+_INDEXES_SQL = f"""
+    SELECT m.name, il.name, il."unique", il.origin, il.partial, ii.name
+    FROM sqlite_master AS m, pragma_index_list(m.name) AS il, pragma_index_info(il.name) AS ii
+    WHERE {_USER_TABLES}
+    ORDER BY m.name, il.name, ii.seqno
+"""
+
+_FOREIGN_KEYS_SQL = f"""
+    SELECT m.name, fk.id, fk."table", fk."from", fk."to", fk.on_update, fk.on_delete
+    FROM sqlite_master AS m, pragma_foreign_key_list(m.name) AS fk
+    WHERE {_USER_TABLES}
+    ORDER BY m.name, fk.id, fk.seq
+"""
+
+# {table name: {"columns": [...], "indexes": [...], "foreign_keys": [...]}}
+Catalog = Dict[str, Dict[str, List[Dict[str, Any]]]]
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for a response derived from the given version parts"""
+    return '"' + hashlib.sha1(repr(parts).encode("utf-8")).hexdigest() + '"'
+
+
+def fetch_schema(cursor) -> Catalog:
+    """
+    Read the columns, indexes and foreign keys of all user tables
+
+    Args:
+        cursor: Cursor to query with; run it inside a transaction for a
+            consistent snapshot
+
+    Returns:
+        Dictionary of tables by name, sorted by name. Columns have the
+        shape of fetch_table_columns(); an index column is None when it
+        is an expression; foreign keys list their columns in key order
+        (a referenced column is None when the key targets the primary key)
+    """
+    tables: Catalog = {}
+    cursor.execute(_COLUMNS_SQL)
+    for table, name, declared, notnull, default, pk in cursor.fetchall():
+        entry = tables.setdefault(table, {"columns": [], "indexes": [], "foreign_keys": []})
+        entry["columns"].append({
+            "name": name,
+            "type": declared,
+            "notnull": bool(notnull),
+            "default_value": default,
+            "primary_key": bool(pk)
+        })
+
+    cursor.execute(_INDEXES_SQL)
+    for table, name, unique, origin, partial, column in cursor.fetchall():
+        indexes = tables[table]["indexes"]
+        if not indexes or indexes[-1]["name"] != name:
+            indexes.append({
+                "name": name,
+                "unique": bool(unique),
+                "origin": origin,
+                "partial": bool(partial),
+                "columns": []
+            })
+        indexes[-1]["columns"].append(column)
+
+    cursor.execute(_FOREIGN_KEYS_SQL)
+    for table, key_id, target, column, referenced, on_update, on_delete in cursor.fetchall():
+        keys = tables[table]["foreign_keys"]
+        if not keys or keys[-1]["id"] != key_id:
+            keys.append({
+                "id": key_id,
+                "table": target,
+                "columns": [],
+                "referenced_columns": [],
+                "on_update": on_update,
+                "on_delete": on_delete
+            })
+        keys[-1]["columns"].append(column)
+        keys[-1]["referenced_columns"].append(referenced)
+
+    return tables
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the current ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class SchemaCatalog:
+    """
+    In-memory snapshot of the user tables, their columns, indexes and
+    foreign keys
+
+    The snapshot is tagged with the schema_version it was read at and is
+    reloaded, in one read transaction, whenever the database's
+    schema_version differs. The last ``history`` snapshots are kept for
+    diffs. Sample rows are cached per table and dropped when that table's
+    data version changes.
+    """
+
+    def __init__(self, sample_rows: int = SCHEMA_SAMPLE_ROWS, history: int = SCHEMA_HISTORY):
+        self.sample_rows = sample_rows
+        self.history = history
+        self._snapshot: Optional[Tuple[int, Catalog]] = None
+        self._previous: "OrderedDict[int, Catalog]" = OrderedDict()
+        self._samples: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        self._reload_lock = threading.Lock()
+        self._samples_lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._reloads = 0
+        self._background_reloads = 0
+        self._sample_hits = 0
+        self._sample_misses = 0
+
+    def _load(self) -> Tuple[int, Catalog]:
+        """Read the schema version and the catalog in one snapshot"""
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.execute("PRAGMA schema_version")
+            version = cursor.fetchone()[0]
+            tables = fetch_schema(cursor)
+            conn.rollback()
+            return version, tables
+        finally:
+            close_db_connection(conn)
+
+    def refresh(self, background: bool = False) -> Tuple[int, Catalog]:
+        """
+        Reload the snapshot if the schema changed since it was read
+
+        Args:
+            background: Whether the call comes from the background refresher
+                (only affects the counters)
+
+        Returns:
+            Tuple of (schema version, catalog)
+        """
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[0] != get_database_version()[1]:
+                if snapshot is not None:
+                    self._previous[snapshot[0]] = snapshot[1]
+                    while len(self._previous) > self.history:
+                        self._previous.popitem(last=False)
+                snapshot = self._load()
+                self._snapshot = snapshot
+                self._reloads += 1
+                if background:
+                    self._background_reloads += 1
+                with self._samples_lock:
+                    for name in set(self._samples) - set(snapshot[1]):
+                        del self._samples[name]
+            return snapshot
+
+    def snapshot(self) -> Tuple[int, Catalog]:
+        """Current snapshot; costs one version check while the schema is unchanged"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == get_database_version()[1]:
+            return snapshot
+        return self.refresh()
+
+    def tables(self) -> Tuple[str, List[str]]:
+        """
+        Names of the user tables
+
+        Returns:
+            Tuple of (ETag, sorted table names)
+        """
+        version, tables = self.snapshot()
+        return make_etag("tables", version), list(tables)
+
+    def table_etag(self, table_name: str) -> Optional[str]:
+        """
+        ETag of a table's details, or None if the table does not exist
+
+        Built from the schema version and the table's version token, which
+        carries this process's nonce, so it never matches an ETag issued
+        before a restart or by another worker.
+        """
+        version, tables = self.snapshot()
+        if table_name not in tables:
+            return None
+        return make_etag("table", table_name, version, get_tables_version([table_name]))
+
+    def schema(self, since: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        The whole catalog, or what changed in it since an earlier version
+
+        Args:
+            since: Schema version the client already has. If it is still
+                kept, only tables added or changed since then are returned,
+                with the names of dropped tables in ``removed``
+
+        Returns:
+            Tuple of (ETag, {"version", "since", "tables", "removed"});
+            ``since`` is None when the full catalog is returned
+        """
+        version, tables = self.snapshot()
+        with self._reload_lock:
+            previous = tables if since == version else self._previous.get(since)
+        if since is None or previous is None:
+            return make_etag("schema", version), {
+                "version": version, "since": None, "tables": tables, "removed": []
+            }
+        changed = {name: table for name, table in tables.items() if previous.get(name) != table}
+        removed = [name for name in previous if name not in tables]
+        return make_etag("schema", version, since), {
+            "version": version, "since": since, "tables": changed, "removed": removed
+        }
+
+    def table_info(self, table_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Columns and sample rows of a table
+
+        Args:
+            table_name: Name of the table (matched exactly)
+
+        Returns:
+            Tuple of (ETag, {"columns": ..., "sample_data": ...}), or None if
+            the table does not exist
+        """
+        etag = self.table_etag(table_name)
+        if etag is None:
+            return None
+        columns = self._snapshot[1].get(table_name, {}).get("columns", [])
+
+        with self._samples_lock:
+            cached = self._samples.get(table_name)
+            if cached is not None and cached[0] == etag:
+                self._sample_hits += 1
+                return etag, {"columns": columns, "sample_data": cached[1]}
+            self._sample_misses += 1
+
+        before = get_database_version()
+        conn = get_db_connection()
+        try:
+            quoted = table_name.replace('"', '""')
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT * FROM "{quoted}" LIMIT {self.sample_rows};')
+            sample_data = [dict(row) for row in cursor.fetchall()]
+        finally:
+            close_db_connection(conn)
+
+        # Rows read while another write committed may be newer than the
+        # ETag. Sending them under the older ETag is safe (the client's next
+        # revalidation gets a 200), but caching them under it is not
+        if get_database_version() == before and self.table_etag(table_name) == etag:
+            with self._samples_lock:
+                self._samples[table_name] = (etag, sample_data)
+        return etag, {"columns": columns, "sample_data": sample_data}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot and cache counters"""
+        snapshot = self._snapshot
+        with self._samples_lock:
+            return {
+                "schema_version": snapshot[0] if snapshot else None,
+                "tables": len(snapshot[1]) if snapshot else 0,
+                "versions_kept": len(self._previous),
+                "reloads": self._reloads,
+                "background_reloads": self._background_reloads,
+                "sample_hits": self._sample_hits,
+                "sample_misses": self._sample_misses,
+            }
+
+
+schema_catalog = SchemaCatalog()
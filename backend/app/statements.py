@@ -0,0 +1,238 @@
+"""
+SQL statement classification
+
+execute_query needs to know what kind of statement it is running before
+it runs it: read-only statements skip the write bookkeeping and may be
+cached, and writes get a status message for their kind. Looking at the
+first characters of the upper-cased text got this wrong for statements
+starting with a comment and for WITH ... SELECT, VALUES, EXPLAIN and
+PRAGMA. A small lexer skips whitespace and comments, steps over string
+literals and quoted identifiers and tracks parentheses, so the leading
+keywords of a statement (and the main verb after a WITH clause) are read
+reliably. Whether a statement actually returns rows is only known once it
+ran, from cursor.description.
+"""
+
+from itertools import chain
+from typing import Iterator, List, Optional, Tuple
+
+# Token kinds
+WORD = "word"          # Keyword or bare identifier
+QUOTED = "quoted"      # "identifier", `identifier` or [identifier]
+STRING = "string"      # 'literal'
+NUMBER = "number"
+SYMBOL = "symbol"      # Operators and punctuation, one character each
+
+_CLOSING_QUOTES = {'"': '"', "`": "`", "[": "]"}
+
+# Verbs that can follow a WITH clause
+_WITH_VERBS = frozenset({"SELECT", "VALUES", "INSERT", "REPLACE", "UPDATE", "DELETE"})
+
+_VERB_KINDS = {
+    "SELECT": "select",
+    "VALUES": "select",
+    "INSERT": "insert",
+    "REPLACE": "insert",
+    "UPDATE": "update",
+    "DELETE": "delete",
+}
+
+# Statements that only read, whatever else they are
+READ_ONLY_KINDS = frozenset({"select", "explain"})
+
+# Statements that change the connection itself rather than the database
+SESSION_KINDS = frozenset({"pragma", "attach", "detach"})
+
+
+def tokenize(sql: str) -> Iterator[Tuple[str, str]]:
+    """
+    Split SQL text into (kind, text) tokens
+
+    Whitespace and comments are skipped. Unterminated literals, quoted
+    identifiers and block comments run to the end of the text, as they
+    would in SQLite's own error message.
+    """
+    i = 0
+    length = len(sql)
+
+    while i < length:
+        char = sql[i]
+
+        if char.isspace():
+            i += 1
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end + 1
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        elif char == "'" or char in _CLOSING_QUOTES:
+            closing = _CLOSING_QUOTES.get(char, "'")
+            end = sql.find(closing, i + 1)
+            # Doubled quote characters escape themselves
+            while end != -1 and closing != "]" and sql[end + 1:end + 2] == closing:
+                end = sql.find(closing, end + 2)
+            end = length - 1 if end == -1 else end
+            yield (STRING if char == "'" else QUOTED), sql[i:end + 1]
+            i = end + 1
+        elif char.isalpha() or char == "_":
+            start = i
+            while i < length and (sql[i].isalnum() or sql[i] in "_$"):
+                i += 1
+            yield WORD, sql[start:i]
+        elif char.isdigit() or (char == "." and sql[i + 1:i + 2].isdigit()):
+            start = i
+            while i < length and (sql[i].isalnum() or sql[i] == "."):
+                i += 1
+            yield NUMBER, sql[start:i]
+        else:
+            yield SYMBOL, char
+            i += 1
+
+
+def unquote(kind: str, text: str) -> str:
+    """Identifier text without its quotes"""
+    if kind != QUOTED and kind != STRING:
+        return text
+    closing = _CLOSING_QUOTES.get(text[0], "'")
+    inner = text[1:-1] if text.endswith(closing) and len(text) > 1 else text[1:]
+    return inner if closing == "]" else inner.replace(closing * 2, closing)
+
+
+class Statement:
+    """
+    What the leading keywords of one SQL statement say about it
+
+    ``kind`` is one of "select" (SELECT, VALUES and WITH ... SELECT),
+    "explain", "pragma", "insert" (also REPLACE), "update", "delete",
+    "create_table", "create_index", "create_view", "create_trigger",
+    "drop_table", "drop_index", "drop_view", "drop_trigger",
+    "alter_table", "transaction" (BEGIN, COMMIT, END, ROLLBACK),
+    "savepoint" (SAVEPOINT, RELEASE, ROLLBACK TO), "empty" for text with
+    no statement, or the lower-cased leading keyword otherwise (e.g.
+    "analyze", "vacuum", "attach"). ``object_name`` is the table, index,
+    view or trigger a CREATE, DROP or ALTER statement names, and
+    ``temporary`` is set for CREATE TEMP ... and CREATE ... temp.name.
+    """
+
+    __slots__ = ("kind", "object_name", "temporary")
+
+    def __init__(self, kind: str, object_name: Optional[str] = None, temporary: bool = False):
+        self.kind = kind
+        self.object_name = object_name
+        self.temporary = temporary
+
+    @property
+    def read_only(self) -> bool:
+        """True for statements that cannot modify the database"""
+        return self.kind in READ_ONLY_KINDS
+
+    @property
+    def changes_session(self) -> bool:
+        """
+        True for statements whose effect stays with the connection: PRAGMA,
+        ATTACH, DETACH and temporary tables, indexes, views and triggers
+        """
+        return self.kind in SESSION_KINDS or self.temporary
+
+    def __repr__(self) -> str:
+        return f"Statement({self.kind!r}, {self.object_name!r})"
+
+
+def _object_name(tokens: List[Tuple[str, str]], start: int) -> Optional[str]:
+    """Name at tokens[start:], skipping IF [NOT] EXISTS and a schema prefix"""
+    words = [text.upper() if kind == WORD else None for kind, text in tokens]
+    i = start
+    if words[i:i + 3] == ["IF", "NOT", "EXISTS"]:
+        i += 3
+    elif words[i:i + 2] == ["IF", "EXISTS"]:
+        i += 2
+    if i >= len(tokens) or tokens[i][0] not in (WORD, QUOTED, STRING):
+        return None
+    name = unquote(*tokens[i])
+    if i + 2 < len(tokens) and tokens[i + 1] == (SYMBOL, ".") and tokens[i + 2][0] in (WORD, QUOTED, STRING):
+        name = unquote(*tokens[i + 2])
+    return name
+
+
+def _main_verb(tokens: Iterator[Tuple[str, str]]) -> Optional[str]:
+    """First top-level SELECT/VALUES/INSERT/... after a WITH clause"""
+    depth = 0
+    for kind, text in tokens:
+        if kind == SYMBOL:
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+        elif kind == WORD and depth == 0 and text.upper() in _WITH_VERBS:
+            return text.upper()
+    return None
+
+
+def classify_statement(sql: str) -> Statement:
+    """
+    Classify a single SQL statement by its leading keywords
+
+    Args:
+        sql: SQL text of one statement (comments and a trailing semicolon
+            are allowed)
+
+    Returns:
+        Statement with the kind and, for DDL, the object name
+    """
+    tokens = tokenize(sql)
+    # Only a handful of leading tokens decide the kind; WITH reads on
+    head: List[Tuple[str, str]] = []
+    for token in tokens:
+        head.append(token)
+        if len(head) == 12:
+            break
+
+    words = [text.upper() for kind, text in head if kind == WORD]
+    if all(token == (SYMBOL, ";") for token in head):
+        return Statement("empty")
+    if head[0][0] != WORD:
+        return Statement("other")
+    verb = words[0]
+
+    if verb == "WITH":
+        main = _main_verb(chain(head[1:], tokens))
+        return Statement(_VERB_KINDS.get(main, "other"))
+    if verb in _VERB_KINDS:
+        return Statement(_VERB_KINDS[verb])
+    if verb == "EXPLAIN":
+        return Statement("explain")
+    if verb == "PRAGMA":
+        return Statement("pragma")
+
+    if verb == "CREATE":
+        i = 1
+        while i < len(head) and head[i][0] == WORD and head[i][1].upper() in ("TEMP", "TEMPORARY", "UNIQUE", "VIRTUAL"):
+            i += 1
+        # CREATE TEMP TABLE x, or CREATE TABLE temp.x
+        temporary = any(word in ("TEMP", "TEMPORARY") for word in words[1:i])
+        temporary = temporary or any(
+            head[j + 1] == (SYMBOL, ".") and unquote(*head[j]).lower() in ("temp", "temporary")
+            for j in range(i + 1, len(head) - 1)
+            if head[j][0] in (WORD, QUOTED, STRING)
+        )
+        target = head[i][1].upper() if i < len(head) and head[i][0] == WORD else ""
+        if target in ("TABLE", "INDEX", "VIEW", "TRIGGER"):
+            return Statement(f"create_{target.lower()}", _object_name(head, i + 1), temporary)
+        return Statement("other", temporary=temporary)
+    if verb == "DROP":
+        target = words[1] if len(words) > 1 else ""
+        if target in ("TABLE", "INDEX", "VIEW", "TRIGGER"):
+            return Statement(f"drop_{target.lower()}", _object_name(head, 2))
+        return Statement("other")
+    if verb == "ALTER":
+        return Statement("alter_table", _object_name(head, 2))
+
+    if verb in ("BEGIN", "COMMIT", "END"):
+        return Statement("transaction")
+    if verb == "ROLLBACK":
+        # ROLLBACK [TRANSACTION] TO <savepoint> stays inside the transaction
+        return Statement("savepoint" if "TO" in words[1:3] else "transaction")
+    if verb in ("SAVEPOINT", "RELEASE"):
+        return Statement("savepoint")
+    return Statement(verb.lower())
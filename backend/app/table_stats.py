@@ -0,0 +1,441 @@
+"""
+Table statistics: row counts, index selectivity and column distributions
+
+Before running a query against an unfamiliar table people want to know how
+big it is, how selective its indexes are and what its columns hold. The
+numbers come from two places:
+
+  ANALYZE output   sqlite_stat1 gives the rows per distinct key prefix of
+                   every index; sqlite_stat4 (only in SQLite builds with
+                   SQLITE_ENABLE_STAT4) gives sampled index keys with the
+                   number of rows before and equal to each, which makes a
+                   histogram of the leading index column
+  a row sample     up to TABLE_STATS_SAMPLE_ROWS rows, for null
+                   fractions, distinct counts and histograms of the other
+                   columns, and for index selectivity of tables that were
+                   never analyzed
+
+Neither the sample nor the row count scans a large table. A table that
+fits in the sample is read whole and counted exactly. Otherwise the row
+count comes from sqlite_stat1 (or, before ANALYZE, from the span of its
+rowids) and the sample is read as short runs of rows starting at random
+rowids, each one an index seek. WITHOUT ROWID tables are counted and
+sampled from their first rows instead. Everything is bounded by
+TABLE_STATS_TIMEOUT.
+
+The sample is cached per table and recomputed only when the table's
+version changes (see cache.TableVersions). The ANALYZE tables are small
+and read on every call, so a fresh ANALYZE shows up immediately.
+"""
+
+import bisect
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .database import PROGRESS_HANDLER_INTERVAL, close_db_connection, get_database_version, get_db_connection
+from .schema import schema_catalog
+
+# Rows sampled per table, and buckets per histogram
+TABLE_STATS_SAMPLE_ROWS = int(os.getenv('TABLE_STATS_SAMPLE_ROWS', '10000'))
+TABLE_STATS_BUCKETS = int(os.getenv('TABLE_STATS_BUCKETS', '10'))
+# Seconds the sample (and a WITHOUT ROWID count) may take
+TABLE_STATS_TIMEOUT = float(os.getenv('TABLE_STATS_TIMEOUT', '5'))
+
+# Runs of consecutive rows the sample of a large table is read as
+_SAMPLE_RUNS = 50
+
+# Text histogram boundaries are cut to this many characters
+_MAX_BOUNDARY_LENGTH = 64
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """SQLite record varint at offset; returns (value, next offset)"""
+    value = 0
+    for i in range(8):
+        byte = data[offset + i]
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, offset + i + 1
+    return (value << 8) | data[offset + 8], offset + 9
+
+
+_INT_SIZES = {1: 1, 2: 2, 3: 3, 4: 4, 5: 6, 6: 8}
+
+
+def decode_record_prefix(record: bytes) -> Any:
+    """
+    First value of an SQLite record, as stored in sqlite_stat4.sample
+
+    Args:
+        record: Index key in SQLite's record format
+
+    Returns:
+        The leading column's value (None, int, float, str or bytes)
+    """
+    header_size, offset = _read_varint(record, 0)
+    serial_type, _ = _read_varint(record, offset)
+    body = record[header_size:]
+    if serial_type == 0:
+        return None
+    if serial_type in _INT_SIZES:
+        return int.from_bytes(body[:_INT_SIZES[serial_type]], "big", signed=True)
+    if serial_type == 7:
+        return struct.unpack(">d", body[:8])[0]
+    if serial_type in (8, 9):
+        return serial_type - 8
+    if serial_type >= 12:
+        size = (serial_type - 12) // 2
+        if serial_type % 2:
+            return body[:size].decode("utf-8", errors="replace")
+        return body[:size]
+    raise ValueError(f"Unknown serial type {serial_type}")
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """SQLite's ordering across storage classes: numbers, then text, then blobs"""
+    if isinstance(value, (int, float)):
+        return 0, value
+    if isinstance(value, str):
+        return 1, value
+    return 2, value
+
+
+def _boundary(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _MAX_BOUNDARY_LENGTH:
+        return value[:_MAX_BOUNDARY_LENGTH]
+    return value
+
+
+def estimate_distinct(values: Sequence[Any], population: int) -> int:
+    """
+    Estimate the distinct values of a column from a sample of it
+
+    Uses the Duj1 estimator (Haas et al., 1995), which scales the sample's
+    distinct count by how many values appeared only once in it.
+
+    Args:
+        values: Sampled values (hashable)
+        population: Number of values the sample was drawn from
+
+    Returns:
+        Estimated distinct count (exact when the sample is the population)
+    """
+    sample = len(values)
+    if not sample:
+        return 0
+    counts = Counter(values)
+    distinct = len(counts)
+    if sample >= population:
+        return distinct
+    singletons = sum(1 for count in counts.values() if count == 1)
+    estimate = sample * distinct / (sample - singletons + singletons * sample / population)
+    return int(round(min(max(estimate, distinct), population)))
+
+
+def sample_histogram(values: List[Any], scale: float, buckets: int) -> List[Dict[str, Any]]:
+    """
+    Equi-depth histogram of sampled non-NULL values
+
+    Args:
+        values: Sampled non-NULL values (blobs are left out)
+        scale: Table rows per sampled row
+        buckets: Number of buckets to aim for
+
+    Returns:
+        Buckets with ``upper`` (inclusive boundary), ``rows`` (estimated
+        rows above the previous boundary up to this one) and ``equal``
+        (estimated rows equal to the boundary)
+    """
+    values = sorted((value for value in values if not isinstance(value, bytes)), key=_sort_key)
+    keys = [_sort_key(value) for value in values]
+    histogram = []
+    taken = 0
+    for i in range(1, buckets + 1):
+        if taken >= len(values):
+            break
+        upper = values[max(-(-i * len(values) // buckets) - 1, taken)]
+        # A bucket ends after the last copy of its boundary value
+        first = bisect.bisect_left(keys, _sort_key(upper))
+        end = bisect.bisect_right(keys, _sort_key(upper))
+        histogram.append({
+            "upper": _boundary(upper),
+            "rows": round((end - taken) * scale),
+            "equal": round((end - first) * scale),
+        })
+        taken = end
+    return histogram
+
+
+def _stat4_histogram(samples: List[Tuple[Any, int, int]]) -> List[Dict[str, Any]]:
+    """Histogram of a leading index column from (value, nLt, nEq) samples"""
+    histogram = []
+    covered = 0
+    seen = set()
+    for value, less, equal in sorted(samples, key=lambda sample: sample[1]):
+        if less in seen or isinstance(value, bytes):
+            continue
+        seen.add(less)
+        histogram.append({"upper": _boundary(value), "rows": less + equal - covered, "equal": equal})
+        covered = less + equal
+    return histogram
+
+
+def _parse_stat(stat: str) -> List[int]:
+    """Integers of a sqlite_stat1/stat4 stat string (keywords like sz= are skipped)"""
+    return [int(part) for part in stat.split() if part.isdigit()]
+
+
+class TableStatistics:
+    """
+    Statistics of user tables, with the sampled part cached per table version
+    """
+
+    def __init__(
+        self,
+        sample_rows: int = TABLE_STATS_SAMPLE_ROWS,
+        buckets: int = TABLE_STATS_BUCKETS,
+        timeout: float = TABLE_STATS_TIMEOUT,
+    ):
+        self.sample_rows = sample_rows
+        self.buckets = buckets
+        self.timeout = timeout
+        self._sampled: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._hits = 0
+        self._misses = 0
+
+    def _random_rows(self, cursor, table: str, names: str, low: int, high: int) -> List[Tuple[Any, ...]]:
+        """Up to sample_rows rows read as runs starting at random rowids"""
+        run = max(1, self.sample_rows // _SAMPLE_RUNS)
+        rows: Dict[int, Tuple[Any, ...]] = {}
+        # Runs can overlap or end early at gaps, so allow twice as many
+        for _ in range(2 * _SAMPLE_RUNS):
+            if len(rows) >= self.sample_rows:
+                break
+            cursor.execute(
+                f"SELECT rowid, {names} FROM {table} WHERE rowid >= ? ORDER BY rowid LIMIT {run}",
+                (random.randint(low, high),),
+            )
+            for row in cursor.fetchall():
+                rows[row[0]] = row[1:]
+        return list(rows.values())[:self.sample_rows]
+
+    def _sample(self, cursor, table_name: str, schema: Dict[str, Any], analyzed_rows: Optional[int]) -> Dict[str, Any]:
+        """
+        Row count, column statistics and index selectivity from a sample
+
+        Args:
+            analyzed_rows: Row count from sqlite_stat1, if the table was analyzed
+        """
+        table = _quote(table_name)
+        # Columns by name: SELECT * would also return generated and hidden
+        # columns, which table_info leaves out, and shift every position
+        names = ", ".join(_quote(column["name"]) for column in schema["columns"])
+        cursor.execute(f"SELECT {names} FROM {table} LIMIT {self.sample_rows + 1}")
+        rows = cursor.fetchall()
+        row_count_source = "count"
+
+        if len(rows) <= self.sample_rows:
+            row_count = len(rows)  # The sample is the whole table
+        else:
+            try:
+                cursor.execute(f"SELECT min(rowid), max(rowid) FROM {table}")
+                low, high = cursor.fetchone()
+            except sqlite3.OperationalError:
+                # WITHOUT ROWID: no cheap random access, keep the first rows
+                rows = rows[:self.sample_rows]
+                if analyzed_rows is None:
+                    cursor.execute(f"SELECT count(*) FROM {table}")
+                    analyzed_rows = cursor.fetchone()[0]
+                else:
+                    row_count_source = "analyze"
+                row_count = analyzed_rows
+            else:
+                rows = self._random_rows(cursor, table, names, low, high)
+                if analyzed_rows is not None:
+                    row_count, row_count_source = analyzed_rows, "analyze"
+                else:
+                    # Deleted rows leave gaps, so this is an upper bound
+                    row_count, row_count_source = max(high - low + 1, len(rows)), "estimate"
+        scale = row_count / len(rows) if rows else 0.0
+
+        columns = {}
+        for position, column in enumerate(schema["columns"]):
+            values = [row[position] for row in rows if row[position] is not None]
+            null_fraction = 1 - len(values) / len(rows) if rows else 0.0
+            columns[column["name"]] = {
+                "distinct_count": estimate_distinct(values, round(row_count * (1 - null_fraction))),
+                "null_fraction": round(null_fraction, 4),
+                "histogram": sample_histogram(values, scale, self.buckets),
+            }
+
+        # Rows per distinct key prefix, as sqlite_stat1 would report them
+        positions = {column["name"].lower(): position for position, column in enumerate(schema["columns"])}
+        indexes = {}
+        for index in schema["indexes"]:
+            rows_per_key = []
+            for depth in range(1, len(index["columns"]) + 1):
+                prefix = index["columns"][:depth]
+                if any(column is None or column.lower() not in positions for column in prefix):
+                    break  # Expressions are not in the sample
+                keys = [tuple(row[positions[column.lower()]] for column in prefix) for row in rows]
+                distinct = estimate_distinct(keys, row_count)
+                rows_per_key.append(max(1, round(row_count / distinct)) if distinct else 0)
+            indexes[index["name"]] = rows_per_key
+
+        return {
+            "row_count": row_count,
+            "row_count_source": row_count_source,
+            "sample_rows": len(rows),
+            "columns": columns,
+            "indexes": indexes,
+        }
+
+    def _analyze_rows(self, cursor, table_name: str):
+        """sqlite_stat1 and sqlite_stat4 rows of a table, if ANALYZE created them"""
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('sqlite_stat1', 'sqlite_stat4')"
+        )
+        present = {row[0] for row in cursor.fetchall()}
+        stat1: Dict[Optional[str], List[int]] = {}
+        stat4: Dict[str, List[Tuple[Any, int, int]]] = {}
+        if "sqlite_stat1" in present:
+            cursor.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = ?", (table_name,))
+            stat1 = {idx: _parse_stat(stat) for idx, stat in cursor.fetchall()}
+        if "sqlite_stat4" in present:
+            cursor.execute("SELECT idx, neq, nlt, sample FROM sqlite_stat4 WHERE tbl = ?", (table_name,))
+            for idx, neq, nlt, sample in cursor.fetchall():
+                stat4.setdefault(idx, []).append(
+                    (decode_record_prefix(sample), _parse_stat(nlt)[0], _parse_stat(neq)[0])
+                )
+        return stat1, stat4
+
+    def table_stats(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Row count, index selectivity and column statistics of a table
+
+        Args:
+            table_name: Name of the table (matched exactly)
+
+        Returns:
+            Dictionary with table, row_count, row_count_source, analyzed,
+            sample_rows, indexes and columns, or None if the table does not
+            exist
+
+        Raises:
+            sqlite3.Error: If the table cannot be read or sampling times out
+        """
+        etag = schema_catalog.table_etag(table_name)
+        if etag is None:
+            return None
+        schema = schema_catalog.snapshot()[1][table_name]
+
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            stat1, stat4 = self._analyze_rows(cursor, table_name)
+            # The first number of every sqlite_stat1 row is the row count
+            # (smaller for partial indexes)
+            analyzed_rows = max((numbers[0] for numbers in stat1.values() if numbers), default=None)
+            with self._lock:
+                cached = self._sampled.get(table_name)
+                sampled = cached[1] if cached is not None and cached[0] == etag else None
+                if sampled is not None:
+                    self._hits += 1
+                else:
+                    self._misses += 1
+            if sampled is None:
+                before = get_database_version()
+                deadline = time.monotonic() + self.timeout
+                conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_INTERVAL)
+                try:
+                    sampled = self._sample(cursor, table_name, schema, analyzed_rows)
+                except sqlite3.OperationalError as e:
+                    if time.monotonic() > deadline:
+                        raise sqlite3.OperationalError(
+                            f"Table statistics timed out after {self.timeout:g} seconds"
+                        ) from e
+                    raise
+                finally:
+                    conn.set_progress_handler(None, 0)
+                # A sample taken while another write committed may not match the ETag
+                if get_database_version() == before and schema_catalog.table_etag(table_name) == etag:
+                    with self._lock:
+                        self._sampled[table_name] = (etag, sampled)
+        finally:
+            close_db_connection(conn)
+
+        row_count, row_count_source = sampled["row_count"], sampled["row_count_source"]
+        # A sample cached before the table was analyzed only had an estimate
+        if row_count_source == "estimate" and analyzed_rows is not None:
+            row_count, row_count_source = analyzed_rows, "analyze"
+        indexes = []
+        # Leading index column -> (sqlite_stat1 numbers, sqlite_stat4 samples)
+        leading: Dict[str, Tuple[List[int], List[Tuple[Any, int, int]]]] = {}
+        for index in schema["indexes"]:
+            numbers = stat1.get(index["name"])
+            if numbers and len(numbers) > 1:
+                analyzed_rows, rows_per_key, source = numbers[0], numbers[1:], "analyze"
+                first = index["columns"][0]
+                if first is not None and first.lower() not in leading:
+                    leading[first.lower()] = (numbers, stat4.get(index["name"], []))
+            else:
+                analyzed_rows, rows_per_key, source = row_count, sampled["indexes"].get(index["name"], []), "sample"
+            indexes.append({
+                "name": index["name"],
+                "columns": index["columns"],
+                "unique": index["unique"],
+                "rows_per_key": rows_per_key,
+                "selectivity": round(rows_per_key[-1] / analyzed_rows, 6) if rows_per_key and analyzed_rows else None,
+                "source": source,
+            })
+
+        columns = []
+        for name, sample in sampled["columns"].items():
+            column = dict(name=name, **sample, histogram_source="sample")
+            analyzed = leading.get(name.lower())
+            if analyzed is not None:
+                numbers, samples = analyzed
+                if numbers[0] and numbers[1]:
+                    column["distinct_count"] = round(numbers[0] / numbers[1])
+                if samples:
+                    column["histogram"] = _stat4_histogram(samples)
+                    column["histogram_source"] = "stat4"
+            if not column["histogram"]:
+                column["histogram_source"] = None
+            columns.append(column)
+
+        return {
+            "table": table_name,
+            "row_count": row_count,
+            "row_count_source": row_count_source,
+            "analyzed": bool(stat1),
+            "sample_rows": sampled["sample_rows"],
+            "indexes": indexes,
+            "columns": columns,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return sample cache counters"""
+        with self._lock:
+            return {
+                "tables": len(self._sampled),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+table_stats = TableStatistics()
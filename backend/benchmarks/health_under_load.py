@@ -0,0 +1,110 @@
+"""
+Load test: /health latency while long-running queries execute
+
+Fires a batch of slow SELECTs at /query/execute and, at the same time,
+polls /health, then prints latency percentiles for both. With database work
+running on the dedicated executor, /health p99 should stay flat no matter
+how many slow queries are in flight.
+
+Usage (server must be running, httpx must be installed):
+    python benchmarks/health_under_load.py --url http://localhost:8000 --queries 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+SLOW_QUERY = (
+    "SELECT COUNT(*) AS n FROM ("
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < {rows}) "
+    "SELECT x FROM c)"
+)
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, latencies):
+    """Print a one-line latency summary in milliseconds"""
+    ms = [value * 1000 for value in latencies]
+    print(
+        f"{name:<16} n={len(ms):<5} "
+        f"p50={percentile(ms, 50):8.2f}ms  p99={percentile(ms, 99):8.2f}ms  "
+        f"max={max(ms):8.2f}ms  mean={statistics.mean(ms):8.2f}ms"
+    )
+
+
+async def login(client, username, password):
+    """Return a bearer token for the given credentials"""
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_slow_query(client, token, rows, latencies):
+    """Execute one slow query and record its latency"""
+    start = time.perf_counter()
+    response = await client.post(
+        "/query/execute",
+        json={"query": SLOW_QUERY.format(rows=rows)},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - start)
+
+
+async def poll_health(client, stop, latencies, interval):
+    """Hit /health repeatedly until stop is set"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        token = await login(client, args.username, args.password)
+
+        # Baseline: /health with nothing else running
+        idle = []
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, idle, args.interval))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        await poller
+
+        # Under load: slow queries plus /health polling
+        busy, query_latencies = [], []
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, busy, args.interval))
+        await asyncio.gather(*[
+            run_slow_query(client, token, args.rows, query_latencies)
+            for _ in range(args.queries)
+        ])
+        stop.set()
+        await poller
+
+    report("/health idle", idle)
+    report("/health loaded", busy)
+    report("slow queries", query_latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--queries", type=int, default=8, help="Concurrent slow queries")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Rows generated by each slow query")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between /health polls")
+    parser.add_argument("--baseline", type=float, default=2.0, help="Seconds of idle /health polling")
+    asyncio.run(main(parser.parse_args()))
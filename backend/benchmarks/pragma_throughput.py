@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: concurrent read/write throughput per PRAGMA profile
+
+Creates a scratch database for each profile, then runs reader threads
+(indexed point lookups plus an indexed COUNT) and writer threads
+(single-row INSERT + commit, like a history write) against it for a fixed
+time through the backend's ConnectionPool. Prints reads/s, writes/s and
+busy errors for each profile.
+
+"default" is what SQLite gives a plain connection (rollback journal,
+synchronous=FULL); "tuned" is the profile the backend applies by default.
+
+Usage (from the backend directory):
+    python benchmarks/pragma_throughput.py --readers 4 --writers 1 --seconds 5
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.pool import ConnectionPool  # noqa: E402
+
+PROFILES = {
+    "default": {
+        "busy_timeout": 5000,
+    },
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def prepare(path, rows):
+    """Create and fill the scratch table"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, payload TEXT, created_at REAL)")
+    conn.execute("CREATE INDEX idx_events_kind ON events(kind)")
+    conn.executemany(
+        "INSERT INTO events (kind, payload, created_at) VALUES (?, ?, ?)",
+        ((f"kind{i % 50}", "x" * 100, time.time()) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def reader(pool, stop, rows, counts, errors):
+    """Run point lookups and small aggregates until stop is set"""
+    done = 0
+    i = 0
+    while not stop.is_set():
+        i += 1
+        try:
+            with pool.connection() as conn:
+                conn.execute("SELECT * FROM events WHERE id = ?", (i * 7919 % rows + 1,)).fetchone()
+                conn.execute("SELECT COUNT(*) FROM events WHERE kind = ?", (f"kind{i % 50}",)).fetchone()
+            done += 1
+        except sqlite3.OperationalError:
+            errors.append(1)
+    counts.append(done)
+
+
+def writer(pool, stop, counts, errors):
+    """Insert and commit one row at a time until stop is set"""
+    done = 0
+    while not stop.is_set():
+        try:
+            with pool.connection() as conn:
+                conn.execute(
+                    "INSERT INTO events (kind, payload, created_at) VALUES (?, ?, ?)",
+                    ("write", "y" * 100, time.time()),
+                )
+                conn.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            errors.append(1)
+    counts.append(done)
+
+
+def run_profile(name, pragmas, args):
+    """Run one timed read/write mix and print throughput"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{name}.db")
+        prepare(path, args.rows)
+        pool = ConnectionPool(path, size=args.readers + args.writers, pragmas=pragmas)
+
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+        threads = [
+            threading.Thread(target=reader, args=(pool, stop, args.rows, reads, errors))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(pool, stop, writes, errors))
+            for _ in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        pool.close()
+
+    print(
+        f"{name:<8} reads/s={sum(reads) / args.seconds:10.1f}  "
+        f"writes/s={sum(writes) / args.seconds:9.1f}  busy_errors={len(errors)}"
+    )
+
+
+def main(args):
+    for name in args.profiles:
+        run_profile(name, PROFILES[name], args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads")
+    parser.add_argument("--writers", type=int, default=1, help="Concurrent writer threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows in the scratch table")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["default", "tuned"])
+    main(parser.parse_args())
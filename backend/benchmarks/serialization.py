@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: per-row cost of serializing a /query/execute response
+
+Builds a synthetic result of --rows rows by --columns columns and times two
+ways of turning it into the response body:
+
+  model  QueryResponse(data=...) validated by pydantic, run through
+         jsonable_encoder and json.dumps (what FastAPI does when an
+         endpoint returns the model)
+  fast   app.responses.query_response(), which serializes the rows as they
+         are (with orjson when installed)
+
+for each result format (objects, rows, columnar), and prints the time per
+row and the body size.
+
+Usage (from the backend directory):
+    python benchmarks/serialization.py --rows 20000 --columns 12
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.models import QueryResponse  # noqa: E402
+from app.responses import orjson, query_response  # noqa: E402
+
+
+def make_result(rows, columns):
+    """Return column names and row tuples resembling a typical table"""
+    names = [f"column_{i}" for i in range(columns)]
+    data = []
+    for r in range(rows):
+        row = []
+        for c in range(columns):
+            kind = c % 3
+            if kind == 0:
+                row.append(r * columns + c)
+            elif kind == 1:
+                row.append(f"value {r}-{c}")
+            else:
+                row.append(r / (c + 1))
+        data.append(tuple(row))
+    return names, data
+
+
+def shape(names, data, format):
+    """Reshape row tuples the way execute_query returns them"""
+    if format == "objects":
+        return [dict(zip(names, row)) for row in data]
+    if format == "columnar":
+        return [list(values) for values in zip(*data)]
+    return data
+
+
+def model_path(names, data, format):
+    """Validate through QueryResponse, then encode as FastAPI does"""
+    response = QueryResponse(success=True, data=data, columns=names, format=format, execution_time=0.01)
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(names, data, format):
+    """Serialize the prebuilt rows directly"""
+    return query_response(success=True, data=data, columns=names, format=format, execution_time=0.01).body
+
+
+def timed(func, repeat):
+    """Return the best wall time of func over repeat runs, and its output"""
+    best = float("inf")
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main(args):
+    names, rows = make_result(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} columns, encoder: {'orjson' if orjson else 'json'}")
+
+    for format in ("objects", "rows", "columnar"):
+        data = shape(names, rows, format)
+        for label, path in (("model", model_path), ("fast", fast_path)):
+            elapsed, body = timed(lambda: path(names, data, format), args.repeat)
+            print(
+                f"{format:<9} {label:<6} {elapsed / args.rows * 1e6:8.2f} us/row  "
+                f"total={elapsed * 1000:8.1f}ms  body={len(body) / 1024:9.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows in the synthetic result")
+    parser.add_argument("--columns", type=int, default=12, help="Columns in the synthetic result")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: literal SQL vs bound parameters, by statement cache size
+
+Creates a scratch table of --rows rows and runs --lookups point lookups
+against it through the backend's ConnectionPool in three ways:
+
+  literals  a new SQL text per lookup ("... WHERE id = 123"), so every
+            execution is parsed and planned again
+  params    one SQL text with a ? placeholder, reusing the prepared
+            statement from sqlite3's per-connection cache
+  mixed     params, but cycling through --shapes different query shapes,
+            which only stay prepared if the cache holds all of them
+
+each with the sqlite3 default cache (128 statements) and the backend's
+DB_STATEMENT_CACHE_SIZE. Prints microseconds per lookup.
+
+Usage (from the backend directory):
+    python benchmarks/statement_cache.py --rows 100000 --lookups 50000 --shapes 300
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.database import CONNECTION_PRAGMAS, DB_STATEMENT_CACHE_SIZE  # noqa: E402
+from app.pool import ConnectionPool  # noqa: E402
+
+
+def create_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, price REAL, stock INTEGER)")
+    conn.executemany(
+        "INSERT INTO items VALUES (?, ?, ?, ?)",
+        ((i, f"item {i}", i * 0.25, i % 97) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(pool, mode, ids, shapes):
+    with pool.connection() as conn:
+        start = time.perf_counter()
+        for n, item_id in enumerate(ids):
+            if mode == "literals":
+                conn.execute(f"SELECT name, price FROM items WHERE id = {item_id}").fetchone()
+            elif mode == "params":
+                conn.execute("SELECT name, price FROM items WHERE id = ?", (item_id,)).fetchone()
+            else:
+                # Same plan, different text: a distinct prepared statement per shape
+                conn.execute(
+                    f"SELECT name, price FROM items WHERE id = ? AND stock >= {-1 - n % shapes}",
+                    (item_id,),
+                ).fetchone()
+        return time.perf_counter() - start
+
+
+def main(args):
+    random.seed(1)
+    ids = [random.randrange(args.rows) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        create_database(path, args.rows)
+        print(f"{args.rows} rows, {args.lookups} lookups, {args.shapes} shapes in mixed mode")
+
+        for cache_size in (128, DB_STATEMENT_CACHE_SIZE):
+            pool = ConnectionPool(path, size=1, pragmas=CONNECTION_PRAGMAS, cached_statements=cache_size)
+            for mode in ("literals", "params", "mixed"):
+                elapsed = run(pool, mode, ids, args.shapes)
+                print(f"cached_statements={cache_size:<5} {mode:<9} {elapsed / args.lookups * 1e6:7.2f} us/lookup")
+            pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the scratch table")
+    parser.add_argument("--lookups", type=int, default=50_000, help="Point lookups per mode")
+    parser.add_argument("--shapes", type=int, default=300, help="Distinct query shapes in mixed mode")
+    main(parser.parse_args())